@@ -64,6 +64,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "business_clinic",
     "mero_desh_merai_utpadan",
     "rest_framework",
@@ -234,6 +235,60 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
 ADMIN_EMAIL = os.getenv("ADMIN_EMAIL")
 
+# Wish/offer match candidates: "terms" (exact title term index) or "lsh"
+# (MinHash LSH buckets, approximate but cheaper on very large catalogs)
+MATCH_CANDIDATES = os.getenv("MATCH_CANDIDATES", "terms")
+
+# Minutes new-match notifications are collected per recipient before one
+# digest email is sent (see the send_match_notifications command)
+MATCH_NOTIFICATION_WINDOW_MINUTES = int(
+    os.getenv("MATCH_NOTIFICATION_WINDOW_MINUTES", 15)
+)
+
+# HS code lookup: "memory" (per-process prefix/trigram index) or "trigram"
+# (pg_trgm similarity on PostgreSQL). The in-memory index rechecks the table
+# for imports and edits made by other processes every HS_CODE_INDEX_TTL seconds.
+HS_CODE_SEARCH = os.getenv("HS_CODE_SEARCH", "memory")
+HS_CODE_INDEX_TTL = int(os.getenv("HS_CODE_INDEX_TTL", 300))
+
+# Seconds the total of a lean job listing (mode=lean) is served from cache
+JOB_COUNT_CACHE_SECONDS = int(os.getenv("JOB_COUNT_CACHE_SECONDS", 60))
+
+# Seconds a process serves the ISCO occupation tree from memory before
+# reloading it; edits and imports made in the same process apply at once
+ISCO_TAXONOMY_TTL = int(os.getenv("ISCO_TAXONOMY_TTL", 300))
+
+# Seconds between checks of the skill tables for edits made by other
+# processes; the skill search index is rebuilt when they changed
+SKILL_INDEX_TTL = int(os.getenv("SKILL_INDEX_TTL", 60))
+
+# Candidates stored per job and jobs stored per candidate by the
+# refresh_recommendations worker
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", 20))
+
+# Seconds a refresh_recommendations worker keeps its in-memory engine before
+# rebuilding it from the database
+RECOMMENDATIONS_ENGINE_SECONDS = int(os.getenv("RECOMMENDATIONS_ENGINE_SECONDS", 600))
+
+# Seconds a user's saved and applied job ids are kept in the cache for the
+# job listing flags; saving, unsaving and applying drop the entry. Only
+# enable with a cache shared by all web processes; with 0 they are read
+# once per request.
+USER_JOBS_CACHE_SECONDS = int(os.getenv("USER_JOBS_CACHE_SECONDS", 0))
+
+# Seconds the stall floor plan (booked stalls per type) is served from the
+# cache; booking changes drop it
+STALL_FLOOR_PLAN_CACHE_SECONDS = int(os.getenv("STALL_FLOOR_PLAN_CACHE_SECONDS", 30))
+
+# Seconds the running voting session and its accept-questions flag are
+# served from the cache; changing either drops the entry
+RUNNING_SESSION_CACHE_SECONDS = int(os.getenv("RUNNING_SESSION_CACHE_SECONDS", 5))
+
+# Questions sent by the live leaderboard stream unless ?top= is given, and
+# seconds between its reloads of the running session's vote counts
+VOTING_LEADERBOARD_SIZE = int(os.getenv("VOTING_LEADERBOARD_SIZE", 10))
+VOTING_LEADERBOARD_SYNC_SECONDS = float(os.getenv("VOTING_LEADERBOARD_SYNC_SECONDS", 1))
+
 
 TINYMCE_DEFAULT_CONFIG = {
     "height": "780",
@@ -0,0 +1,80 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+# Times a save is retried with a fresh slug when a concurrent insert took it
+SLUG_RETRIES = 3
+
+
+def next_free_slug(model, base_slug, exclude_pk=None):
+    """
+    Returns `base_slug` or the first free `base_slug-N` (N >= 1) on `model`,
+    read with a single `slug__startswith` query. An empty `base_slug` (a
+    title with no sluggable characters) falls back to the model name.
+    """
+    base_slug = base_slug or model._meta.model_name
+    taken = set(
+        model.objects.filter(slug__startswith=base_slug)
+        .exclude(pk=exclude_pk)
+        .values_list("slug", flat=True)
+    )
+    if base_slug not in taken:
+        return base_slug
+
+    suffix = re.compile(rf"{re.escape(base_slug)}-(\d+)")
+    used = {int(match.group(1)) for slug in taken if (match := suffix.fullmatch(slug))}
+    counter = 1
+    while counter in used:
+        counter += 1
+    return f"{base_slug}-{counter}"
+
+
+class SlugMixin:
+    """
+    Keeps a unique `slug` derived from `title`. The slug is only recomputed
+    when the title changed since the instance was loaded, and a save that
+    loses the slug to a concurrent insert is retried with the next free one.
+    """
+
+    def make_base_slug(self):
+        return slugify(self.title)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_title = instance.__dict__.get("title")
+        return instance
+
+    def slug_is_current(self):
+        return bool(self.slug) and self.title == getattr(self, "_loaded_title", None)
+
+    def generate_unique_slug(self):
+        self.slug = next_free_slug(self.__class__, self.make_base_slug(), self.pk)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if self.slug_is_current() or (
+            update_fields is not None and "title" not in update_fields
+        ):
+            super().save(*args, **kwargs)
+            return
+
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "slug"}
+        self.generate_unique_slug()
+        for attempt in range(SLUG_RETRIES):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                break
+            except IntegrityError:
+                slug_taken = (
+                    self.__class__.objects.filter(slug=self.slug)
+                    .exclude(pk=self.pk)
+                    .exists()
+                )
+                if not slug_taken or attempt == SLUG_RETRIES - 1:
+                    raise
+                self.generate_unique_slug()
+        self._loaded_title = self.title
@@ -34,6 +34,7 @@ urlpatterns = [
     path("api/business_information/", include("business_information.urls")),
     path("api/", include("stall_booking.urls")),
     path("api/", include("voting.urls")),
+    path("live/", include("voting.live_urls")),
     path("api/", include("rojgar_pavillion.urls")),
     path("api/", include("stall_booking.urls")),
     path("api/", include("jobbriz.urls")),
@@ -2,24 +2,13 @@ from django.db import models
 from slugify import slugify  # Use the external library
 
 from accounts.models import CustomUser
+from CIM.slugs import SlugMixin as BaseSlugMixin
 
 
-class SlugMixin:
-    def generate_unique_slug(self):
+class SlugMixin(BaseSlugMixin):
+    def make_base_slug(self):
         # python-slugify handles Unicode marks much more accurately
-        base_slug = slugify(self.title, allow_unicode=True)
-
-        slug = base_slug
-        counter = 1
-        model = self.__class__
-        while model.objects.filter(slug=slug).exclude(id=self.id).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        self.slug = slug
-
-    def save(self, *args, **kwargs):
-        self.generate_unique_slug()
-        super().save(*args, **kwargs)
+        return slugify(self.title, allow_unicode=True)
 
 
 class Tag(models.Model):
@@ -4,6 +4,7 @@ from unfold.admin import ModelAdmin
 from .models import (
     ApprenticeshipApplication,
     ApprenticeshipDocument,
+    EmailOutbox,
     HireRequest,
     Internship,
     InternshipIndustry,
@@ -297,3 +298,18 @@ class LocationAdmin(ModelAdmin):
     list_display = ("name", "slug")
     search_fields = ("name",)
     readonly_fields = ("slug",)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(ModelAdmin):
+    list_display = [
+        "kind",
+        "object_id",
+        "status",
+        "attempts",
+        "messages_sent",
+        "created_at",
+        "sent_at",
+    ]
+    list_filter = ["kind", "status", "created_at"]
+    search_fields = ["error"]
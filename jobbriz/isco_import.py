@@ -0,0 +1,135 @@
+# jobbriz/isco_import.py
+
+import csv
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from .models import JobPost, MajorGroup, MinorGroup, SubMajorGroup, UnitGroup
+from .taxonomy import invalidate_isco_taxonomy
+
+CODE_COLUMN = "ISCO 08 Code"
+TITLE_COLUMN = "Title EN"
+DESCRIPTION_COLUMN = "Definition"
+
+# (model, parent model, parent field) per code length
+LEVELS = {
+    1: (MajorGroup, None, None),
+    2: (SubMajorGroup, MajorGroup, "major_group"),
+    3: (MinorGroup, SubMajorGroup, "sub_major_group"),
+    4: (UnitGroup, MinorGroup, "minor_group"),
+}
+
+
+class ISCOImportError(ValueError):
+    pass
+
+
+def read_isco_csv(lines):
+    """
+    Parses ISCO-08 CSV lines into {code length: {code: (title, description)}}.
+    Later rows for the same code win.
+    """
+    reader = csv.DictReader(lines)
+    # Normalize headers (strip spaces, remove BOM, etc.)
+    reader.fieldnames = [
+        field.strip().replace("\ufeff", "") for field in reader.fieldnames or []
+    ]
+    missing = {CODE_COLUMN, TITLE_COLUMN, DESCRIPTION_COLUMN} - set(reader.fieldnames)
+    if missing:
+        raise ISCOImportError(f"Missing required columns: {', '.join(sorted(missing))}")
+
+    levels = {length: {} for length in LEVELS}
+    for row in reader:
+        code = (row[CODE_COLUMN] or "").strip()
+        if len(code) in levels:
+            levels[len(code)][code] = (
+                (row[TITLE_COLUMN] or "").strip(),
+                (row[DESCRIPTION_COLUMN] or "").strip(),
+            )
+    return levels
+
+
+def allocate_slugs(model, titles, existing):
+    """
+    Returns {code: slug} for `titles` ({code: title}). Codes whose title is
+    unchanged keep their slug; the others get the first free
+    `slugify(title)`, `-1`, `-2`... against every slug the model holds,
+    loaded with a single query.
+    """
+    taken = set(model.objects.values_list("slug", flat=True))
+    slugs = {}
+    for code, title in titles.items():
+        current = existing.get(code)
+        if current and current.title == title and current.slug:
+            slugs[code] = current.slug
+            continue
+        base_slug = slugify(title)
+        slug, counter = base_slug, 1
+        while slug in taken:
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        taken.add(slug)
+        slugs[code] = slug
+    return slugs
+
+
+@transaction.atomic
+def import_isco(levels):
+    """
+    Upserts the parsed ISCO hierarchy one level at a time, each with a
+    single bulk_create(update_conflicts=True), resolving parents by code in
+    memory. Returns {model name: {"created": n, "updated": n}}.
+    """
+    counts = {}
+    parent_ids = {}
+    for length, (model, parent_model, parent_field) in LEVELS.items():
+        rows = levels.get(length, {})
+        if not rows:
+            parent_ids = dict(model.objects.values_list("code", "id"))
+            continue
+
+        if parent_model is not None:
+            missing = sorted({code[:-1] for code in rows} - set(parent_ids))
+            if missing:
+                raise ISCOImportError(
+                    f"{parent_model.__name__} not found for codes: "
+                    + ", ".join(missing)
+                )
+
+        existing = model.objects.in_bulk(list(rows), field_name="code")
+        slugs = allocate_slugs(
+            model, {code: title for code, (title, _) in rows.items()}, existing
+        )
+        objects = []
+        for code, (title, description) in rows.items():
+            fields = {
+                "code": code,
+                "title": title,
+                "description": description,
+                "slug": slugs[code],
+            }
+            if parent_field:
+                fields[f"{parent_field}_id"] = parent_ids[code[:-1]]
+            objects.append(model(**fields))
+
+        update_fields = ["title", "description", "slug"]
+        if parent_field:
+            update_fields.append(parent_field)
+        model.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=["code"],
+            update_fields=update_fields,
+        )
+
+        counts[model.__name__] = {
+            "created": len(rows) - len(existing),
+            "updated": len(existing),
+        }
+        parent_ids = dict(model.objects.values_list("code", "id"))
+
+    # Jobs keep their ISCO ancestry codes in their own columns
+    JobPost.sync_isco_codes()
+    invalidate_isco_taxonomy()
+    return counts
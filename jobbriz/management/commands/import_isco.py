@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from jobbriz.isco_import import ISCOImportError, import_isco, read_isco_csv
+
+
+class Command(BaseCommand):
+    help = "Imports or updates the ISCO-08 classification from a CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "csv_file",
+            help="CSV with 'ISCO 08 Code', 'Title EN' and 'Definition' columns",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["csv_file"], encoding="utf-8-sig", newline="") as lines:
+                counts = import_isco(read_isco_csv(lines))
+        except OSError as e:
+            raise CommandError(f"Could not read {options['csv_file']}: {e}")
+        except ISCOImportError as e:
+            raise CommandError(str(e))
+
+        for name, level_counts in counts.items():
+            self.stdout.write(
+                f"{name}: {level_counts['created']} created, "
+                f"{level_counts['updated']} updated"
+            )
+        self.stdout.write(self.style.SUCCESS("ISCO import complete."))
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobbriz.recommendations import process_refresh_queue, refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = "Recomputes the stored job and candidate recommendations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute every job and candidate and exit",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Apply the queued changes once and exit",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Queued changes applied per pass",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=30,
+            help="Seconds to wait when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            result = refresh_recommendations(full=True)
+            self.stdout.write(f"Recommendations refreshed: {result}")
+            return
+
+        while True:
+            result = process_refresh_queue(options["batch_size"])
+            if result:
+                self.stdout.write(f"Recommendations refreshed: {result}")
+
+            if options["once"]:
+                break
+            if not result:
+                time.sleep(options["interval"])
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobbriz.models import EmailOutbox
+
+
+class Command(BaseCommand):
+    help = "Sends the queued job application, internship and hire request emails"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the emails that are due now and exit",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Outbox rows sent over one SMTP connection",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait when the outbox is empty",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = EmailOutbox.send_pending(options["batch_size"])
+            if sent or failed:
+                self.stdout.write(f"Emails sent: {sent}, failed: {failed}")
+
+            if options["once"]:
+                break
+            # Keep draining while full batches are coming through
+            if sent + failed < options["batch_size"]:
+                time.sleep(options["interval"])
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from jobbriz.search import JOB_SEARCH_VECTOR
+
+
+def search_index():
+    return django.contrib.postgres.indexes.GinIndex(
+        fields=["search_vector"], name="jobpost_search_vector_gin"
+    )
+
+
+def create_search_index(apps, schema_editor):
+    # tsvector values and GIN indexes only exist on PostgreSQL; other
+    # databases fall back to icontains matching in search.py
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    JobPost = apps.get_model("jobbriz", "JobPost")
+    JobPost.objects.update(search_vector=JOB_SEARCH_VECTOR)
+    schema_editor.add_index(JobPost, search_index())
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("jobbriz", "JobPost"), search_index())
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobbriz", "0029_jobpost_email_to"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobpost",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="jobpost", index=search_index()),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
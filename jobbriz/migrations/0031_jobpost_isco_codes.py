@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:59
+
+from django.db import migrations, models
+
+ISCO_CODE_LOOKUPS = {
+    "major_group_code": "minor_group__sub_major_group__major_group__code",
+    "sub_major_group_code": "minor_group__sub_major_group__code",
+    "minor_group_code": "minor_group__code",
+    "unit_group_code": "code",
+}
+
+
+def copy_isco_codes(apps, schema_editor):
+    JobPost = apps.get_model("jobbriz", "JobPost")
+    UnitGroup = apps.get_model("jobbriz", "UnitGroup")
+    unit_groups = UnitGroup.objects.filter(pk=models.OuterRef("unit_group_id"))
+    JobPost.objects.update(
+        **{
+            field: models.Subquery(unit_groups.values(lookup)[:1])
+            for field, lookup in ISCO_CODE_LOOKUPS.items()
+        }
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobbriz", "0030_jobpost_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobpost",
+            name="major_group_code",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=1
+            ),
+        ),
+        migrations.AddField(
+            model_name="jobpost",
+            name="minor_group_code",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=3
+            ),
+        ),
+        migrations.AddField(
+            model_name="jobpost",
+            name="sub_major_group_code",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=2
+            ),
+        ),
+        migrations.AddField(
+            model_name="jobpost",
+            name="unit_group_code",
+            field=models.CharField(
+                blank=True, db_index=True, default="", editable=False, max_length=4
+            ),
+        ),
+        migrations.RunPython(copy_isco_codes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobbriz", "0032_emailoutbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecommendationRefresh",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="jobbriz.jobpost",
+                    ),
+                ),
+                (
+                    "job_seeker",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="jobbriz.jobseeker",
+                    ),
+                ),
+                (
+                    "work_interest",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="jobbriz.workinterest",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Recommendation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "side",
+                    models.CharField(
+                        choices=[("job", "Job"), ("candidate", "Candidate")],
+                        max_length=10,
+                    ),
+                ),
+                ("score", models.FloatField()),
+                ("rank", models.PositiveSmallIntegerField()),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommendations",
+                        to="jobbriz.jobpost",
+                    ),
+                ),
+                (
+                    "job_seeker",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommendations",
+                        to="jobbriz.jobseeker",
+                    ),
+                ),
+                (
+                    "work_interest",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="recommendations",
+                        to="jobbriz.workinterest",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["side", "job", "rank"],
+                        name="jobbriz_rec_side_8cfe36_idx",
+                    ),
+                    models.Index(
+                        fields=["side", "job_seeker", "rank"],
+                        name="jobbriz_rec_side_9e711b_idx",
+                    ),
+                    models.Index(
+                        fields=["side", "work_interest", "rank"],
+                        name="jobbriz_rec_side_231d01_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobbriz", "0033_recommendations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="emailoutbox",
+            name="messages_sent",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
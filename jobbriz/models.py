@@ -1,26 +1,73 @@
-from django.db import models
+from contextlib import suppress
+from datetime import timedelta
+
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.mail import get_connection
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.text import slugify
 
 from accounts.models import CustomUser
-
-
-class SlugMixin:
-    def generate_unique_slug(self):
-        base_slug = slugify(self.title)
-        slug = base_slug
-        counter = 1
-        model = self.__class__
-        while model.objects.filter(slug=slug).exclude(id=self.id).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        self.slug = slug
+from CIM.slugs import SlugMixin, next_free_slug
+
+from .search import SEARCH_FIELDS, refresh_search_vector
+from .skill_index import invalidate_skill_index
+from .taxonomy import invalidate_isco_taxonomy
+from .user_jobs import invalidate_user_jobs
+from .utils import (
+    apprenticeship_application_emails,
+    internship_registration_emails,
+    job_application_emails,
+    work_interest_hire_emails,
+)
+
+
+class ISCOGroupMixin:
+    """
+    Drops the cached ISCO taxonomy whenever a group is edited, and rewrites
+    the ISCO code columns of the jobs under a group whose code or parent
+    group changed.
+    """
+
+    # Foreign key to the parent group, and the JobPost lookup of the group
+    parent_field = None
+    job_lookup = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_position = instance.isco_position()
+        return instance
+
+    def isco_position(self):
+        """The group's code and parent id, as far as they are loaded."""
+        parent = f"{self.parent_field}_id" if self.parent_field else None
+        return self.__dict__.get("code"), self.__dict__.get(parent)
 
     def save(self, *args, **kwargs):
-        self.generate_unique_slug()
-        super().save(*args, **kwargs)
-
-
-class MajorGroup(SlugMixin, models.Model):
+        moved = self.pk is not None and self.isco_position() != getattr(
+            self, "_loaded_position", None
+        )
+        if moved:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                JobPost.sync_isco_codes(**{self.job_lookup: self})
+        else:
+            super().save(*args, **kwargs)
+        self._loaded_position = self.isco_position()
+        invalidate_isco_taxonomy()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_isco_taxonomy()
+        return result
+
+
+class MajorGroup(ISCOGroupMixin, SlugMixin, models.Model):
     """ISCO Major Group (1-digit code)"""
 
     code = models.CharField(max_length=1, unique=True)
@@ -28,11 +75,13 @@ class MajorGroup(SlugMixin, models.Model):
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
 
+    job_lookup = "unit_group__minor_group__sub_major_group__major_group"
+
     def __str__(self):
         return f"{self.code} - {self.title}"
 
 
-class SubMajorGroup(SlugMixin, models.Model):
+class SubMajorGroup(ISCOGroupMixin, SlugMixin, models.Model):
     """ISCO Sub-Major Group (2-digit code)"""
 
     major_group = models.ForeignKey(
@@ -43,11 +92,14 @@ class SubMajorGroup(SlugMixin, models.Model):
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
 
+    parent_field = "major_group"
+    job_lookup = "unit_group__minor_group__sub_major_group"
+
     def __str__(self):
         return f"{self.code} - {self.title}"
 
 
-class MinorGroup(SlugMixin, models.Model):
+class MinorGroup(ISCOGroupMixin, SlugMixin, models.Model):
     """ISCO Minor Group (3-digit code)"""
 
     sub_major_group = models.ForeignKey(
@@ -58,11 +110,14 @@ class MinorGroup(SlugMixin, models.Model):
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
 
+    parent_field = "sub_major_group"
+    job_lookup = "unit_group__minor_group"
+
     def __str__(self):
         return f"{self.code} - {self.title}"
 
 
-class UnitGroup(SlugMixin, models.Model):
+class UnitGroup(ISCOGroupMixin, SlugMixin, models.Model):
     """ISCO Unit Group (4-digit code)"""
 
     minor_group = models.ForeignKey(
@@ -73,10 +128,35 @@ class UnitGroup(SlugMixin, models.Model):
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     description = models.TextField(blank=True, null=True)
 
+    parent_field = "minor_group"
+    job_lookup = "unit_group"
+
     def __str__(self):
         return f"{self.code} - {self.title}"
 
 
+# JobPost fields its recommendations are computed from
+RECOMMENDATION_FIELDS = {
+    "title",
+    "requirements",
+    "unit_group",
+    "location",
+    "required_education",
+    "employment_type",
+    "status",
+    "deadline",
+}
+
+# JobPost columns holding the ISCO ancestry of its unit group, and where each
+# is read from on UnitGroup
+ISCO_CODE_LOOKUPS = {
+    "major_group_code": "minor_group__sub_major_group__major_group__code",
+    "sub_major_group_code": "minor_group__sub_major_group__code",
+    "minor_group_code": "minor_group__code",
+    "unit_group_code": "code",
+}
+
+
 class JobPost(SlugMixin, models.Model):
     STATUS_CHOICES = [
         ("Draft", "Draft"),
@@ -130,6 +210,20 @@ class JobPost(SlugMixin, models.Model):
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, blank=True)
     unit_group = models.ForeignKey(UnitGroup, on_delete=models.CASCADE)
+    # ISCO ancestry of unit_group, denormalized so classification filters
+    # need no joins. Kept in sync on save and on ISCO reimport.
+    major_group_code = models.CharField(
+        max_length=1, blank=True, default="", db_index=True, editable=False
+    )
+    sub_major_group_code = models.CharField(
+        max_length=2, blank=True, default="", db_index=True, editable=False
+    )
+    minor_group_code = models.CharField(
+        max_length=3, blank=True, default="", db_index=True, editable=False
+    )
+    unit_group_code = models.CharField(
+        max_length=4, blank=True, default="", db_index=True, editable=False
+    )
     required_skill_level = models.CharField(
         max_length=10, choices=LEVEL_CHOICES, default="None"
     )
@@ -158,15 +252,54 @@ class JobPost(SlugMixin, models.Model):
     views_count = models.PositiveIntegerField(default=0, blank=True)
     applications_count = models.PositiveIntegerField(default=0, blank=True)
     email_to = models.EmailField(null=True, blank=True)
+    # Weighted title/requirements/description vector, PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["status", "-posted_date"]),
+            GinIndex(fields=["search_vector"], name="jobpost_search_vector_gin"),
         ]
 
     def __str__(self):
         return f"{self.title} at {self.company_name}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "unit_group" in update_fields:
+            self.refresh_isco_codes()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *ISCO_CODE_LOOKUPS}
+        super().save(*args, **kwargs)
+        if update_fields is None or set(update_fields) & SEARCH_FIELDS:
+            refresh_search_vector(self)
+        if update_fields is None or set(update_fields) & RECOMMENDATION_FIELDS:
+            RecommendationRefresh.enqueue(self)
+
+    def refresh_isco_codes(self):
+        codes = (
+            UnitGroup.objects.filter(pk=self.unit_group_id)
+            .values_list(*ISCO_CODE_LOOKUPS.values())
+            .first()
+        ) or ("",) * len(ISCO_CODE_LOOKUPS)
+        for field, code in zip(ISCO_CODE_LOOKUPS, codes):
+            setattr(self, field, code or "")
+
+    @classmethod
+    def sync_isco_codes(cls, **filters):
+        """
+        Rewrites the ISCO code columns of every job, or of those matching
+        `filters`, from its unit group in a single UPDATE, after the
+        hierarchy was reimported or edited.
+        """
+        unit_groups = UnitGroup.objects.filter(pk=models.OuterRef("unit_group_id"))
+        return cls.objects.filter(**filters).update(
+            **{
+                field: models.Subquery(unit_groups.values(lookup)[:1])
+                for field, lookup in ISCO_CODE_LOOKUPS.items()
+            }
+        )
+
 
 class JobApplication(models.Model):
     STATUS_CHOICES = [
@@ -201,6 +334,12 @@ class JobApplication(models.Model):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
+        invalidate_user_jobs("applied", self.applicant_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_user_jobs("applied", self.applicant_id)
+        return result
 
 
 class WorkInterest(models.Model):
@@ -257,6 +396,10 @@ class WorkInterest(models.Model):
     def __str__(self):
         return f"{self.title}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        RecommendationRefresh.enqueue(self)
+
 
 class WorkInterestHire(models.Model):
     work_interest = models.ForeignKey(
@@ -323,6 +466,15 @@ class SavedJob(models.Model):
     def __str__(self):
         return f"Saved job {self.job.title} by {self.job_seeker.username}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_user_jobs("saved", self.job_seeker_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_user_jobs("saved", self.job_seeker_id)
+        return result
+
 
 class Skill(models.Model):
     name = models.CharField(max_length=50)
@@ -330,6 +482,15 @@ class Skill(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_skill_index()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_skill_index()
+        return result
+
 
 class Language(models.Model):
     name = models.CharField(max_length=50)
@@ -388,13 +549,7 @@ class Location(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name)
-            slug = base_slug
-            counter = 1
-            # Check if slug exists and generate a unique one
-            while Location.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            self.slug = next_free_slug(Location, base_slug)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -534,14 +689,9 @@ class JobSeeker(models.Model):
             else:
                 base_slug = "guest-intern"
 
-            slug = base_slug
-            counter = 1
-            # Check if slug exists and generate a unique one
-            while JobSeeker.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            self.slug = next_free_slug(JobSeeker, base_slug)
         super().save(*args, **kwargs)
+        RecommendationRefresh.enqueue(self)
 
 
 class Internship(models.Model):
@@ -645,13 +795,7 @@ class Internship(models.Model):
             else:
                 base_slug = "guest-intern"
 
-            slug = base_slug
-            counter = 1
-            # Check if slug exists and generate a unique one
-            while Internship.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            self.slug = slug
+            self.slug = next_free_slug(Internship, base_slug)
         super().save(*args, **kwargs)
 
 
@@ -756,3 +900,229 @@ class ApprenticeshipDocument(models.Model):
 
     def __str__(self):
         return f"Document for {self.application.full_name}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Durable queue of jobbriz notification emails. Create views queue a row
+    in the transaction that saves the application and `send_jobbriz_emails`
+    renders and sends its messages.
+    """
+
+    KIND_CHOICES = [
+        ("job_application", "Job Application"),
+        ("internship_registration", "Internship Registration"),
+        ("apprenticeship_application", "Apprenticeship Application"),
+        ("work_interest_hire", "Work Interest Hire"),
+    ]
+    EMAIL_STATUS = [
+        ("Pending", "Pending"),
+        ("Sent", "Sent"),
+        ("Failed", "Failed"),
+    ]
+    MAX_ATTEMPTS = 5
+    # Delay before the first retry, doubled after every failed attempt
+    RETRY_DELAY = timedelta(minutes=1)
+    # Claimed rows are retried after this if their worker never reported back
+    CLAIM_TIMEOUT = timedelta(minutes=10)
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=EMAIL_STATUS, default="Pending")
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Messages of build_messages() already delivered, skipped on a retry
+    messages_sent = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} - {self.status}"
+
+    @classmethod
+    def queue(cls, kind, instance):
+        return cls.objects.create(kind=kind, object_id=instance.pk)
+
+    @classmethod
+    def claim(cls, limit, now=None):
+        """
+        Returns up to `limit` due Pending rows, pushing their next attempt
+        past CLAIM_TIMEOUT so other workers skip them meanwhile. Rows locked
+        by another worker are skipped on databases that support it.
+        """
+        now = now or timezone.now()
+        with transaction.atomic():
+            ids = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(status="Pending", next_attempt_at__lte=now)
+                .order_by("next_attempt_at")
+                .values_list("id", flat=True)[:limit]
+            )
+            cls.objects.filter(id__in=ids).update(
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + cls.CLAIM_TIMEOUT,
+            )
+        return list(cls.objects.filter(id__in=ids).order_by("id"))
+
+    def build_messages(self):
+        model, build = EMAIL_BUILDERS[self.kind]
+        return build(model.objects.get(pk=self.object_id))
+
+    @classmethod
+    def send_pending(cls, limit=50, now=None):
+        """
+        Sends the messages of up to `limit` due rows over a single SMTP
+        connection and returns the (sent, failed) row counts. Failed rows are
+        retried with exponential backoff up to MAX_ATTEMPTS, resuming after
+        the messages that were already delivered.
+        """
+        now = now or timezone.now()
+        outbox = cls.claim(limit, now)
+        sent = failed = 0
+        if not outbox:
+            return sent, failed
+
+        # Opened with the first row and reopened after a failure, so an SMTP
+        # outage is recorded on each row instead of aborting the run
+        connection = get_connection()
+        for email in outbox:
+            try:
+                connection.open()
+                for message in email.build_messages()[email.messages_sent :]:
+                    connection.send_messages([message])
+                    email.messages_sent += 1
+            except Exception as e:
+                failed += 1
+                email.status = (
+                    "Failed" if email.attempts >= cls.MAX_ATTEMPTS else "Pending"
+                )
+                email.next_attempt_at = now + cls.RETRY_DELAY * 2 ** (
+                    email.attempts - 1
+                )
+                email.error = str(e)
+                with suppress(Exception):
+                    connection.close()
+            else:
+                sent += 1
+                email.status = "Sent"
+                email.sent_at = timezone.now()
+                email.error = None
+            email.save(
+                update_fields=[
+                    "status",
+                    "next_attempt_at",
+                    "messages_sent",
+                    "error",
+                    "sent_at",
+                ]
+            )
+        with suppress(Exception):
+            connection.close()
+        return sent, failed
+
+
+class Recommendation(models.Model):
+    """
+    Stored top-k list entry of a job ("job" side: its best candidates) or of
+    a job seeker or work interest ("candidate" side: their best jobs). Kept
+    current by the `refresh_recommendations` worker.
+    """
+
+    SIDE_CHOICES = [
+        ("job", "Job"),
+        ("candidate", "Candidate"),
+    ]
+
+    side = models.CharField(max_length=10, choices=SIDE_CHOICES)
+    job = models.ForeignKey(
+        JobPost, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    job_seeker = models.ForeignKey(
+        JobSeeker,
+        on_delete=models.CASCADE,
+        related_name="recommendations",
+        null=True,
+        blank=True,
+    )
+    work_interest = models.ForeignKey(
+        WorkInterest,
+        on_delete=models.CASCADE,
+        related_name="recommendations",
+        null=True,
+        blank=True,
+    )
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["side", "job", "rank"]),
+            models.Index(fields=["side", "job_seeker", "rank"]),
+            models.Index(fields=["side", "work_interest", "rank"]),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} - {self.job_seeker or self.work_interest} ({self.score})"
+
+
+class RecommendationRefresh(models.Model):
+    """
+    Job, job seeker or work interest whose recommendations need recomputing,
+    queued on save and consumed by `refresh_recommendations`.
+    """
+
+    job = models.ForeignKey(JobPost, on_delete=models.CASCADE, null=True, blank=True)
+    job_seeker = models.ForeignKey(
+        JobSeeker, on_delete=models.CASCADE, null=True, blank=True
+    )
+    work_interest = models.ForeignKey(
+        WorkInterest, on_delete=models.CASCADE, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.job or self.job_seeker or self.work_interest}"
+
+    @classmethod
+    def enqueue(cls, instance):
+        field = {
+            JobPost: "job",
+            JobSeeker: "job_seeker",
+            WorkInterest: "work_interest",
+        }[type(instance)]
+        if not cls.objects.filter(**{field: instance}).exists():
+            cls.objects.create(**{field: instance})
+
+
+@receiver(m2m_changed, sender=WorkInterest.skills.through)
+@receiver(m2m_changed, sender=JobSeeker.skills.through)
+def profile_skills_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate_skill_index()
+
+
+@receiver(m2m_changed, sender=WorkInterest.skills.through)
+@receiver(m2m_changed, sender=JobSeeker.skills.through)
+@receiver(m2m_changed, sender=JobSeeker.preferred_unit_groups.through)
+@receiver(m2m_changed, sender=JobSeeker.education.through)
+def profile_features_changed(sender, action, instance, reverse, **kwargs):
+    if action.startswith("post_") and not reverse:
+        RecommendationRefresh.enqueue(instance)
+
+
+# Model and message builder of each EmailOutbox kind
+EMAIL_BUILDERS = {
+    "job_application": (JobApplication, job_application_emails),
+    "internship_registration": (Internship, internship_registration_emails),
+    "apprenticeship_application": (
+        ApprenticeshipApplication,
+        apprenticeship_application_emails,
+    ),
+    "work_interest_hire": (WorkInterestHire, work_interest_hire_emails),
+}
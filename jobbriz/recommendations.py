@@ -0,0 +1,476 @@
+# jobbriz/recommendations.py
+
+import re
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from scipy import sparse
+
+from .models import (
+    JobPost,
+    JobSeeker,
+    Recommendation,
+    RecommendationRefresh,
+    Skill,
+    WorkInterest,
+)
+from .skill_index import normalize_skill
+
+# Points a job awards for each kind of fit, out of 100 for a job that
+# states all of them. Jobs missing a kind are scored out of what they state.
+WEIGHTS = {
+    "occupation": 40,
+    "skills": 35,
+    "location": 10,
+    "education": 10,
+    "employment": 5,
+}
+# Share of the occupation points earned for the same ISCO unit group, and
+# the extra shares for sharing its minor, sub-major and major group
+OCCUPATION_SHARES = {4: 0.5, 3: 0.25, 2: 0.15, 1: 0.1}
+# Education from lowest to highest; a level satisfies every level below it
+EDUCATION_LEVELS = [
+    "No Education",
+    "General Literate",
+    "Below SLC",
+    "TLSC",
+    "Pre-Diploma",
+    "+2",
+    "Diploma",
+    "Bachelors",
+    "Master & above",
+]
+# Candidate availability as the job employment type it fits
+EMPLOYMENT_TYPES = {
+    "Full Time": "Full Time",
+    "Part Time": "Part Time",
+    "Contract": "Contract",
+    "Freelance": "Contract",
+    "Internship": "Internship",
+}
+# Pairs scoring below this are not recommended
+MIN_SCORE = 20
+# Longest skill name, in words, looked for in job texts
+MAX_SKILL_WORDS = 3
+
+CANDIDATE_KINDS = ("job_seeker", "work_interest")
+
+
+def words(text):
+    return re.findall(r"[\w+#.]+", (text or "").casefold())
+
+
+def phrases(text, max_words=MAX_SKILL_WORDS):
+    """Every run of up to `max_words` consecutive words of `text`."""
+    tokens = words(text)
+    return {
+        " ".join(tokens[start : start + length])
+        for length in range(1, max_words + 1)
+        for start in range(len(tokens) - length + 1)
+    }
+
+
+def locations(text):
+    """Comma or slash separated place names of a free text location."""
+    return {
+        name for name in map(normalize_skill, re.split(r"[,/;]", text or "")) if name
+    }
+
+
+def occupation_features(code):
+    """The unit group code and the codes of its minor to major groups."""
+    return {f"isco{level}:{code[:level]}" for level in range(1, len(code) + 1)}
+
+
+def job_features(job, skill_names):
+    """{feature: points} a job awards, scaled so a full match scores 100."""
+    features = {}
+
+    code = job.unit_group_code
+    if code:
+        for level, share in OCCUPATION_SHARES.items():
+            features[f"isco{level}:{code[:level]}"] = WEIGHTS["occupation"] * share
+
+    skills = phrases(f"{job.title} {job.requirements}") & skill_names
+    for skill in skills:
+        features[f"skill:{skill}"] = WEIGHTS["skills"] / len(skills)
+
+    places = locations(job.location)
+    for place in places:
+        features[f"location:{place}"] = WEIGHTS["location"] / len(places)
+
+    if job.required_education in EDUCATION_LEVELS:
+        level = EDUCATION_LEVELS.index(job.required_education)
+        features[f"education:{level}"] = WEIGHTS["education"]
+
+    if job.employment_type == "All":
+        features["employment:any"] = WEIGHTS["employment"]
+    elif job.employment_type:
+        features[f"employment:{job.employment_type}"] = WEIGHTS["employment"]
+
+    total = sum(features.values())
+    if not total:
+        return {}
+    return {feature: 100 * points / total for feature, points in features.items()}
+
+
+def candidate_features(unit_group_codes, skills, places, education, availability):
+    """The set of features a job seeker or work interest profile has."""
+    features = {"employment:any", "education:0"}
+    for code in unit_group_codes:
+        features |= occupation_features(code)
+    features |= {f"skill:{normalize_skill(skill.name)}" for skill in skills}
+    features |= {f"location:{place}" for place in places}
+    level = max(
+        (
+            EDUCATION_LEVELS.index(level)
+            for level in education
+            if level in EDUCATION_LEVELS
+        ),
+        default=0,
+    )
+    features |= {f"education:{lower}" for lower in range(level + 1)}
+    if availability in EMPLOYMENT_TYPES:
+        features.add(f"employment:{EMPLOYMENT_TYPES[availability]}")
+    return features
+
+
+def job_seeker_features(job_seeker):
+    return candidate_features(
+        [group.code for group in job_seeker.preferred_unit_groups.all()],
+        job_seeker.skills.all(),
+        locations(job_seeker.preferred_locations)
+        | locations(job_seeker.current_district),
+        [education.course_or_qualification for education in job_seeker.education.all()],
+        job_seeker.availability,
+    )
+
+
+def work_interest_features(work_interest):
+    return candidate_features(
+        [work_interest.unit_group.code],
+        work_interest.skills.all(),
+        locations(work_interest.preferred_locations),
+        [],
+        work_interest.availability,
+    )
+
+
+def active_jobs():
+    return JobPost.objects.filter(status="Published", deadline__gte=timezone.now())
+
+
+class RecommendationEngine:
+    """
+    Sparse feature vectors of every active job and every candidate profile.
+    A job row holds the points it awards per feature and a candidate row a 1
+    per feature it has, so their dot product is the candidate's score out of
+    100 and `jobs @ candidates.T` scores every pair at once.
+
+    The features are kept per job and candidate, so update() only reloads
+    the rows that changed and reassembles the matrices from memory.
+    """
+
+    def __init__(self):
+        self.built_at = timezone.now()
+        self.skill_names = {
+            normalize_skill(name)
+            for name in Skill.objects.values_list("name", flat=True)
+        }
+        self.vocabulary = {}
+        self.job_vectors = {}
+        self.candidate_vectors = {}
+        self.load(active_jobs(), JobSeeker.objects.all(), WorkInterest.objects.all())
+        self.assemble()
+
+    def load(self, jobs, job_seekers, work_interests):
+        for job in jobs:
+            self.job_vectors[job.id] = (job, job_features(job, self.skill_names))
+        for seeker in job_seekers.prefetch_related(
+            "preferred_unit_groups", "skills", "education"
+        ):
+            self.candidate_vectors[("job_seeker", seeker.id)] = dict.fromkeys(
+                job_seeker_features(seeker), 1.0
+            )
+        for interest in work_interests.select_related("unit_group").prefetch_related(
+            "skills"
+        ):
+            self.candidate_vectors[("work_interest", interest.id)] = dict.fromkeys(
+                work_interest_features(interest), 1.0
+            )
+
+    def update(self, jobs=(), candidates=()):
+        """
+        Reloads the given jobs (ids) and candidates ((kind, id) keys),
+        dropping those that were deleted or are no longer active, and the
+        jobs whose deadline passed. Returns the ids of the latter.
+        """
+        now = timezone.now()
+        expired = {
+            job_id
+            for job_id, (job, _) in self.job_vectors.items()
+            if job.deadline < now
+        }
+        for job_id in set(jobs) | expired:
+            self.job_vectors.pop(job_id, None)
+        for candidate in candidates:
+            self.candidate_vectors.pop(candidate, None)
+        ids = candidate_ids(candidates)
+        self.load(
+            active_jobs().filter(id__in=jobs),
+            JobSeeker.objects.filter(id__in=ids["job_seeker"]),
+            WorkInterest.objects.filter(id__in=ids["work_interest"]),
+        )
+        self.assemble()
+        return expired
+
+    def assemble(self):
+        job_ids = sorted(self.job_vectors)
+        self.jobs = [self.job_vectors[job_id][0] for job_id in job_ids]
+        self.candidates = sorted(self.candidate_vectors)
+
+        self.job_matrix = self.matrix(
+            [self.job_vectors[job_id][1] for job_id in job_ids]
+        )
+        self.candidate_matrix = self.matrix(
+            [self.candidate_vectors[candidate] for candidate in self.candidates]
+        )
+        # Both sides were built against the final vocabulary size
+        columns = max(len(self.vocabulary), 1)
+        self.job_matrix.resize(len(self.jobs), columns)
+        self.candidate_matrix.resize(len(self.candidates), columns)
+
+        self.job_rows = {job_id: row for row, job_id in enumerate(job_ids)}
+        self.candidate_rows = {
+            candidate: row for row, candidate in enumerate(self.candidates)
+        }
+
+    def matrix(self, rows):
+        columns, values, indptr = [], [], [0]
+        for features in rows:
+            for feature, value in features.items():
+                columns.append(
+                    self.vocabulary.setdefault(feature, len(self.vocabulary))
+                )
+                values.append(value)
+            indptr.append(len(columns))
+        return sparse.csr_matrix(
+            (np.array(values, dtype=np.float32), columns, indptr),
+            shape=(len(rows), max(len(self.vocabulary), 1)),
+        )
+
+    def job_scores(self, job_ids):
+        """Sparse (jobs x candidates) scores of the given active jobs."""
+        rows = [self.job_rows[job_id] for job_id in job_ids]
+        return (self.job_matrix[rows] @ self.candidate_matrix.T).tocsr()
+
+    def candidate_scores(self, candidates):
+        """Sparse (candidates x jobs) scores of the given candidates."""
+        rows = [self.candidate_rows[candidate] for candidate in candidates]
+        return (self.candidate_matrix[rows] @ self.job_matrix.T).tocsr()
+
+
+_engine = None
+
+
+def get_recommendation_engine(jobs=(), candidates=()):
+    """
+    Returns this process's engine updated with the changed `jobs` and
+    `candidates`, and the ids of the recommended jobs that are no longer
+    active. The engine is rebuilt after RECOMMENDATIONS_ENGINE_SECONDS, which
+    bounds how long it misses new skills and changes other workers applied.
+    """
+    global _engine
+    age = settings.RECOMMENDATIONS_ENGINE_SECONDS
+    if _engine is None or timezone.now() - _engine.built_at > timedelta(seconds=age):
+        _engine = RecommendationEngine()
+        inactive = (
+            Recommendation.objects.exclude(job_id__in=list(_engine.job_rows))
+            .values_list("job_id", flat=True)
+            .distinct()
+        )
+        return _engine, set(inactive)
+    return _engine, _engine.update(jobs, candidates)
+
+
+def top_k(scores, row, k):
+    """(column, score) of the `k` best scores of a csr row, best first."""
+    start, end = scores.indptr[row], scores.indptr[row + 1]
+    columns, values = scores.indices[start:end], scores.data[start:end]
+    keep = values >= MIN_SCORE
+    columns, values = columns[keep], values[keep]
+    if len(values) > k:
+        best = np.argpartition(-values, k - 1)[:k]
+        columns, values = columns[best], values[best]
+    order = np.lexsort((columns, -values))
+    return [(int(columns[i]), round(float(values[i]), 2)) for i in order]
+
+
+def candidate_key(recommendation):
+    if recommendation["job_seeker_id"]:
+        return ("job_seeker", recommendation["job_seeker_id"])
+    return ("work_interest", recommendation["work_interest_id"])
+
+
+def stored_lists(side, **filters):
+    """{job id or candidate key: (rows, lowest score)} of a stored side."""
+    key = "job_id" if side == "job" else ("job_seeker_id", "work_interest_id")
+    fields = [key] if side == "job" else list(key)
+    lists = (
+        Recommendation.objects.filter(side=side, **filters)
+        .values(*fields)
+        .annotate(rows=Count("id"), lowest=Min("score"))
+    )
+    if side == "job":
+        return {entry["job_id"]: (entry["rows"], entry["lowest"]) for entry in lists}
+    return {candidate_key(entry): (entry["rows"], entry["lowest"]) for entry in lists}
+
+
+def displaced(lists, key, score, k):
+    """Whether `score` enters the stored top-k list of `key`."""
+    rows, lowest = lists.get(key, (0, None))
+    return score >= MIN_SCORE and (rows < k or score > lowest)
+
+
+def affected(engine, jobs, candidates, k):
+    """
+    Expands changed jobs and candidates to every job and candidate whose
+    top-k list can change: the other side's lists the new scores enter, and
+    the lists that already hold a changed job or candidate.
+    """
+    jobs, candidates = set(jobs), set(candidates)
+    affected_jobs, affected_candidates = set(jobs), set(candidates)
+
+    active = [job_id for job_id in jobs if job_id in engine.job_rows]
+    if active:
+        lists = stored_lists("candidate")
+        scores = engine.job_scores(active).tocoo()
+        for column, score in zip(scores.col, scores.data):
+            candidate = engine.candidates[column]
+            if displaced(lists, candidate, score, k):
+                affected_candidates.add(candidate)
+
+    known = [c for c in candidates if c in engine.candidate_rows]
+    if known:
+        lists = stored_lists("job")
+        scores = engine.candidate_scores(known).tocoo()
+        for column, score in zip(scores.col, scores.data):
+            job_id = engine.jobs[column].id
+            if displaced(lists, job_id, score, k):
+                affected_jobs.add(job_id)
+
+    holders = Recommendation.objects.filter(side="candidate", job_id__in=jobs).values(
+        "job_seeker_id", "work_interest_id"
+    )
+    affected_candidates |= {candidate_key(holder) for holder in holders}
+    for kind, ids in candidate_ids(candidates).items():
+        affected_jobs |= set(
+            Recommendation.objects.filter(
+                side="job", **{f"{kind}_id__in": ids}
+            ).values_list("job_id", flat=True)
+        )
+    return affected_jobs, affected_candidates
+
+
+def candidate_ids(candidates):
+    """{kind: [ids]} of (kind, id) candidate keys."""
+    return {
+        kind: [candidate_id for c_kind, candidate_id in candidates if c_kind == kind]
+        for kind in CANDIDATE_KINDS
+    }
+
+
+def rewrite(engine, jobs, candidates, k, batch_size=500):
+    """Replaces the stored top-k lists of `jobs` and `candidates`."""
+    rows = []
+    active = [job_id for job_id in jobs if job_id in engine.job_rows]
+    if active:
+        scores = engine.job_scores(active)
+        for row, job_id in enumerate(active):
+            for rank, (column, score) in enumerate(top_k(scores, row, k), 1):
+                kind, candidate_id = engine.candidates[column]
+                rows.append(
+                    Recommendation(
+                        side="job",
+                        job_id=job_id,
+                        score=score,
+                        rank=rank,
+                        **{f"{kind}_id": candidate_id},
+                    )
+                )
+
+    known = [c for c in candidates if c in engine.candidate_rows]
+    if known:
+        scores = engine.candidate_scores(known)
+        for row, (kind, candidate_id) in enumerate(known):
+            for rank, (column, score) in enumerate(top_k(scores, row, k), 1):
+                rows.append(
+                    Recommendation(
+                        side="candidate",
+                        job_id=engine.jobs[column].id,
+                        score=score,
+                        rank=rank,
+                        **{f"{kind}_id": candidate_id},
+                    )
+                )
+
+    ids = candidate_ids(candidates)
+    with transaction.atomic():
+        Recommendation.objects.filter(side="job", job_id__in=jobs).delete()
+        for kind in CANDIDATE_KINDS:
+            Recommendation.objects.filter(
+                side="candidate", **{f"{kind}_id__in": ids[kind]}
+            ).delete()
+        Recommendation.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def refresh_recommendations(jobs=(), candidates=(), full=False, k=None):
+    """
+    Recomputes the stored recommendations after `jobs` (ids) and
+    `candidates` ((kind, id) keys) changed, or all of them with `full`.
+    Returns the number of jobs, candidates and rows rewritten.
+    """
+    global _engine
+    k = k or settings.RECOMMENDATIONS_TOP_K
+    if full:
+        engine = _engine = RecommendationEngine()
+        Recommendation.objects.exclude(job_id__in=list(engine.job_rows)).delete()
+        jobs, candidates = list(engine.job_rows), list(engine.candidates)
+    else:
+        engine, expired = get_recommendation_engine(jobs, candidates)
+        jobs, candidates = affected(engine, set(jobs) | expired, candidates, k)
+    written = rewrite(engine, sorted(jobs), sorted(candidates), k)
+    return {"jobs": len(jobs), "candidates": len(candidates), "rows": written}
+
+
+def process_refresh_queue(limit=500):
+    """
+    Takes up to `limit` queued refreshes, skipping rows other workers hold,
+    and applies them in one pass. The queue rows are deleted in the same
+    transaction, so a failed pass leaves them for the next one.
+    """
+    with transaction.atomic():
+        queued = list(
+            RecommendationRefresh.objects.select_for_update(skip_locked=True).order_by(
+                "id"
+            )[:limit]
+        )
+        if not queued:
+            return None
+        jobs = {entry.job_id for entry in queued if entry.job_id}
+        candidates = {
+            (kind, getattr(entry, f"{kind}_id"))
+            for entry in queued
+            for kind in CANDIDATE_KINDS
+            if getattr(entry, f"{kind}_id")
+        }
+        result = refresh_recommendations(jobs, candidates)
+        RecommendationRefresh.objects.filter(
+            id__in=[entry.id for entry in queued]
+        ).delete()
+    return result
@@ -0,0 +1,104 @@
+# jobbriz/search.py
+
+import re
+
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+# Text search configuration used for the search vectors and queries
+SEARCH_CONFIG = "english"
+# Title matches rank above requirements, requirements above description
+JOB_SEARCH_VECTOR = (
+    SearchVector("title", weight="A", config=SEARCH_CONFIG)
+    + SearchVector("requirements", weight="B", config=SEARCH_CONFIG)
+    + SearchVector("description", weight="C", config=SEARCH_CONFIG)
+)
+# ts_rank's default weights for A, B and C, used by the fallback ranking
+FIELD_WEIGHTS = {"title": 1.0, "requirements": 0.4, "description": 0.2}
+# Columns JOB_SEARCH_VECTOR is computed from
+SEARCH_FIELDS = set(FIELD_WEIGHTS)
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+HIGHLIGHT_WORDS = 30
+
+
+def uses_postgres_search():
+    return connection.vendor == "postgresql"
+
+
+def refresh_search_vector(job):
+    if uses_postgres_search():
+        type(job).objects.filter(pk=job.pk).update(search_vector=JOB_SEARCH_VECTOR)
+
+
+def search_jobs(queryset, keywords, headline=True):
+    """
+    Filters `queryset` to the jobs matching `keywords`, annotating their
+    relevance as `rank` and, on PostgreSQL unless `headline` is False, a
+    highlighted description snippet as `search_headline`.
+    """
+    if uses_postgres_search():
+        query = SearchQuery(keywords, search_type="websearch", config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+        if not headline:
+            return queryset
+        return queryset.annotate(
+            search_headline=SearchHeadline(
+                "description",
+                query,
+                config=SEARCH_CONFIG,
+                start_sel=HIGHLIGHT_START,
+                stop_sel=HIGHLIGHT_STOP,
+                max_words=HIGHLIGHT_WORDS,
+                min_words=HIGHLIGHT_WORDS // 2,
+            )
+        )
+
+    # Without tsvector support, match the phrase in any of the fields and
+    # rank by the weight of the fields it was found in
+    matches = {field: Q(**{f"{field}__icontains": keywords}) for field in FIELD_WEIGHTS}
+    rank = sum(
+        (
+            Case(
+                When(match, then=Value(FIELD_WEIGHTS[field])),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+            for field, match in matches.items()
+        ),
+        Value(0.0),
+    )
+    return queryset.filter(
+        matches["title"] | matches["requirements"] | matches["description"]
+    ).annotate(rank=rank)
+
+
+def highlight(text, keywords, words=HIGHLIGHT_WORDS):
+    """
+    Returns up to `words` words of `text` around the first keyword hit with
+    every hit wrapped in HIGHLIGHT_START/HIGHLIGHT_STOP, the same shape of
+    snippet as SearchHeadline.
+    """
+    terms = [re.escape(term) for term in keywords.split() if term]
+    if not text or not terms:
+        return text or ""
+    pattern = re.compile("|".join(terms), re.IGNORECASE)
+
+    tokens = text.split()
+    hit = next(
+        (index for index, token in enumerate(tokens) if pattern.search(token)), 0
+    )
+    start = max(0, min(hit - words // 3, len(tokens) - words))
+    snippet = " ".join(tokens[start : start + words])
+    return pattern.sub(
+        lambda match: f"{HIGHLIGHT_START}{match.group(0)}{HIGHLIGHT_STOP}", snippet
+    )
@@ -19,6 +19,7 @@ from .models import (
     Location,
     MajorGroup,
     MinorGroup,
+    Recommendation,
     SavedJob,
     Skill,
     SubMajorGroup,
@@ -26,6 +27,8 @@ from .models import (
     WorkInterest,
     WorkInterestHire,
 )
+from .search import highlight
+from .user_jobs import applied_jobs, has_job_seeker_profile, saved_job_ids
 
 
 class InternshipIndustrySerializer(serializers.ModelSerializer):
@@ -91,24 +94,20 @@ class JobListAllSerializer(serializers.ModelSerializer):
     total_applicant_count = serializers.SerializerMethodField()
     has_already_saved = serializers.SerializerMethodField()
     is_applied = serializers.SerializerMethodField()
+    search_highlight = serializers.SerializerMethodField()
 
-    def get_has_already_saved(self, obj):
-        # Check for annotated field first
-        if hasattr(obj, "has_already_saved_annotated"):
-            return obj.has_already_saved_annotated
+    def get_search_highlight(self, obj):
+        # Snippet annotated by the PostgreSQL search, built here otherwise
+        if hasattr(obj, "search_headline"):
+            return obj.search_headline
 
-        request = self.context.get("request")
-        if request and hasattr(request, "user") and request.user.is_authenticated:
-            try:
-                # Use prefetch cache if available
-                if hasattr(request.user, "saved_jobs_cache"):
-                    return obj.id in request.user.saved_jobs_cache
-                return SavedJob.objects.filter(
-                    job=obj, job_seeker=request.user
-                ).exists()
-            except Exception:
-                return False
-        return False
+        keywords = self.context.get("keywords")
+        if keywords:
+            return highlight(obj.description, keywords)
+        return None
+
+    def get_has_already_saved(self, obj):
+        return obj.id in saved_job_ids(self.context.get("request"))
 
     def get_total_applicant_count(self, obj):
         # Check for annotated field first
@@ -118,22 +117,7 @@ class JobListAllSerializer(serializers.ModelSerializer):
         return getattr(obj, "applications_count", 0)
 
     def get_is_applied(self, obj):
-        # Check for annotated field first
-        if hasattr(obj, "is_applied_annotated"):
-            return obj.is_applied_annotated
-
-        request = self.context.get("request")
-        if request and hasattr(request, "user") and request.user.is_authenticated:
-            try:
-                # Use prefetch cache if available
-                if hasattr(request.user, "applied_jobs_cache"):
-                    return obj.id in request.user.applied_jobs_cache
-                return JobApplication.objects.filter(
-                    job=obj, applicant=request.user
-                ).exists()
-            except Exception:
-                return False
-        return False
+        return obj.id in applied_jobs(self.context.get("request"))
 
     class Meta:
         model = JobPost
@@ -157,10 +141,51 @@ class JobListAllSerializer(serializers.ModelSerializer):
             "has_already_saved",
             "total_applicant_count",
             "is_applied",
+            "search_highlight",
         ]
         depth = 2
 
 
+class JobCardSerializer(serializers.ModelSerializer):
+    """
+    Flat job board card for the lean listing, read from the job row and its
+    unit group only.
+    """
+
+    unit_group_code = serializers.CharField(read_only=True)
+    unit_group_title = serializers.CharField(source="unit_group.title", read_only=True)
+    has_already_saved = serializers.SerializerMethodField()
+    is_applied = serializers.SerializerMethodField()
+
+    def get_has_already_saved(self, obj):
+        return obj.id in saved_job_ids(self.context.get("request"))
+
+    def get_is_applied(self, obj):
+        return obj.id in applied_jobs(self.context.get("request"))
+
+    class Meta:
+        model = JobPost
+        fields = [
+            "id",
+            "title",
+            "slug",
+            "company_name",
+            "location",
+            "employment_type",
+            "posted_date",
+            "deadline",
+            "show_salary",
+            "salary_range_min",
+            "salary_range_max",
+            "applications_count",
+            "views_count",
+            "unit_group_code",
+            "unit_group_title",
+            "has_already_saved",
+            "is_applied",
+        ]
+
+
 class JobPostListSerializer(serializers.ModelSerializer):
     applications_count = serializers.IntegerField(read_only=True)
     views_count = serializers.IntegerField(read_only=True)
@@ -203,31 +228,12 @@ class JobPostDetailSerializer(serializers.ModelSerializer):
     application_id = serializers.SerializerMethodField()
 
     def get_has_already_applied(self, obj):
-        # Check for annotated field first
-        if hasattr(obj, "has_already_applied_annotated"):
-            return obj.has_already_applied_annotated
-
-        request = self.context.get("request")
-        if request and hasattr(request, "user") and request.user.is_authenticated:
-            try:
-                return JobApplication.objects.filter(
-                    job=obj, applicant=request.user
-                ).exists()
-            except Exception:
-                return False
-        return False
+        return obj.id in applied_jobs(self.context.get("request"))
 
     def get_application_id(self, obj):
         request = self.context.get("request")
-        if request and hasattr(request, "user") and request.user.is_authenticated:
-            try:
-                _ = JobSeeker.objects.get(user=request.user)
-                application = JobApplication.objects.filter(
-                    job=obj, applicant=request.user
-                ).first()
-                return application.id if application else None
-            except JobSeeker.DoesNotExist:
-                return None
+        if has_job_seeker_profile(request):
+            return applied_jobs(request).get(obj.id)
         return None
 
     class Meta:
@@ -384,27 +390,12 @@ class HireJobPostListSerializer(serializers.ModelSerializer):
 
     def get_has_already_saved(self, obj):
         request = self.context.get("request")
-        if request and hasattr(request, "user") and request.user.is_authenticated:
-            try:
-                _ = JobSeeker.objects.get(user=request.user)
-                return SavedJob.objects.filter(
-                    job=obj, job_seeker=request.user
-                ).exists()
-            except JobSeeker.DoesNotExist:
-                return False
-        return False
+        return has_job_seeker_profile(request) and obj.id in saved_job_ids(request)
 
     def get_application_id(self, obj):
         request = self.context.get("request")
-        if request and hasattr(request, "user") and request.user.is_authenticated:
-            try:
-                _ = JobSeeker.objects.get(user=request.user)
-                application = JobApplication.objects.filter(
-                    job=obj, applicant=request.user
-                ).first()
-                return application.id if application else None
-            except JobSeeker.DoesNotExist:
-                return None
+        if has_job_seeker_profile(request):
+            return applied_jobs(request).get(obj.id)
         return None
 
     class Meta:
@@ -731,3 +722,39 @@ class WorkInterestHireSerializer(serializers.ModelSerializer):
         if request and hasattr(request, "user") and request.user.is_authenticated:
             validated_data["user"] = request.user
         return super().create(validated_data)
+
+
+class JobSeekerSmallSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobSeeker
+        fields = [
+            "id",
+            "slug",
+            "full_name",
+            "current_district",
+            "skill_levels",
+            "availability",
+        ]
+
+
+class WorkInterestSmallSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkInterest
+        fields = ["id", "title", "name", "proficiency_level", "availability"]
+
+
+class RecommendedCandidateSerializer(serializers.ModelSerializer):
+    job_seeker = JobSeekerSmallSerializer(read_only=True)
+    work_interest = WorkInterestSmallSerializer(read_only=True)
+
+    class Meta:
+        model = Recommendation
+        fields = ["score", "rank", "job_seeker", "work_interest"]
+
+
+class RecommendedJobSerializer(serializers.ModelSerializer):
+    job = JobCardSerializer(read_only=True)
+
+    class Meta:
+        model = Recommendation
+        fields = ["score", "job"]
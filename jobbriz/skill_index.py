@@ -0,0 +1,157 @@
+# jobbriz/skill_index.py
+
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Max, Value, When
+
+# Profile kinds indexed and the column of their skills through table
+PROFILES = {
+    "work_interest": "workinterest_id",
+    "job_seeker": "jobseeker_id",
+}
+SKILL_MODES = ("any", "all")
+
+
+def normalize_skill(name):
+    """Canonical spelling of a skill name: case-folded, single spaced."""
+    return " ".join((name or "").casefold().split())
+
+
+def parse_skills(value):
+    """Splits a comma separated skills parameter into normalized names."""
+    return [name for name in map(normalize_skill, (value or "").split(",")) if name]
+
+
+class SkillIndex:
+    """
+    Skill vocabulary and posting lists of the WorkInterest and JobSeeker
+    profiles. Skills that normalize to the same name share one term id, and
+    every term keeps the set of profile ids that list it per profile kind.
+    """
+
+    def __init__(self):
+        from .models import JobSeeker, Skill, WorkInterest
+
+        self.vocabulary = {}
+        term_of = {}
+        for skill_id, name in Skill.objects.values_list("id", "name"):
+            term_of[skill_id] = self.vocabulary.setdefault(
+                normalize_skill(name), len(self.vocabulary)
+            )
+
+        through = {
+            "work_interest": WorkInterest.skills.through,
+            "job_seeker": JobSeeker.skills.through,
+        }
+        self.postings = {}
+        for kind, column in PROFILES.items():
+            postings = {}
+            for profile_id, skill_id in through[kind].objects.values_list(
+                column, "skill_id"
+            ):
+                # Skills created after the vocabulary was read are skipped
+                if skill_id in term_of:
+                    postings.setdefault(term_of[skill_id], set()).add(profile_id)
+            self.postings[kind] = postings
+
+    def expand(self, name):
+        """Term ids whose name contains `name`, as the icontains filter did."""
+        return [term for text, term in self.vocabulary.items() if name in text]
+
+    def profiles_with(self, kind, name):
+        """Ids of the `kind` profiles with a skill whose name contains `name`."""
+        postings = self.postings[kind]
+        profiles = set()
+        for term in self.expand(normalize_skill(name)):
+            profiles |= postings.get(term, set())
+        return profiles
+
+    def match(self, kind, names, mode="any"):
+        """
+        Returns {profile id: number of `names` matched} for the `kind`
+        profiles matching any (or, in "all" mode, every) one of `names`.
+        """
+        names = list(dict.fromkeys(names))
+        counts = Counter()
+        for name in names:
+            counts.update(self.profiles_with(kind, name))
+        if mode == "all":
+            return {
+                profile: count
+                for profile, count in counts.items()
+                if count == len(names)
+            }
+        return dict(counts)
+
+
+def rank_by_skills(queryset, matches, *ordering):
+    """
+    Restricts `queryset` to the ids of `matches` ({id: matched skills}),
+    annotated as `skill_matches` and ordered by it, then by `ordering`.
+    """
+    ids_by_count = {}
+    for profile_id, count in matches.items():
+        ids_by_count.setdefault(count, []).append(profile_id)
+    skill_matches = Case(
+        *(
+            When(id__in=ids, then=Value(count))
+            for count, ids in sorted(ids_by_count.items())
+        ),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return (
+        queryset.filter(id__in=list(matches))
+        .annotate(skill_matches=skill_matches)
+        .order_by("-skill_matches", *ordering)
+    )
+
+
+_index = None
+_signature = None
+_checked_at = 0.0
+
+
+def table_signature():
+    from .models import JobSeeker, Skill, WorkInterest
+
+    return tuple(
+        tuple(model.objects.aggregate(count=Count("id"), last=Max("id")).values())
+        for model in (
+            Skill,
+            WorkInterest.skills.through,
+            JobSeeker.skills.through,
+        )
+    )
+
+
+def load_skill_index():
+    global _index, _signature, _checked_at
+    _signature = table_signature()
+    _index = SkillIndex()
+    _checked_at = time.monotonic()
+    return _index
+
+
+def get_skill_index():
+    """
+    Returns this process's skill index. It is loaded on first use and after
+    invalidate_skill_index(), which skill and profile skill edits call;
+    edits made by other processes show up once SKILL_INDEX_TTL has passed
+    and the skill tables' row counts or last ids moved.
+    """
+    global _checked_at
+    if _index is None:
+        return load_skill_index()
+    if time.monotonic() - _checked_at > settings.SKILL_INDEX_TTL:
+        if table_signature() != _signature:
+            return load_skill_index()
+        _checked_at = time.monotonic()
+    return _index
+
+
+def invalidate_skill_index():
+    global _index
+    _index = None
@@ -0,0 +1,105 @@
+# jobbriz/taxonomy.py
+
+import time
+
+from django.conf import settings
+
+# (level, parent field) from the top of the ISCO tree down
+LEVELS = [
+    ("major_groups", None),
+    ("sub_major_groups", "major_group"),
+    ("minor_groups", "sub_major_group"),
+    ("unit_groups", "minor_group"),
+]
+
+
+class ISCOTaxonomy:
+    """
+    The whole ISCO tree held in memory, with every group linked to its
+    parent object so the nested group serializers run without queries.
+    """
+
+    def __init__(self):
+        from .models import MajorGroup, MinorGroup, SubMajorGroup, UnitGroup
+
+        models = {
+            "major_groups": MajorGroup,
+            "sub_major_groups": SubMajorGroup,
+            "minor_groups": MinorGroup,
+            "unit_groups": UnitGroup,
+        }
+        self.groups = {}
+        parents = {}
+        for level, parent_field in LEVELS:
+            groups = list(models[level].objects.order_by("id"))
+            for group in groups:
+                if parent_field:
+                    parent = parents[getattr(group, f"{parent_field}_id")]
+                    setattr(group, parent_field, parent)
+            self.groups[level] = groups
+            parents = {group.id: group for group in groups}
+
+    @staticmethod
+    def parent_code(group, level):
+        parent_field = dict(LEVELS)[level]
+        return getattr(group, parent_field).code
+
+    def children_of(self, level, parent_codes):
+        """Groups of `level` whose parent has one of `parent_codes`."""
+        parent_codes = set(parent_codes)
+        return [
+            group
+            for group in self.groups[level]
+            if self.parent_code(group, level) in parent_codes
+        ]
+
+    def search(self, text):
+        """
+        Returns {level: [groups]} of the groups whose code starts with `text`
+        when it is all digits, or whose title contains it otherwise.
+        """
+        if text.isdigit():
+            return {
+                level: [group for group in groups if group.code.startswith(text)]
+                for level, groups in self.groups.items()
+            }
+        text = text.lower()
+        return {
+            level: [group for group in groups if text in group.title.lower()]
+            for level, groups in self.groups.items()
+        }
+
+
+def filter_groups(groups, search):
+    """
+    Applies SearchFilter's rules for search_fields ["title", "code"]: every
+    whitespace or comma separated term must be in the title or the code.
+    """
+    terms = [term.lower() for term in search.replace(",", " ").split()]
+    return [
+        group
+        for group in groups
+        if all(term in group.title.lower() or term in group.code for term in terms)
+    ]
+
+
+_taxonomy = None
+_loaded_at = 0.0
+
+
+def get_isco_taxonomy():
+    """
+    Returns this process's ISCO taxonomy. It is reloaded after
+    invalidate_isco_taxonomy(), which ISCO imports and group edits call,
+    and every ISCO_TAXONOMY_TTL seconds so other processes' edits show up.
+    """
+    global _taxonomy, _loaded_at
+    if _taxonomy is None or time.monotonic() - _loaded_at > settings.ISCO_TAXONOMY_TTL:
+        _taxonomy = ISCOTaxonomy()
+        _loaded_at = time.monotonic()
+    return _taxonomy
+
+
+def invalidate_isco_taxonomy():
+    global _taxonomy
+    _taxonomy = None
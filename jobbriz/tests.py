@@ -1,17 +1,41 @@
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from accounts.models import CustomUser
+from CIM import slugs as slug_module
 
 from .models import (
+    EmailOutbox,
+    JobApplication,
+    JobPost,
+    JobSeeker,
     MajorGroup,
     MinorGroup,
+    Recommendation,
+    RecommendationRefresh,
     Skill,
     SubMajorGroup,
     UnitGroup,
     WorkInterest,
 )
+from .recommendations import process_refresh_queue
+from .search import search_jobs
+from .skill_index import invalidate_skill_index
+from .taxonomy import invalidate_isco_taxonomy
 
 
 class WorkInterestTests(APITestCase):
@@ -100,3 +124,751 @@ class SkillTests(APITestCase):
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Skill.objects.count(), 1)
+
+
+class SkillSearchTests(APITestCase):
+    def setUp(self):
+        invalidate_skill_index()
+        self.user = CustomUser.objects.create_user(
+            username="employer", password="password123"
+        )
+        self.client.force_authenticate(user=self.user)
+        major_group = MajorGroup.objects.create(code="2", title="Professionals")
+        sub_major_group = SubMajorGroup.objects.create(
+            major_group=major_group, code="25", title="ICT Professionals"
+        )
+        minor_group = MinorGroup.objects.create(
+            sub_major_group=sub_major_group, code="251", title="Software Developers"
+        )
+        self.unit_group = UnitGroup.objects.create(
+            minor_group=minor_group, code="2512", title="Software Developers"
+        )
+        self.url = reverse("job:work-interest-list")
+        python, django, react = (
+            Skill.objects.create(name=name) for name in ("Python", "django ", "React")
+        )
+        # A second spelling of the same skill shares its vocabulary entry
+        self.python_again = Skill.objects.create(name=" python")
+        self.full_stack = self.create_interest("Full stack", python, django, react)
+        self.backend = self.create_interest("Backend", self.python_again, django)
+        self.frontend = self.create_interest("Frontend", react)
+
+    def create_interest(self, title, *skills):
+        interest = WorkInterest.objects.create(
+            unit_group=self.unit_group, title=title, proficiency_level="Expert"
+        )
+        interest.skills.add(*skills)
+        return interest
+
+    def result_ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [result["id"] for result in response.data["results"]]
+
+    def test_any_mode_ranks_by_matching_skills(self):
+        self.assertEqual(
+            self.result_ids({"skills": "python,DJANGO,react"}),
+            [self.full_stack.id, self.backend.id, self.frontend.id],
+        )
+
+    def test_all_mode_requires_every_skill(self):
+        self.assertEqual(
+            self.result_ids({"skills": "python,django", "skills_mode": "all"}),
+            [self.backend.id, self.full_stack.id],
+        )
+
+    def test_skill_names_match_substrings(self):
+        self.assertEqual(
+            self.result_ids({"skills": "reac"}), [self.frontend.id, self.full_stack.id]
+        )
+
+    def test_search_matches_titles_and_skills(self):
+        self.assertEqual(
+            self.result_ids({"search": "python"}),
+            [self.backend.id, self.full_stack.id],
+        )
+        self.assertEqual(self.result_ids({"search": "front react"}), [self.frontend.id])
+
+    def test_profile_skill_edits_refresh_the_index(self):
+        self.frontend.skills.add(self.python_again)
+        self.assertIn(self.frontend.id, self.result_ids({"skills": "python"}))
+
+    def test_job_seekers_rank_by_matching_skills(self):
+        python, django = Skill.objects.filter(name__in=["Python", "django "])
+        expert = JobSeeker.objects.create(full_name="Expert")
+        expert.skills.add(python, django)
+        novice = JobSeeker.objects.create(full_name="Novice")
+        novice.skills.add(python)
+        JobSeeker.objects.create(full_name="Other")
+
+        response = self.client.get(
+            reverse("job:jobseeker-list"), {"skills": "django,python"}
+        )
+
+        self.assertEqual(
+            [seeker["id"] for seeker in response.data["results"]],
+            [expert.id, novice.id],
+        )
+
+
+class JobPostTestCase(APITestCase):
+    def setUp(self):
+        major_group = MajorGroup.objects.create(code="2", title="Professionals")
+        sub_major_group = SubMajorGroup.objects.create(
+            major_group=major_group, code="25", title="ICT Professionals"
+        )
+        minor_group = MinorGroup.objects.create(
+            sub_major_group=sub_major_group, code="251", title="Software Developers"
+        )
+        self.unit_group = UnitGroup.objects.create(
+            minor_group=minor_group, code="2512", title="Software Developers"
+        )
+        self.url = reverse("job:job-list")
+
+    def create_job(self, title, description, requirements=""):
+        return JobPost.objects.create(
+            title=title,
+            description=description,
+            requirements=requirements,
+            unit_group=self.unit_group,
+            deadline=timezone.now() + timezone.timedelta(days=30),
+            employment_type="Full Time",
+        )
+
+
+class JobSearchTests(JobPostTestCase):
+    def test_relevance_ordering_weights_fields(self):
+        in_description = self.create_job("Backend Engineer", "We use Django daily")
+        in_requirements = self.create_job(
+            "Web Engineer", "Build APIs", requirements="Django experience"
+        )
+        in_title = self.create_job("Django Developer", "Build APIs")
+        self.create_job("Accountant", "Keep the books")
+
+        response = self.client.get(
+            self.url, {"keywords": "django", "ordering": "relevance"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [job["id"] for job in response.data["results"]],
+            [in_title.id, in_requirements.id, in_description.id],
+        )
+
+    def test_results_include_highlighted_snippet(self):
+        self.create_job("Backend Engineer", "We use Django daily")
+
+        response = self.client.get(self.url, {"keywords": "django"})
+
+        self.assertEqual(
+            response.data["results"][0]["search_highlight"],
+            "We use <mark>Django</mark> daily",
+        )
+
+    def test_default_ordering_is_newest_first(self):
+        older = self.create_job("Django Developer", "Build APIs")
+        newer = self.create_job("Backend Engineer", "We use Django daily")
+
+        response = self.client.get(self.url, {"keywords": "django"})
+
+        self.assertEqual(
+            [job["id"] for job in response.data["results"]], [newer.id, older.id]
+        )
+
+    def test_search_vector_only_follows_searched_columns(self):
+        job = self.create_job("Django Developer", "Build APIs")
+
+        with mock.patch("jobbriz.models.refresh_search_vector") as refresh:
+            job.views_count += 1
+            job.save(update_fields=["views_count"])
+            refresh.assert_not_called()
+
+            job.save(update_fields=["views_count", "requirements"])
+            refresh.assert_called_once_with(job)
+
+
+class JobClassificationTests(JobPostTestCase):
+    def test_job_stores_isco_ancestry(self):
+        job = self.create_job("Django Developer", "Build APIs")
+        self.assertEqual(
+            (
+                job.major_group_code,
+                job.sub_major_group_code,
+                job.minor_group_code,
+                job.unit_group_code,
+            ),
+            ("2", "25", "251", "2512"),
+        )
+
+    def test_classification_filters(self):
+        job = self.create_job("Django Developer", "Build APIs")
+
+        for params, expected in [
+            ({"major_groups": "1,2"}, [job.id]),
+            ({"sub_major_groups": "25"}, [job.id]),
+            ({"minor_groups": "251", "unit_groups": "2512"}, [job.id]),
+            ({"major_groups": "1"}, []),
+        ]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(
+                [result["id"] for result in response.data["results"]], expected
+            )
+
+    def test_sync_follows_hierarchy_changes(self):
+        job = self.create_job("Django Developer", "Build APIs")
+        other_major = MajorGroup.objects.create(code="3", title="Technicians")
+        SubMajorGroup.objects.filter(code="25").update(major_group=other_major)
+
+        JobPost.sync_isco_codes()
+
+        job.refresh_from_db()
+        self.assertEqual(job.major_group_code, "3")
+
+    def test_group_edits_cascade_to_jobs(self):
+        job = self.create_job("Django Developer", "Build APIs")
+        other = self.create_job("Database Designer", "Design schemas")
+        other.unit_group = UnitGroup.objects.create(
+            minor_group=MinorGroup.objects.create(
+                sub_major_group=SubMajorGroup.objects.get(code="25"),
+                code="252",
+                title="Database Professionals",
+            ),
+            code="2521",
+            title="Database Designers",
+        )
+        other.save()
+
+        minor_group = MinorGroup.objects.get(code="251")
+        minor_group.code = "259"
+        minor_group.save()
+        unit_group = UnitGroup.objects.get(code="2512")
+        unit_group.code = "2599"
+        unit_group.save()
+        sub_major_group = SubMajorGroup.objects.get(code="25")
+        sub_major_group.major_group = MajorGroup.objects.create(
+            code="3", title="Technicians"
+        )
+        sub_major_group.save()
+
+        job.refresh_from_db()
+        self.assertEqual(
+            (
+                job.major_group_code,
+                job.sub_major_group_code,
+                job.minor_group_code,
+                job.unit_group_code,
+            ),
+            ("3", "25", "259", "2599"),
+        )
+        other.refresh_from_db()
+        self.assertEqual(
+            (other.major_group_code, other.minor_group_code, other.unit_group_code),
+            ("3", "252", "2521"),
+        )
+
+
+class LeanJobListTests(JobPostTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        posted_date = timezone.now()
+        self.jobs = [
+            self.create_job(f"Job {index}", "Build APIs") for index in range(5)
+        ]
+        # Two jobs share a timestamp so ties are broken by id
+        JobPost.objects.filter(pk__in=[job.pk for job in self.jobs[:2]]).update(
+            posted_date=posted_date
+        )
+
+    def test_keyset_pages_cover_every_job_once(self):
+        ids = []
+        response = self.client.get(self.url, {"mode": "lean", "page_size": 2})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["count"], 5)
+            ids.extend(job["id"] for job in response.data["results"])
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        expected = sorted(
+            JobPost.objects.values_list("posted_date", "id"), reverse=True
+        )
+        self.assertEqual(ids, [pk for _, pk in expected])
+
+    def test_card_is_flat(self):
+        response = self.client.get(self.url, {"mode": "lean"})
+        card = response.data["results"][0]
+        self.assertEqual(card["unit_group_code"], "2512")
+        self.assertEqual(card["unit_group_title"], "Software Developers")
+        self.assertNotIn("user", card)
+
+    def test_anonymous_page_is_one_query_with_cached_count(self):
+        self.client.get(self.url, {"mode": "lean"})
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {"mode": "lean"})
+
+    def test_lean_search_skips_headlines(self):
+        with mock.patch("jobbriz.views.search_jobs", wraps=search_jobs) as search:
+            self.client.get(self.url, {"mode": "lean", "keywords": "APIs"})
+            self.client.get(self.url, {"keywords": "APIs"})
+        self.assertEqual(
+            [call.kwargs["headline"] for call in search.call_args_list],
+            [False, True],
+        )
+
+
+ISCO_CSV = """ISCO 08 Code,Title EN,Definition
+2,Professionals,Increase knowledge
+25,ICT Professionals,Research and develop ICT
+251,Software Developers,Design software
+2512,Software Developers,Write code
+2513,Web Developers,Build websites
+"""
+
+
+class ISCOImportTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username="admin", password="password123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("job:upload_isco_data")
+
+    def upload(self, content):
+        upload = SimpleUploadedFile("isco.csv", content.encode(), "text/csv")
+        return self.client.post(self.url, {"file": upload})
+
+    def test_upload_builds_hierarchy(self):
+        response = self.upload(ISCO_CSV)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["counts"]["UnitGroup"]["created"], 2)
+        unit_group = UnitGroup.objects.select_related(
+            "minor_group__sub_major_group__major_group"
+        ).get(code="2513")
+        self.assertEqual(unit_group.minor_group.sub_major_group.major_group.code, "2")
+        self.assertEqual(unit_group.slug, "web-developers")
+
+    def test_reimport_updates_titles_and_keeps_slugs(self):
+        self.upload(ISCO_CSV)
+        response = self.upload(
+            ISCO_CSV.replace("Web Developers", "Web and Multimedia Developers")
+        )
+
+        self.assertEqual(response.data["counts"]["UnitGroup"]["updated"], 2)
+        self.assertEqual(
+            UnitGroup.objects.get(code="2513").slug, "web-and-multimedia-developers"
+        )
+        self.assertEqual(UnitGroup.objects.get(code="2512").slug, "software-developers")
+
+    def test_unknown_parent_rolls_back(self):
+        response = self.upload(ISCO_CSV + "9999,Orphans,No parent\n")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(MajorGroup.objects.exists())
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as csv_file:
+            csv_file.write(ISCO_CSV)
+            csv_file.flush()
+            call_command("import_isco", csv_file.name, stdout=StringIO())
+
+        self.assertEqual(UnitGroup.objects.count(), 2)
+
+
+class SlugAllocationTests(APITestCase):
+    def test_popular_titles_get_next_suffix(self):
+        for _ in range(3):
+            MajorGroup.objects.create(code=str(MajorGroup.objects.count()), title="A")
+        MajorGroup.objects.filter(slug="a-1").delete()
+
+        self.assertEqual(
+            MajorGroup.objects.create(code="8", title="A").slug,
+            "a-1",
+        )
+        self.assertEqual(
+            MajorGroup.objects.create(code="9", title="A").slug,
+            "a-3",
+        )
+
+    def test_unsluggable_title_falls_back_to_model_name(self):
+        MajorGroup.objects.create(code="1", title="Managers")
+        first = MajorGroup.objects.create(code="2", title="!!!")
+        second = MajorGroup.objects.create(code="3", title="???")
+
+        self.assertEqual((first.slug, second.slug), ("majorgroup", "majorgroup-1"))
+
+    def test_unchanged_title_keeps_slug_without_queries(self):
+        MajorGroup.objects.create(code="1", title="Managers")
+        group = MajorGroup.objects.get(code="1")
+        group.description = "Plan and direct"
+
+        # Only the UPDATE itself
+        with self.assertNumQueries(1):
+            group.save()
+
+        group.title = "Chief Managers"
+        group.save()
+        self.assertEqual(group.slug, "chief-managers")
+
+    def test_retries_when_a_concurrent_insert_takes_the_slug(self):
+        MajorGroup.objects.create(code="1", title="Managers")
+        real_next_free_slug = slug_module.next_free_slug
+        results = iter(["managers"])
+
+        def racing_next_free_slug(*args):
+            # The first lookup misses a row inserted concurrently
+            return next(results, None) or real_next_free_slug(*args)
+
+        with mock.patch.object(slug_module, "next_free_slug", racing_next_free_slug):
+            group = MajorGroup.objects.create(code="2", title="Managers")
+
+        self.assertEqual(group.slug, "managers-1")
+
+
+class ISCOTaxonomyTests(JobPostTestCase):
+    def setUp(self):
+        invalidate_isco_taxonomy()
+        super().setUp()
+        MinorGroup.objects.create(
+            sub_major_group=SubMajorGroup.objects.get(code="25"),
+            code="252",
+            title="Database and Network Professionals",
+        )
+
+    def test_group_search_is_served_from_memory(self):
+        url = reverse("job:groups-search")
+        self.client.get(url, {"search_group": "25"})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"search_group": "software"})
+
+        self.assertEqual(response.data["counts"]["total"], 2)
+        self.assertEqual(
+            response.data["results"]["unit_groups"],
+            [{"code": "2512", "title": "Software Developers"}],
+        )
+
+    def test_children_listing_is_served_from_memory(self):
+        url = reverse("job:minor-group-list")
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, {"sub_major_groups": "25", "search": "network"}
+            )
+
+        results = response.data["results"]
+        self.assertEqual([group["code"] for group in results], ["252"])
+        self.assertEqual(results[0]["sub_major_group"]["major_group"]["code"], "2")
+
+    def test_edits_invalidate_the_cache(self):
+        url = reverse("job:groups-search")
+        self.client.get(url, {"search_group": "software"})
+
+        unit_group = UnitGroup.objects.get(code="2512")
+        unit_group.title = "Application Programmers"
+        unit_group.save()
+
+        response = self.client.get(url, {"search_group": "programmers"})
+        self.assertEqual(response.data["counts"]["unit_groups"], 1)
+
+
+@override_settings(ADMIN_EMAIL=None)
+class EmailOutboxTests(JobPostTestCase):
+    def setUp(self):
+        super().setUp()
+        self.job = self.create_job("Django Developer", "Build APIs")
+        JobPost.objects.filter(pk=self.job.pk).update(email_to="hr@test.com")
+        self.applicant = CustomUser.objects.create_user(
+            username="applicant", email="applicant@test.com", password="password123"
+        )
+        self.client.force_authenticate(user=self.applicant)
+
+    def apply(self):
+        return self.client.post(
+            reverse("job:job-apply", args=[self.job.slug]),
+            {"cover_letter": "Hello"},
+            format="json",
+        )
+
+    def test_application_is_queued_not_sent(self):
+        response = self.apply()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(mail.outbox, [])
+        email = EmailOutbox.objects.get()
+        self.assertEqual(
+            (email.kind, email.object_id, email.status),
+            ("job_application", response.data["id"], "Pending"),
+        )
+
+    def test_worker_sends_queued_messages_over_one_connection(self):
+        self.apply()
+
+        with mock.patch(
+            "jobbriz.models.get_connection", wraps=mail.get_connection
+        ) as get_connection:
+            call_command("send_jobbriz_emails", "--once", stdout=StringIO())
+
+        get_connection.assert_called_once()
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["applicant@test.com", "hr@test.com"],
+        )
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.status, "Sent")
+        self.assertEqual(EmailOutbox.send_pending(), (0, 0))
+
+    def test_failed_send_is_retried_with_backoff(self):
+        self.apply()
+        now = timezone.now()
+
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=ConnectionError("SMTP down"),
+        ):
+            self.assertEqual(EmailOutbox.send_pending(now=now), (0, 1))
+
+        email = EmailOutbox.objects.get()
+        self.assertEqual((email.status, email.attempts), ("Pending", 1))
+        self.assertEqual(email.next_attempt_at, now + EmailOutbox.RETRY_DELAY)
+        self.assertEqual(EmailOutbox.send_pending(now=now), (0, 0))
+
+        sent, failed = EmailOutbox.send_pending(now=email.next_attempt_at)
+        self.assertEqual((sent, failed), (1, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_retry_skips_delivered_messages(self):
+        self.apply()
+        now = timezone.now()
+        send_messages = locmem.EmailBackend.send_messages
+
+        def fail_after_first(backend, messages):
+            if mail.outbox:
+                raise ConnectionError("SMTP down")
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, "send_messages", fail_after_first):
+            self.assertEqual(EmailOutbox.send_pending(now=now), (0, 1))
+        self.assertEqual(EmailOutbox.objects.get().messages_sent, 1)
+
+        retry_at = now + EmailOutbox.RETRY_DELAY
+        self.assertEqual(EmailOutbox.send_pending(now=retry_at), (1, 0))
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["applicant@test.com", "hr@test.com"],
+        )
+
+    def test_unreachable_smtp_server_is_recorded(self):
+        self.apply()
+        connection = mock.MagicMock()
+        connection.open.side_effect = ConnectionRefusedError("SMTP unreachable")
+
+        with mock.patch("jobbriz.models.get_connection", return_value=connection):
+            self.assertEqual(EmailOutbox.send_pending(), (0, 1))
+
+        email = EmailOutbox.objects.get()
+        self.assertEqual(
+            (email.status, email.attempts, email.messages_sent, email.error),
+            ("Pending", 1, 0, "SMTP unreachable"),
+        )
+
+
+class RecommendationTests(JobPostTestCase):
+    def setUp(self):
+        super().setUp()
+        self.employer = CustomUser.objects.create_user(
+            username="employer", password="password123"
+        )
+        self.job = self.create_job(
+            "Django Developer", "Build APIs", requirements="Python, Django"
+        )
+        JobPost.objects.filter(pk=self.job.pk).update(
+            user=self.employer, location="Kathmandu"
+        )
+        python, django = (
+            Skill.objects.create(name=name) for name in ("Python", "Django")
+        )
+
+        self.seeker_user = CustomUser.objects.create_user(
+            username="seeker", password="password123"
+        )
+        self.seeker = JobSeeker.objects.create(
+            user=self.seeker_user, preferred_locations="Kathmandu"
+        )
+        self.seeker.preferred_unit_groups.add(self.unit_group)
+        self.seeker.skills.add(python, django)
+        self.interest = WorkInterest.objects.create(
+            unit_group=self.unit_group, title="Python dev", proficiency_level="Expert"
+        )
+        self.interest.skills.add(python)
+        # Shares no occupation, skill or location with the job
+        JobSeeker.objects.create(full_name="Unrelated")
+
+        call_command("refresh_recommendations", "--full", stdout=StringIO())
+        RecommendationRefresh.objects.all().delete()
+
+    def recommended_job_ids(self):
+        self.client.force_authenticate(user=self.seeker_user)
+        response = self.client.get(reverse("job:recommended-jobs"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [entry["job"]["id"] for entry in response.data]
+
+    def test_candidates_are_ranked_for_the_poster(self):
+        self.client.force_authenticate(user=self.employer)
+        response = self.client.get(
+            reverse("job:job-recommended-candidates", args=[self.job.slug])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (entry["job_seeker"] or {}).get("id")
+                or ("interest", entry["work_interest"]["id"])
+                for entry in response.data
+            ],
+            [self.seeker.id, ("interest", self.interest.id)],
+        )
+        self.assertEqual(response.data[0]["score"], 100)
+
+    def test_only_the_poster_sees_candidates(self):
+        self.client.force_authenticate(user=self.seeker_user)
+        response = self.client.get(
+            reverse("job:job-recommended-candidates", args=[self.job.slug])
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_recommended_jobs_for_me(self):
+        self.assertEqual(self.recommended_job_ids(), [self.job.id])
+
+    def test_expired_jobs_are_not_recommended(self):
+        # Updated behind the worker's back, as passing the deadline does
+        JobPost.objects.filter(pk=self.job.pk).update(
+            deadline=timezone.now() - timezone.timedelta(days=1)
+        )
+        self.assertEqual(self.recommended_job_ids(), [])
+
+    def test_job_changes_are_applied_incrementally(self):
+        new_job = self.create_job("Python Engineer", "Scripts", requirements="Python")
+        self.assertTrue(RecommendationRefresh.objects.filter(job=new_job).exists())
+
+        process_refresh_queue()
+
+        self.assertEqual(self.recommended_job_ids(), [self.job.id, new_job.id])
+        self.assertFalse(RecommendationRefresh.objects.exists())
+
+        self.job.status = "Closed"
+        self.job.save()
+        process_refresh_queue()
+
+        self.assertEqual(self.recommended_job_ids(), [new_job.id])
+
+    @override_settings(RECOMMENDATIONS_ENGINE_SECONDS=60 * 24 * 3600)
+    def test_worker_updates_its_engine_in_place(self):
+        new_job = self.create_job("Python Engineer", "Scripts", requirements="Python")
+        after_deadline = self.job.deadline + timezone.timedelta(minutes=1)
+        new_job.deadline = after_deadline + timezone.timedelta(days=1)
+        new_job.save()
+
+        with (
+            mock.patch("django.utils.timezone.now", return_value=after_deadline),
+            mock.patch(
+                "jobbriz.recommendations.RecommendationEngine",
+                side_effect=AssertionError("engine rebuilt"),
+            ),
+        ):
+            process_refresh_queue()
+            self.assertEqual(self.recommended_job_ids(), [new_job.id])
+        self.assertFalse(Recommendation.objects.filter(job=self.job).exists())
+
+
+class UserJobFlagsTests(JobPostTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.jobs = [
+            self.create_job(f"Job {index}", "Build APIs") for index in range(4)
+        ]
+        self.seeker = CustomUser.objects.create_user(
+            username="seeker", password="password123", user_type="Job Seeker"
+        )
+        self.client.force_authenticate(user=self.seeker)
+
+    def flags(self):
+        response = self.client.get(self.url)
+        return {
+            job["id"]: (job["has_already_saved"], job["is_applied"])
+            for job in response.data["results"]
+        }
+
+    def test_listing_flags_come_from_the_users_job_ids(self):
+        self.client.post(reverse("job:save-job-toggle", args=[self.jobs[0].slug]))
+        self.client.post(
+            reverse("job:job-apply", args=[self.jobs[1].slug]), {}, format="json"
+        )
+
+        flags = self.flags()
+
+        self.assertEqual(flags[self.jobs[0].id], (True, False))
+        self.assertEqual(flags[self.jobs[1].id], (False, True))
+        self.assertEqual(flags[self.jobs[2].id], (False, False))
+
+    def test_flags_cost_one_query_each_per_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        flag_queries = [
+            query["sql"]
+            for query in queries
+            if "jobbriz_savedjob" in query["sql"]
+            or "jobbriz_jobapplication" in query["sql"]
+        ]
+        self.assertEqual(len(flag_queries), 2)
+
+    @override_settings(USER_JOBS_CACHE_SECONDS=60)
+    def test_shared_cache_is_dropped_by_toggling(self):
+        self.assertEqual(self.flags()[self.jobs[0].id], (False, False))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("job:save-job-toggle", args=[self.jobs[0].slug]))
+        self.assertEqual(self.flags()[self.jobs[0].id], (True, False))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("job:save-job-toggle", args=[self.jobs[0].slug]))
+        self.assertEqual(self.flags()[self.jobs[0].id], (False, False))
+
+
+class JobApplicationExportTests(JobPostTestCase):
+    def setUp(self):
+        super().setUp()
+        self.employer = CustomUser.objects.create_user(
+            username="employer", password="password123"
+        )
+        self.job = self.create_job("Django Developer", "Build APIs")
+        JobPost.objects.filter(pk=self.job.pk).update(user=self.employer)
+        self.applicant = CustomUser.objects.create_user(
+            username="applicant", password="password123", email="a@example.com"
+        )
+        JobApplication.objects.create(
+            job=self.job, applicant=self.applicant, cover_letter="Hire me, please"
+        )
+        self.url = reverse("job:job-application-export", args=[self.job.slug])
+
+    def test_poster_downloads_applications(self):
+        self.client.force_authenticate(user=self.employer)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="job_applications.csv"',
+        )
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:2], ["Job", "Applicant"])
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"Hire me, please"', lines[1])
+
+    def test_other_users_cannot_export(self):
+        self.client.force_authenticate(user=self.applicant)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -53,7 +53,23 @@ urlpatterns = [
         "jobs/<slug:slug>/view/", views.JobPostViewCountView.as_view(), name="job-view"
     ),
     path("applied-jobs/", views.AppliedJobsView.as_view(), name="applied-jobs"),
+    # Recommendations
+    path(
+        "jobs/<slug:slug>/recommended-candidates/",
+        views.RecommendedCandidatesView.as_view(),
+        name="job-recommended-candidates",
+    ),
+    path(
+        "recommended-jobs/",
+        views.RecommendedJobsView.as_view(),
+        name="recommended-jobs",
+    ),
     # Job Applications
+    path(
+        "jobs/<slug:slug>/applications/export/",
+        views.JobApplicationExportView.as_view(),
+        name="job-application-export",
+    ),
     path(
         "jobs/<slug:job_slug>/apply/",
         views.JobApplicationCreateView.as_view(),
@@ -0,0 +1,79 @@
+# jobbriz/user_jobs.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def cache_key(kind, user_id):
+    return f"jobbriz:{kind}-jobs:{user_id}"
+
+
+def load(kind, user_id):
+    from .models import JobApplication, SavedJob
+
+    if kind == "saved":
+        return dict.fromkeys(
+            SavedJob.objects.filter(job_seeker_id=user_id).values_list(
+                "job_id", flat=True
+            )
+        )
+    return dict(
+        JobApplication.objects.filter(applicant_id=user_id).values_list("job_id", "id")
+    )
+
+
+def cached_load(kind, user_id):
+    if not settings.USER_JOBS_CACHE_SECONDS:
+        return load(kind, user_id)
+    key = cache_key(kind, user_id)
+    jobs = cache.get(key)
+    if jobs is None:
+        jobs = load(kind, user_id)
+        cache.set(key, jobs, settings.USER_JOBS_CACHE_SECONDS)
+    return jobs
+
+
+def user_jobs(request, kind):
+    """
+    Returns {job id: application id} of the jobs the request's user applied
+    to (kind "applied") or {job id: None} of the jobs they saved ("saved").
+    Read once per request, from the shared cache when
+    USER_JOBS_CACHE_SECONDS is set.
+    """
+    user = getattr(request, "user", None)
+    if not user or not user.is_authenticated:
+        return {}
+
+    memo = getattr(request, "_jobbriz_user_jobs", None)
+    if memo is None:
+        memo = request._jobbriz_user_jobs = {}
+    if kind not in memo:
+        memo[kind] = cached_load(kind, user.id)
+    return memo[kind]
+
+
+def saved_job_ids(request):
+    return user_jobs(request, "saved").keys()
+
+
+def applied_jobs(request):
+    return user_jobs(request, "applied")
+
+
+def has_job_seeker_profile(request):
+    from .models import JobSeeker
+
+    if not getattr(request, "user", None) or not request.user.is_authenticated:
+        return False
+    if not hasattr(request, "_jobbriz_has_profile"):
+        request._jobbriz_has_profile = JobSeeker.objects.filter(
+            user=request.user
+        ).exists()
+    return request._jobbriz_has_profile
+
+
+def invalidate_user_jobs(kind, user_id):
+    """Drops a user's cached job ids once the current transaction commits."""
+    if user_id:
+        transaction.on_commit(lambda: cache.delete(cache_key(kind, user_id)))
@@ -6,12 +6,13 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
 
-def send_job_application_emails(application):
+def job_application_emails(application):
     """
-    Sends email notifications for a new job application.
+    Builds the email notifications for a new job application.
     1. To the Company: Notification with applicant summary.
     2. To the Applicant: Confirmation of receipt.
     """
+    messages = []
     job = application.job
     job_poster = job.user
     user = application.applicant
@@ -43,7 +44,7 @@ def send_job_application_emails(application):
         [user.email],
     )
     msg_applicant.attach_alternative(html_content_applicant, "text/html")
-    msg_applicant.send()
+    messages.append(msg_applicant)
 
     # --- 2. Email to Company or email_to (Priority: email_to > user.email) ---
     recipient_email = job.email_to or (job_poster.email if job_poster else None)
@@ -89,7 +90,7 @@ def send_job_application_emails(application):
             [recipient_email],
         )
         msg_company.attach_alternative(html_content_company, "text/html")
-        msg_company.send()
+        messages.append(msg_company)
 
     # --- 3. Separate Email to Admin ---
     if settings.ADMIN_EMAIL:
@@ -116,15 +117,18 @@ def send_job_application_emails(application):
             [settings.ADMIN_EMAIL],
         )
         msg_admin.attach_alternative(html_content_admin, "text/html")
-        msg_admin.send()
+        messages.append(msg_admin)
 
+    return messages
 
-def send_internship_registration_emails(job_seeker):
+
+def internship_registration_emails(job_seeker):
     """
-    Sends email notifications for a new internship registration.
+    Builds the email notifications for a new internship registration.
     1. To the Job Seeker: Confirmation.
     2. To the Industry: Notification (if industry email exists).
     """
+    messages = []
     industry = job_seeker.internship_industry
     current_year = date.today().year
 
@@ -151,7 +155,7 @@ def send_internship_registration_emails(job_seeker):
             [job_seeker.email],
         )
         msg_seeker.attach_alternative(html_content_seeker, "text/html")
-        msg_seeker.send()
+        messages.append(msg_seeker)
 
     # --- 2. Email to Industry ---
     if industry and industry.email:
@@ -174,7 +178,7 @@ def send_internship_registration_emails(job_seeker):
             [industry.email],
         )
         msg_industry.attach_alternative(html_content_industry, "text/html")
-        msg_industry.send()
+        messages.append(msg_industry)
 
     # --- 3. Separate Email to Admin ---
     if settings.ADMIN_EMAIL:
@@ -197,15 +201,18 @@ def send_internship_registration_emails(job_seeker):
             [settings.ADMIN_EMAIL],
         )
         msg_admin.attach_alternative(html_content_admin, "text/html")
-        msg_admin.send()
+        messages.append(msg_admin)
+
+    return messages
 
 
-def send_apprenticeship_application_emails(application):
+def apprenticeship_application_emails(application):
     """
-    Sends email notifications for a new apprenticeship application.
+    Builds the email notifications for a new apprenticeship application.
     1. To the Applicant: Confirmation.
     2. To the Preferred Industries: Notification.
     """
+    messages = []
     current_year = date.today().year
 
     # --- 1. Email to Applicant ---
@@ -231,7 +238,7 @@ def send_apprenticeship_application_emails(application):
             [application.email_address],
         )
         msg_applicant.attach_alternative(html_content_applicant, "text/html")
-        msg_applicant.send()
+        messages.append(msg_applicant)
 
     # --- 2. Email to Industries ---
     pref_industries = [
@@ -266,7 +273,7 @@ def send_apprenticeship_application_emails(application):
             list(industry_emails),
         )
         msg_industry.attach_alternative(html_content_industry, "text/html")
-        msg_industry.send()
+        messages.append(msg_industry)
 
     # --- 3. Separate Email to Admin ---
     if settings.ADMIN_EMAIL:
@@ -291,15 +298,18 @@ def send_apprenticeship_application_emails(application):
             [settings.ADMIN_EMAIL],
         )
         msg_admin.attach_alternative(html_content_admin, "text/html")
-        msg_admin.send()
+        messages.append(msg_admin)
 
+    return messages
 
-def send_work_interest_hire_emails(hire_request):
+
+def work_interest_hire_emails(hire_request):
     """
-    Sends email notifications for a new work interest hire request.
+    Builds the email notifications for a new work interest hire request.
     1. To the Professional: Notification.
     2. To the Hirer: Confirmation.
     """
+    messages = []
     work_interest = hire_request.work_interest
     professional_user = work_interest.user
     current_year = date.today().year
@@ -344,7 +354,7 @@ def send_work_interest_hire_emails(hire_request):
             [professional_email],
         )
         msg_prof.attach_alternative(html_content_prof, "text/html")
-        msg_prof.send()
+        messages.append(msg_prof)
 
     # --- 3. Separate Email to Admin ---
     if settings.ADMIN_EMAIL:
@@ -377,7 +387,7 @@ def send_work_interest_hire_emails(hire_request):
             [settings.ADMIN_EMAIL],
         )
         msg_admin.attach_alternative(html_content_admin, "text/html")
-        msg_admin.send()
+        messages.append(msg_admin)
 
     # --- 2. Email to Hirer ---
     hirer_email = hire_request.email or (
@@ -418,4 +428,6 @@ def send_work_interest_hire_emails(hire_request):
             [hirer_email],
         )
         msg_hirer.attach_alternative(html_content_hirer, "text/html")
-        msg_hirer.send()
+        messages.append(msg_hirer)
+
+    return messages
@@ -1,24 +1,38 @@
-import csv
+import hashlib
+from base64 import b64decode, b64encode
 from io import TextIOWrapper
+from urllib.parse import urlencode
 
-from django.db import models
-from django.db.models import Exists, F, OuterRef, Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters import rest_framework as django_filters
 from rest_framework import filters, generics, parsers, permissions, status, views
-from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.exceptions import (
+    APIException,
+    NotFound,
+    PermissionDenied,
+    ValidationError,
+)
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
+from CIM.exports import ExportView
 from jobbriz.serializers import WorkInterestListSerializer
 
+from .isco_import import ISCOImportError, import_isco, read_isco_csv
 from .models import (
     ApprenticeshipApplication,
     CareerHistory,
     Certification,
     Education,
+    EmailOutbox,
     HireRequest,
     Internship,
     InternshipIndustry,
@@ -29,6 +43,7 @@ from .models import (
     Location,
     MajorGroup,
     MinorGroup,
+    Recommendation,
     SavedJob,
     Skill,
     SubMajorGroup,
@@ -36,6 +51,7 @@ from .models import (
     WorkInterest,
     WorkInterestHire,
 )
+from .search import search_jobs
 from .serializers import (
     ApprenticeshipApplicationSerializer,
     CareerHistorySerializer,
@@ -48,6 +64,7 @@ from .serializers import (
     InternshipRegistrationSerializer,
     JobApplicationSerializer,
     JobApplicationStatusUpdateSerializer,
+    JobCardSerializer,
     JobListAllSerializer,
     JobPostDetailSerializer,
     JobPostListSerializer,
@@ -57,6 +74,8 @@ from .serializers import (
     LocationSerializer,
     MajorGroupSerializer,
     MinorGroupSerializer,
+    RecommendedCandidateSerializer,
+    RecommendedJobSerializer,
     SavedJobSerializer,
     SkillSerializer,
     SubMajorGroupSerializer,
@@ -65,12 +84,8 @@ from .serializers import (
     WorkInterestHireSerializer,
     WorkInterestSerializer,
 )
-from .utils import (
-    send_apprenticeship_application_emails,
-    send_internship_registration_emails,
-    send_job_application_emails,
-    send_work_interest_hire_emails,
-)
+from .skill_index import SKILL_MODES, get_skill_index, parse_skills, rank_by_skills
+from .taxonomy import filter_groups, get_isco_taxonomy
 
 
 class CustomPagination(PageNumberPagination):
@@ -79,6 +94,63 @@ class CustomPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class JobKeysetPagination(CustomPagination):
+    """
+    Keyset pagination over (posted_date, id) descending: every page is one
+    indexed range query, however deep, and no COUNT(*) is run. The view sets
+    `count` when it has a cached total to report.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    count = None
+
+    def encode_cursor(self, job):
+        position = f"{job.posted_date.isoformat()}|{job.id}"
+        return b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            posted_date, pk = b64decode(encoded).decode().split("|")
+            posted_date = parse_datetime(posted_date)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if posted_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return posted_date, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            posted_date, pk = cursor
+            queryset = queryset.filter(
+                Q(posted_date__lt=posted_date) | Q(posted_date=posted_date, id__lt=pk)
+            )
+
+        jobs = list(queryset.order_by("-posted_date", "-id")[: page_size + 1])
+        self.has_next = len(jobs) > page_size
+        page = jobs[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {"count": self.count, "next": self.get_next_link(), "results": data}
+        )
+
+
 class HasJobseekerProfileView(APIView):
     def get(self, request):
         return Response(JobSeeker.objects.filter(user=request.user).exists())
@@ -89,6 +161,19 @@ class JobSeekerListCreateView(generics.ListCreateAPIView):
     serializer_class = JobSeekerSerializer2
     permission_classes = (permissions.IsAuthenticated,)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?skills=python,django[&skills_mode=all] ranks job seekers by the
+        # number of the skills they list
+        skill_names = parse_skills(self.request.query_params.get("skills"))
+        if not skill_names:
+            return queryset
+        mode = self.request.query_params.get("skills_mode", "any")
+        if mode not in SKILL_MODES:
+            raise ValidationError({"skills_mode": f"Must be one of {SKILL_MODES}."})
+        matches = get_skill_index().match("job_seeker", skill_names, mode)
+        return rank_by_skills(queryset, matches, "id")
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
@@ -158,16 +243,13 @@ class InternshipRegistrationView(generics.ListCreateAPIView):
     parser_classes = (parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser)
     pagination_class = CustomPagination
 
+    @transaction.atomic
     def perform_create(self, serializer):
         # Save the job seeker profile
         job_seeker = serializer.save()
 
-        # Send email notifications
-        try:
-            send_internship_registration_emails(job_seeker)
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Failed to send internship registration emails: {e}")
+        # Email notifications are sent by the send_jobbriz_emails worker
+        EmailOutbox.queue("internship_registration", job_seeker)
 
 
 class InternshipDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -341,12 +423,46 @@ class CertificationDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
 
-class MajorGroupListCreateView(generics.ListCreateAPIView):
+class ISCOGroupListMixin:
+    """
+    Lists ISCO groups from the in-process taxonomy cache instead of the
+    database, applying the view's parent filter and `search` in memory.
+    """
+
+    taxonomy_level = None
+    # Query parameter holding the parent codes to list the children of
+    parent_codes_param = None
+
+    def list(self, request, *args, **kwargs):
+        taxonomy = get_isco_taxonomy()
+        groups = taxonomy.groups[self.taxonomy_level]
+        parent_codes = (
+            request.query_params.get(self.parent_codes_param)
+            if self.parent_codes_param
+            else None
+        )
+        if parent_codes:
+            groups = taxonomy.children_of(self.taxonomy_level, parent_codes.split(","))
+        search = request.query_params.get("search")
+        if search:
+            groups = filter_groups(groups, search)
+
+        page = self.paginate_queryset(groups)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(groups, many=True)
+        return Response(serializer.data)
+
+
+class MajorGroupListCreateView(ISCOGroupListMixin, generics.ListCreateAPIView):
     queryset = MajorGroup.objects.all()
     serializer_class = MajorGroupSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter]
     search_fields = ["title", "code"]
+    taxonomy_level = "major_groups"
 
 
 class MajorGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -356,19 +472,14 @@ class MajorGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = "slug"
 
 
-class SubMajorGroupListCreateView(generics.ListCreateAPIView):
+class SubMajorGroupListCreateView(ISCOGroupListMixin, generics.ListCreateAPIView):
     queryset = SubMajorGroup.objects.all()
     serializer_class = SubMajorGroupSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter]
     search_fields = ["title", "code"]
-
-    def get_queryset(self):
-        major_groups = self.request.query_params.get("major_groups")
-        if major_groups:
-            major_group_list = major_groups.split(",")
-            return SubMajorGroup.objects.filter(major_group__code__in=major_group_list)
-        return SubMajorGroup.objects.all()
+    taxonomy_level = "sub_major_groups"
+    parent_codes_param = "major_groups"
 
 
 class SubMajorGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -378,21 +489,14 @@ class SubMajorGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = "slug"
 
 
-class MinorGroupListCreateView(generics.ListCreateAPIView):
+class MinorGroupListCreateView(ISCOGroupListMixin, generics.ListCreateAPIView):
     queryset = MinorGroup.objects.all()
     serializer_class = MinorGroupSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter]
     search_fields = ["title", "code"]
-
-    def get_queryset(self):
-        sub_major_groups = self.request.query_params.get("sub_major_groups")
-        if sub_major_groups:
-            sub_major_group_list = sub_major_groups.split(",")
-            return MinorGroup.objects.filter(
-                sub_major_group__code__in=sub_major_group_list
-            )
-        return MinorGroup.objects.all()
+    taxonomy_level = "minor_groups"
+    parent_codes_param = "sub_major_groups"
 
 
 class MinorGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -402,18 +506,13 @@ class MinorGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = "slug"
 
 
-class UnitGroupListCreateView(generics.ListCreateAPIView):
+class UnitGroupListCreateView(ISCOGroupListMixin, generics.ListCreateAPIView):
     queryset = UnitGroup.objects.all()
     serializer_class = UnitGroupSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ["title", "code"]
-
-    def get_queryset(self):
-        minor_groups = self.request.query_params.get("minor_groups")
-        if minor_groups:
-            minor_group_list = minor_groups.split(",")
-            return UnitGroup.objects.filter(minor_group__code__in=minor_group_list)
-        return UnitGroup.objects.all()
+    taxonomy_level = "unit_groups"
+    parent_codes_param = "minor_groups"
 
 
 class UnitGroupDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -427,15 +526,83 @@ class JobPostListCreateView(generics.ListCreateAPIView):
     serializer_class = JobPostListSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = CustomPagination
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["title", "description"]
+
+    def get_keywords(self):
+        # `search` is accepted as an alias so both go through the same engine
+        params = self.request.query_params
+        return (params.get("keywords") or params.get("search") or "").strip()
+
+    # Columns read by JobCardSerializer in the lean listing
+    card_fields = [
+        "id",
+        "title",
+        "slug",
+        "company_name",
+        "location",
+        "employment_type",
+        "posted_date",
+        "deadline",
+        "show_salary",
+        "salary_range_min",
+        "salary_range_max",
+        "applications_count",
+        "views_count",
+        "unit_group_code",
+        "unit_group__title",
+    ]
+    # Query parameters that do not change which jobs are listed
+    page_params = {"cursor", "page", "page_size", "mode", "ordering"}
+
+    def is_lean(self):
+        # Relevance ordering has no stable keyset, so it keeps page numbers
+        params = self.request.query_params
+        return params.get("mode") == "lean" and not (
+            self.get_keywords() and params.get("ordering") == "relevance"
+        )
+
+    def cached_count(self, queryset):
+        """
+        Returns the number of listed jobs, cached per filter combination for
+        JOB_COUNT_CACHE_SECONDS so most pages run no COUNT(*).
+        """
+        filters_used = sorted(
+            (key, value)
+            for key, value in self.request.query_params.items()
+            if key not in self.page_params
+        )
+        key = (
+            "jobbriz:job-count:"
+            + hashlib.md5(urlencode(filters_used).encode()).hexdigest()
+        )
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.JOB_COUNT_CACHE_SECONDS)
+        return count
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
+
+        if self.is_lean():
+            paginator = JobKeysetPagination()
+            result_page = paginator.paginate_queryset(
+                queryset.select_related(None)
+                .select_related("unit_group")
+                .only(*self.card_fields),
+                request,
+            )
+            paginator.count = self.cached_count(queryset)
+            serializer = JobCardSerializer(
+                result_page, many=True, context={"request": request}
+            )
+            return paginator.get_paginated_response(serializer.data)
+
         paginator = self.pagination_class()
         result_page = paginator.paginate_queryset(queryset, request)
         serializer = JobListAllSerializer(
-            result_page, many=True, context={"request": request}
+            result_page,
+            many=True,
+            context={"request": request, "keywords": self.get_keywords()},
         )
         return paginator.get_paginated_response(serializer.data)
 
@@ -444,14 +611,14 @@ class JobPostListCreateView(generics.ListCreateAPIView):
             "user", "unit_group"
         )
 
-        # Keyword search
-        keywords = self.request.query_params.get("keywords")
+        # Keyword search, ranked title > requirements > description
+        keywords = self.get_keywords()
         if keywords:
-            queryset = queryset.filter(
-                models.Q(title__icontains=keywords)
-                | models.Q(description__icontains=keywords)
-                | models.Q(requirements__icontains=keywords)
-            )
+            # Job cards carry no snippet, so lean pages skip ts_headline
+            queryset = search_jobs(queryset, keywords, headline=not self.is_lean())
+        ordering = ["-posted_date"]
+        if keywords and self.request.query_params.get("ordering") == "relevance":
+            ordering = ["-rank", "-posted_date"]
 
         # ISCO Classification filters
         major_groups = self.request.query_params.get("major_groups")
@@ -463,25 +630,21 @@ class JobPostListCreateView(generics.ListCreateAPIView):
 
         if major_groups:
             major_group_list = major_groups.split(",")
-            classification_query &= models.Q(
-                unit_group__minor_group__sub_major_group__major_group__code__in=major_group_list
-            )
+            classification_query &= models.Q(major_group_code__in=major_group_list)
 
         if sub_major_groups:
             sub_major_group_list = sub_major_groups.split(",")
             classification_query &= models.Q(
-                unit_group__minor_group__sub_major_group__code__in=sub_major_group_list
+                sub_major_group_code__in=sub_major_group_list
             )
 
         if minor_groups:
             minor_group_list = minor_groups.split(",")
-            classification_query &= models.Q(
-                unit_group__minor_group__code__in=minor_group_list
-            )
+            classification_query &= models.Q(minor_group_code__in=minor_group_list)
 
         if unit_groups:
             unit_group_list = unit_groups.split(",")
-            classification_query &= models.Q(unit_group__code__in=unit_group_list)
+            classification_query &= models.Q(unit_group_code__in=unit_group_list)
 
         if classification_query:
             queryset = queryset.filter(classification_query)
@@ -521,23 +684,11 @@ class JobPostListCreateView(generics.ListCreateAPIView):
             if date_threshold:
                 queryset = queryset.filter(posted_date__gte=date_threshold)
 
-        # Annotations for optimized serialization
-        user = self.request.user
-        if user and user.is_authenticated:
-            queryset = queryset.annotate(
-                has_already_saved_annotated=Exists(
-                    SavedJob.objects.filter(job=OuterRef("pk"), job_seeker=user)
-                ),
-                is_applied_annotated=Exists(
-                    JobApplication.objects.filter(job=OuterRef("pk"), applicant=user)
-                ),
-            )
-
-        return (
-            queryset.annotate(total_applicant_count_annotated=F("applications_count"))
-            .order_by("-posted_date")
-            .distinct()
-        )
+        # Saved/applied flags are read from the user's cached job ids by the
+        # serializers
+        return queryset.annotate(
+            total_applicant_count_annotated=F("applications_count")
+        ).order_by(*ordering)
 
     def perform_create(self, serializer):
         unit_group = UnitGroup.objects.get(code=self.request.data.get("unit_group"))
@@ -549,23 +700,10 @@ class MyJobListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = JobPost.objects.filter(user=user).select_related(
-            "user", "unit_group"
-        )
-
-        if user and user.is_authenticated:
-            queryset = queryset.annotate(
-                has_already_saved_annotated=Exists(
-                    SavedJob.objects.filter(job=OuterRef("pk"), job_seeker=user)
-                ),
-                is_applied_annotated=Exists(
-                    JobApplication.objects.filter(job=OuterRef("pk"), applicant=user)
-                ),
-            )
-
-        return queryset.annotate(
-            total_applicant_count_annotated=F("applications_count")
+        return (
+            JobPost.objects.filter(user=self.request.user)
+            .select_related("user", "unit_group")
+            .annotate(total_applicant_count_annotated=F("applications_count"))
         )
 
 
@@ -574,16 +712,7 @@ class JobPostDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = "slug"
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = JobPost.objects.select_related("user", "unit_group")
-
-        if user and user.is_authenticated:
-            queryset = queryset.annotate(
-                has_already_applied_annotated=Exists(
-                    JobApplication.objects.filter(job=OuterRef("pk"), applicant=user)
-                ),
-            )
-        return queryset.annotate(
+        return JobPost.objects.select_related("user", "unit_group").annotate(
             total_applicant_count_annotated=F("applications_count")
         )
 
@@ -592,10 +721,62 @@ class JobPostViewCountView(views.APIView):
     def post(self, request, slug):
         job_post = get_object_or_404(JobPost, slug=slug)
         job_post.views_count = F("views_count") + 1
-        job_post.save()
+        job_post.save(update_fields=["views_count"])
         return Response(status=status.HTTP_200_OK)
 
 
+class RecommendedCandidatesView(generics.ListAPIView):
+    """
+    The stored best candidates for one of the requesting employer's jobs.
+    """
+
+    serializer_class = RecommendedCandidateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        job = get_object_or_404(JobPost, slug=self.kwargs["slug"])
+        if job.user_id != self.request.user.id and not self.request.user.is_staff:
+            raise PermissionDenied("Only the job's poster can see its candidates.")
+        return (
+            Recommendation.objects.filter(side="job", job=job)
+            .select_related("job_seeker", "work_interest")
+            .order_by("rank")
+        )
+
+
+class RecommendedJobsView(generics.ListAPIView):
+    """
+    The stored best jobs for the requesting user's job seeker and work
+    interest profiles, each job once with its best score. Jobs that closed
+    or passed their deadline since the last refresh are left out.
+    """
+
+    serializer_class = RecommendedJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        user = self.request.user
+        return (
+            Recommendation.objects.filter(
+                side="candidate",
+                job__status="Published",
+                job__deadline__gte=timezone.now(),
+            )
+            .filter(Q(job_seeker__user=user) | Q(work_interest__user=user))
+            .select_related("job__unit_group")
+            .order_by("-score", "job_id")
+        )
+
+    def list(self, request, *args, **kwargs):
+        recommendations = {}
+        for recommendation in self.get_queryset():
+            recommendations.setdefault(recommendation.job_id, recommendation)
+        top = list(recommendations.values())[: settings.RECOMMENDATIONS_TOP_K]
+        return Response(self.get_serializer(top, many=True).data)
+
+
 class JobApplicationCreateView(generics.CreateAPIView):
     serializer_class = JobApplicationSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -610,20 +791,17 @@ class JobApplicationCreateView(generics.CreateAPIView):
         if JobApplication.objects.filter(job=job, applicant=self.request.user).exists():
             raise ValidationError("You have already applied for this job")
 
-        # Create the application
-        application = serializer.save(applicant=self.request.user, job=job)
+        with transaction.atomic():
+            # Create the application
+            application = serializer.save(applicant=self.request.user, job=job)
 
-        # Update the applications count atomically
-        JobPost.objects.filter(pk=job.pk).update(
-            applications_count=models.F("applications_count") + 1
-        )
+            # Update the applications count atomically
+            JobPost.objects.filter(pk=job.pk).update(
+                applications_count=models.F("applications_count") + 1
+            )
 
-        # Send email notifications
-        try:
-            send_job_application_emails(application)
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Failed to send application emails: {e}")
+            # Email notifications are sent by the send_jobbriz_emails worker
+            EmailOutbox.queue("job_application", application)
 
 
 class AppliedJobsView(generics.ListAPIView):
@@ -665,6 +843,32 @@ class JobApplicationDetailView(generics.RetrieveUpdateAPIView):
         return JobApplication.objects.none()
 
 
+class JobApplicationExportView(ExportView):
+    """
+    Downloads the applications to one of the requesting employer's jobs.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    export_filename = "job_applications"
+    export_columns = [
+        ("Job", "job__title"),
+        ("Applicant", "applicant__username"),
+        ("First Name", "applicant__first_name"),
+        ("Last Name", "applicant__last_name"),
+        ("Email", "applicant__email"),
+        ("Phone", "applicant__phone_number"),
+        ("Status", "status"),
+        ("Applied Date", "applied_date"),
+        ("Cover Letter", "cover_letter"),
+    ]
+
+    def get_queryset(self):
+        job = get_object_or_404(JobPost, slug=self.kwargs["slug"])
+        if job.user_id != self.request.user.id and not self.request.user.is_staff:
+            raise PermissionDenied("Only the job's poster can export its applications.")
+        return JobApplication.objects.filter(job=job).order_by("applied_date", "id")
+
+
 class UpdateApplicationStatusView(generics.UpdateAPIView):
     serializer_class = JobApplicationStatusUpdateSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -792,102 +996,15 @@ class UploadISCODataView(APIView):
             csv_file_wrapper = TextIOWrapper(
                 csv_file.file, encoding="utf-8-sig"
             )  # Handle BOM with utf-8-sig
-            reader = csv.DictReader(csv_file_wrapper)
-
-            # Normalize headers (strip spaces, remove BOM, etc.)
-            reader.fieldnames = [
-                field.strip().replace("\ufeff", "") for field in reader.fieldnames
-            ]
-
-            for row in reader:
-                # Ensure required keys are present
-                if (
-                    "ISCO 08 Code" not in row
-                    or "Title EN" not in row
-                    or "Definition" not in row
-                ):
-                    return Response(
-                        {"error": "Missing required fields in CSV row."},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                code = row["ISCO 08 Code"].strip()
-                title = row["Title EN"].strip()
-                description = row["Definition"].strip()
-                code_length = len(code)
-
-                # Create or Get Major Group
-                if code_length == 1:
-                    major_group, _ = MajorGroup.objects.get_or_create(
-                        code=code,
-                        defaults={
-                            "title": title,
-                            "description": description,
-                            "slug": f"major-{code}",
-                        },
-                    )
-
-                # Create or Get Sub-Major Group
-                elif code_length == 2:
-                    major_group, _ = MajorGroup.objects.get_or_create(code=code[0])
-                    sub_major_group, _ = SubMajorGroup.objects.get_or_create(
-                        code=code,
-                        major_group=major_group,
-                        defaults={
-                            "title": title,
-                            "description": description,
-                            "slug": f"sub-major-{code}",
-                        },
-                    )
-
-                # Create or Get Minor Group
-                elif code_length == 3:
-                    sub_major_group, _ = SubMajorGroup.objects.get_or_create(
-                        code=code[:2]
-                    )
-                    minor_group, _ = MinorGroup.objects.get_or_create(
-                        code=code,
-                        sub_major_group=sub_major_group,
-                        defaults={
-                            "title": title,
-                            "description": description,
-                            "slug": f"minor-{code}",
-                        },
-                    )
-
-                # Create or Get Unit Group
-                elif code_length == 4:
-                    minor_group, _ = MinorGroup.objects.get_or_create(code=code[:3])
-                    UnitGroup.objects.get_or_create(
-                        code=code,
-                        minor_group=minor_group,
-                        defaults={
-                            "title": title,
-                            "description": description,
-                            "slug": f"unit-{code}",
-                        },
-                    )
+            counts = import_isco(read_isco_csv(csv_file_wrapper))
 
             return Response(
-                {"message": "Data uploaded successfully."},
+                {"message": "Data uploaded successfully.", "counts": counts},
                 status=status.HTTP_201_CREATED,
             )
 
-        except MajorGroup.DoesNotExist:
-            return Response(
-                {"error": "MajorGroup matching query does not exist"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        except SubMajorGroup.DoesNotExist:
-            return Response(
-                {"error": "SubMajorGroup matching query does not exist"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        except MinorGroup.DoesNotExist:
-            return Response(
-                {"error": "MinorGroup matching query does not exist"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        except ISCOImportError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -906,43 +1023,12 @@ class AllGroupsSearchView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Determine if search is by code (digits) or title (string)
-        is_code_search = search_group.isdigit()
-
-        if is_code_search:
-            query = models.Q(code__startswith=search_group)
-        else:
-            query = models.Q(title__icontains=search_group)
-
-        # Search in Major Groups (1-digit code)
-        major_groups = MajorGroup.objects.filter(query).values("code", "title")
-
-        # Search in Sub Major Groups (2-digit code)
-        sub_major_groups = SubMajorGroup.objects.filter(query).values("code", "title")
-
-        # Search in Minor Groups (3-digit code)
-        minor_groups = MinorGroup.objects.filter(query).values("code", "title")
-
-        # Search in Unit Groups (4-digit code)
-        unit_groups = UnitGroup.objects.filter(query).values("code", "title")
-
+        # Code prefix search for digits, title search otherwise, answered
+        # from the cached taxonomy
+        matches = get_isco_taxonomy().search(search_group)
         results = {
-            "major_groups": [
-                {"code": group["code"], "title": group["title"]}
-                for group in major_groups
-            ],
-            "sub_major_groups": [
-                {"code": group["code"], "title": group["title"]}
-                for group in sub_major_groups
-            ],
-            "minor_groups": [
-                {"code": group["code"], "title": group["title"]}
-                for group in minor_groups
-            ],
-            "unit_groups": [
-                {"code": group["code"], "title": group["title"]}
-                for group in unit_groups
-            ],
+            level: [{"code": group.code, "title": group.title} for group in groups]
+            for level, groups in matches.items()
         }
 
         # Add count information
@@ -975,15 +1061,12 @@ class ApprenticeshipApplicationCreateView(generics.CreateAPIView):
     permission_classes = (permissions.AllowAny,)
     parser_classes = (parsers.MultiPartParser, parsers.FormParser)
 
+    @transaction.atomic
     def perform_create(self, serializer):
         application = serializer.save()
 
-        # Send email notifications
-        try:
-            send_apprenticeship_application_emails(application)
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Failed to send apprenticeship application emails: {e}")
+        # Email notifications are sent by the send_jobbriz_emails worker
+        EmailOutbox.queue("apprenticeship_application", application)
 
 
 class ApprenticeshipApplicationListView(generics.ListAPIView):
@@ -1020,23 +1103,48 @@ class WorkInterestFilterSet(django_filters.FilterSet):
         field_name="availability", lookup_expr="exact"
     )
     skills = django_filters.CharFilter(method="filter_skills")
+    # "any" (default) matches profiles with one of the skills, "all" only
+    # those with every skill; both rank by the number of skills matched
+    skills_mode = django_filters.ChoiceFilter(
+        choices=[(mode, mode) for mode in SKILL_MODES], method="filter_skills_mode"
+    )
 
     class Meta:
         model = WorkInterest
         fields = []
 
     def filter_skills(self, queryset, name, value):
-        if not value:
-            return queryset
-        skill_names = [s.strip() for s in value.split(",") if s.strip()]
+        skill_names = parse_skills(value)
         if not skill_names:
             return queryset
 
-        query = Q()
-        for skill_name in skill_names:
-            query |= Q(skills__name__icontains=skill_name)
+        mode = self.form.cleaned_data.get("skills_mode") or "any"
+        matches = get_skill_index().match("work_interest", skill_names, mode)
+        return rank_by_skills(queryset, matches, "-created_at")
 
-        return queryset.filter(query).distinct()
+    def filter_skills_mode(self, queryset, name, value):
+        # Read by filter_skills
+        return queryset
+
+
+class SkillSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter over the title and the skills of work interests: every
+    search term must be in the title or in one of the profile's skills,
+    looked up in the skill index instead of joining the skills table.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        index = get_skill_index()
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term)
+                | Q(id__in=index.profiles_with("work_interest", term))
+            )
+        return queryset
 
 
 class WorkInterestListCreateView(generics.ListCreateAPIView):
@@ -1044,8 +1152,7 @@ class WorkInterestListCreateView(generics.ListCreateAPIView):
         "unit_group", "user"
     ).prefetch_related("skills")
     serializer_class = WorkInterestSerializer
-    filter_backends = [filters.SearchFilter, django_filters.DjangoFilterBackend]
-    search_fields = ["title", "skills__name"]
+    filter_backends = [SkillSearchFilter, django_filters.DjangoFilterBackend]
     filterset_class = WorkInterestFilterSet
 
     def get_serializer_class(self):
@@ -1082,11 +1189,7 @@ class WorkInterestHireCreateView(generics.CreateAPIView):
         work_interest_id = self.kwargs.get("pk")
         work_interest = get_object_or_404(WorkInterest, pk=work_interest_id)
 
-        hire_request = serializer.save(work_interest=work_interest)
-
-        # Send email notifications
-        try:
-            send_work_interest_hire_emails(hire_request)
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Failed to send hire request emails: {e}")
+        with transaction.atomic():
+            hire_request = serializer.save(work_interest=work_interest)
+            # Email notifications are sent by the send_jobbriz_emails worker
+            EmailOutbox.queue("work_interest_hire", hire_request)
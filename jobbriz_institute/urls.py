@@ -33,6 +33,11 @@ urlpatterns = [
         views.InstituteGraduateRosterListView.as_view(),
         name="institute-graduate-roster-list-create",
     ),
+    path(
+        "institute-graduates/export/",
+        views.GraduateRosterExportView.as_view(),
+        name="graduate-roster-export",
+    ),
     path(
         "institutes/verify/<str:uidb64>/<str:token>/",
         views.InstituteVerifyEmailView.as_view(),
@@ -9,6 +9,7 @@ from rest_framework import filters, generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from CIM.exports import ExportView
 from jobbriz_institute.serializers import GraduateRosterListSerializer
 
 from .filters import GraduateRosterFilter
@@ -168,3 +169,50 @@ class InstituteGraduateRosterListView(generics.ListAPIView):
     def get_queryset(self):
         institute = getattr(self.request.user, "institute", None)
         return GraduateRoster.objects.filter(institute=institute)
+
+
+class GraduateRosterExportView(ExportView):
+    """
+    Downloads the requesting institute's graduate roster, or every roster
+    for staff, narrowed by the GraduateRosterFilter parameters.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = GraduateRosterFilter
+    export_filename = "graduate_roster"
+    export_columns = [
+        ("Name", "name"),
+        ("Phone Number", "phone_number"),
+        ("Email", "email"),
+        ("Gender", "gender"),
+        ("Date of Birth", "date_of_birth"),
+        ("Institute", "institute__institute_name"),
+        ("Institute Name", "institute_name"),
+        ("Roster Type", "roster_type"),
+        ("Level Completed", "level_completed"),
+        ("Subject/Trade/Stream", "subject_trade_stream"),
+        ("Specialization/Key Skills", "specialization_key_skills"),
+        ("Passed Year", "passed_year"),
+        ("Certifying Agency", "certifying_agency"),
+        ("Certifying Agency Name", "certifying_agency_name"),
+        ("Certificate ID", "certificate_id"),
+        ("Job Status", "job_status"),
+        ("Available From", "available_from"),
+        ("Permanent Province", "permanent_province"),
+        ("Permanent District", "permanent_district"),
+        ("Permanent Municipality", "permanent_municipality"),
+        ("Permanent Ward", "permanent_ward"),
+        ("Current Province", "current_province"),
+        ("Current District", "current_district"),
+        ("Current Municipality", "current_municipality"),
+        ("Current Ward", "current_ward"),
+        ("Created At", "created_at"),
+    ]
+
+    def get_queryset(self):
+        queryset = GraduateRoster.objects.order_by("id")
+        if self.request.user.is_staff:
+            return queryset
+        institute = getattr(self.request.user, "institute", None)
+        return queryset.filter(institute=institute) if institute else queryset.none()
@@ -4,11 +4,17 @@ from .views import (
     AvailableSessionsView,
     TimeSlotByDateView,
     RegistrationDetailView,
+    RegistrationExportView,
     UpdateAttendanceView,
 )
 
 urlpatterns = [
     path("registrations/", RegistrationView.as_view(), name="registration-list"),
+    path(
+        "registrations/export/",
+        RegistrationExportView.as_view(),
+        name="registration-export",
+    ),
     path(
         "registrations/available-sessions/",
         AvailableSessionsView.as_view(),
@@ -9,6 +9,8 @@ from django.conf import settings
 from django.urls import reverse  # Import reverse to build URLs
 from django.http import HttpRequest  # Import HttpRequest if needed
 
+from CIM.exports import ExportView
+
 def send_confirmation_email(request: HttpRequest, registration, status):
         try:
 
@@ -98,6 +100,38 @@ class RegistrationView(generics.ListCreateAPIView):
 
 
 
+class RegistrationExportView(ExportView):
+    queryset = Registration.objects.order_by('id')
+    permission_classes = [permissions.IsAdminUser]
+    export_filename = 'rojgar_registrations'
+    export_columns = [
+        ('id', 'id'),
+        ('topic', 'time_slot__topic__name'),
+        ('date', 'time_slot__date'),
+        ('start_time', 'time_slot__start_time'),
+        ('end_time', 'time_slot__end_time'),
+        ('registration_type', 'registration_type'),
+        ('status', 'status'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('email', 'email'),
+        ('mobile_number', 'mobile_number'),
+        ('group_members', 'group_members'),
+        ('qualification', 'qualification'),
+        ('gender', 'gender'),
+        ('age', 'age'),
+        ('address', 'address'),
+        ('total_participants', 'total_participants'),
+        ('total_price', 'total_price'),
+        ('payment_method', 'payment_method'),
+        ('is_early_bird', 'is_early_bird'),
+        ('is_expo_access', 'is_expo_access'),
+        ('is_free_entry', 'is_free_entry'),
+        ('is_attended', 'is_attended'),
+        ('created_at', 'created_at'),
+    ]
+
+
 class RegistrationDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Registration.objects.all()
     serializer_class = RegistrationDetailSerializer
@@ -1,5 +1,7 @@
+from django import forms
 from django.contrib import admin
 from .models import StallBooking,SponsorBooking,ThematicSession, ThematicRegistration, GuidedTour, SubSession, Panelist
+from .occupancy import ACTIVE_STATUSES, StallUnavailable, parse_stall_numbers, taken_stall
 from unfold.admin import ModelAdmin
 from django.db import models
 # Register your models here.
@@ -37,7 +39,27 @@ class PanelistAdmin(ModelAdmin):
         models.TextField: {'widget': TinyMCE()},
     }
 
-admin.site.register(StallBooking,ModelAdmin)
+class StallBookingAdminForm(forms.ModelForm):
+    class Meta:
+        model = StallBooking
+        fields = "__all__"
+
+    def clean(self):
+        # Reports a stall another active booking holds on the form instead
+        # of failing the save with StallUnavailable
+        cleaned_data = super().clean()
+        stall_type = cleaned_data.get("stall_type")
+        stall_no = cleaned_data.get("stall_no")
+        if stall_type and stall_no and cleaned_data.get("status") in ACTIVE_STATUSES:
+            taken = taken_stall(stall_type, parse_stall_numbers(stall_no), self.instance)
+            if taken:
+                self.add_error("stall_no", str(StallUnavailable(stall_type, taken)))
+        return cleaned_data
+
+class StallBookingAdmin(ModelAdmin):
+    form = StallBookingAdminForm
+
+admin.site.register(StallBooking, StallBookingAdmin)
 admin.site.register(SponsorBooking,ModelAdmin)
 admin.site.register(ThematicSession, ThematicSessionAdmin)
 admin.site.register(ThematicRegistration,ModelAdmin)
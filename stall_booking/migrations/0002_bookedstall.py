@@ -0,0 +1,113 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:27
+
+import django.db.models.deletion
+from django.core.exceptions import ValidationError
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+from stall_booking.occupancy import ACTIVE_STATUSES, parse_stall_numbers
+
+
+def create_booked_stalls(apps, schema_editor):
+    StallBooking = apps.get_model("stall_booking", "StallBooking")
+    BookedStall = apps.get_model("stall_booking", "BookedStall")
+    # Approved bookings keep their stalls over pending ones, then oldest first;
+    # active stalls already held by another booking are left out
+    bookings = StallBooking.objects.annotate(
+        approved=Case(
+            When(status="Approved", then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by("approved", "id")
+    taken = set()
+    stalls = []
+    for booking in bookings.iterator():
+        try:
+            numbers = parse_stall_numbers(booking.stall_no)
+        except ValidationError:
+            # Holds no stalls until its stall_no is corrected and saved
+            continue
+        for number in numbers:
+            if booking.status in ACTIVE_STATUSES:
+                if (booking.stall_type, number) in taken:
+                    continue
+                taken.add((booking.stall_type, number))
+            stalls.append(
+                BookedStall(
+                    booking=booking,
+                    stall_type=booking.stall_type,
+                    stall_no=number,
+                    status=booking.status,
+                )
+            )
+    BookedStall.objects.bulk_create(stalls, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stall_booking", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookedStall",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "stall_type",
+                    models.CharField(
+                        choices=[
+                            ("National Prime", "National Prime"),
+                            ("National General", "National General"),
+                            ("International", "International"),
+                            ("Agro and MSME", "Agro and MSME"),
+                            ("Automobiles", "Automobiles"),
+                            ("Food Stalls", "Food Stalls"),
+                            ("BDS Providers Stall", "BDS Providers Stall"),
+                        ],
+                        max_length=200,
+                    ),
+                ),
+                ("stall_no", models.CharField(max_length=50)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("Pending", "Pending"),
+                            ("Approved", "Approved"),
+                            ("Rejected", "Rejected"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "booking",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stalls",
+                        to="stall_booking.stallbooking",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status__in", ("Approved", "Pending"))),
+                        fields=("stall_type", "stall_no"),
+                        name="unique_active_stall",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(create_booked_stalls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:56
+
+import stall_booking.occupancy
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("stall_booking", "0002_bookedstall"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="stallbooking",
+            name="stall_no",
+            field=models.CharField(
+                max_length=200,
+                validators=[stall_booking.occupancy.validate_stall_numbers],
+            ),
+        ),
+    ]
@@ -1,7 +1,17 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.mail import send_mail
 from django.conf import settings
 
+from .occupancy import (
+    ACTIVE_STATUSES,
+    STALL_NO_MAX_LENGTH,
+    StallUnavailable,
+    invalidate_floor_plan,
+    parse_stall_numbers,
+    taken_stall,
+    validate_stall_numbers,
+)
+
 class StallBooking(models.Model):
 
     STALL_TYPE_CHOICES = [
@@ -37,7 +47,7 @@ class StallBooking(models.Model):
 
     # Stall Information
     stall_type = models.CharField(max_length=200, choices=STALL_TYPE_CHOICES)
-    stall_no = models.CharField(max_length=200)
+    stall_no = models.CharField(max_length=200, validators=[validate_stall_numbers])
     merge_or_separate = models.CharField(max_length=100, choices=MERGE_CHOICES)
 
     # Payment Information
@@ -60,11 +70,81 @@ class StallBooking(models.Model):
     def has_paid_all(self):
         return self.remaining_amount == 0
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.sync_stalls()
+
+    def delete(self, *args, **kwargs):
+        invalidate_floor_plan(self.stall_type)
+        return super().delete(*args, **kwargs)
+
+    def sync_stalls(self):
+        """
+        Mirrors stall_no, stall_type and status onto the booking's
+        BookedStall rows. Raises StallUnavailable when an active booking
+        already holds one of the stalls.
+        """
+        numbers = parse_stall_numbers(self.stall_no)
+        stalls = {stall.stall_no: stall for stall in self.stalls.all()}
+        invalidate_floor_plan(
+            self.stall_type, *{stall.stall_type for stall in stalls.values()}
+        )
+        self.stalls.exclude(stall_no__in=numbers).delete()
+        try:
+            with transaction.atomic():
+                self.stalls.filter(stall_no__in=numbers).exclude(
+                    stall_type=self.stall_type, status=self.status
+                ).update(stall_type=self.stall_type, status=self.status)
+                BookedStall.objects.bulk_create(
+                    BookedStall(
+                        booking=self,
+                        stall_type=self.stall_type,
+                        stall_no=number,
+                        status=self.status,
+                    )
+                    for number in numbers
+                    if number not in stalls
+                )
+        except IntegrityError:
+            raise StallUnavailable(
+                self.stall_type, taken_stall(self.stall_type, numbers, self)
+            )
+
     class Meta:
         verbose_name = "Stall Booking"
         verbose_name_plural = "Stall Bookings"
 
 
+class BookedStall(models.Model):
+    """
+    One stall held by a StallBooking, kept in sync with the booking's
+    comma separated stall_no. An Approved or Pending stall can only be held
+    by one booking.
+    """
+
+    booking = models.ForeignKey(
+        StallBooking, on_delete=models.CASCADE, related_name="stalls"
+    )
+    stall_type = models.CharField(
+        max_length=200, choices=StallBooking.STALL_TYPE_CHOICES
+    )
+    stall_no = models.CharField(max_length=STALL_NO_MAX_LENGTH)
+    status = models.CharField(max_length=100, choices=StallBooking.STATUS)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["stall_type", "stall_no"],
+                condition=models.Q(status__in=ACTIVE_STATUSES),
+                name="unique_active_stall",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.stall_type} {self.stall_no}"
+
+
 class SponsorBooking(models.Model):
     STALL_TYPE_CHOICES = [
         ('Main Sponsor', 'Main Sponsor'),
@@ -0,0 +1,139 @@
+# stall_booking/occupancy.py
+
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+# Booking statuses that hold their stalls
+ACTIVE_STATUSES = ("Approved", "Pending")
+# Longest single stall number of a booking's stall_no
+STALL_NO_MAX_LENGTH = 50
+
+
+def parse_stall_numbers(stall_no):
+    """
+    Splits a booking's comma separated stall_no into distinct stall numbers.
+    Raises ValidationError for a number longer than STALL_NO_MAX_LENGTH.
+    """
+    numbers = [number.strip() for number in (stall_no or "").split(",")]
+    numbers = list(dict.fromkeys(number for number in numbers if number))
+    for number in numbers:
+        if len(number) > STALL_NO_MAX_LENGTH:
+            raise ValidationError(
+                f"Stall numbers can have at most {STALL_NO_MAX_LENGTH} "
+                f"characters ({number[:20]}...)."
+            )
+    return numbers
+
+
+def validate_stall_numbers(stall_no):
+    parse_stall_numbers(stall_no)
+
+
+def taken_stall(stall_type, numbers, booking=None):
+    """
+    Returns the first of `numbers` an active booking other than `booking`
+    holds in `stall_type`, None when all of them are free.
+    """
+    from .models import BookedStall
+
+    stalls = BookedStall.objects.filter(
+        stall_type=stall_type, stall_no__in=numbers, status__in=ACTIVE_STATUSES
+    )
+    if booking is not None and booking.pk:
+        stalls = stalls.exclude(booking=booking)
+    return stalls.values_list("stall_no", flat=True).first()
+
+
+class StallUnavailable(ValueError):
+    def __init__(self, stall_type, stall_no):
+        super().__init__(f"Stall {stall_no} ({stall_type}) is already booked")
+        self.stall_type = stall_type
+        self.stall_no = stall_no
+
+
+def cache_key(stall_type):
+    # Hash the exact value: stall types hold spaces and differ only by case
+    kind = "*" if stall_type is None else md5(stall_type.encode()).hexdigest()
+    return f"stall_booking:floor-plan:{kind}"
+
+
+def is_stall_type(stall_type):
+    from .models import StallBooking
+
+    return stall_type in dict(StallBooking.STALL_TYPE_CHOICES)
+
+
+def empty_floor_plan():
+    return {
+        "booked": [],
+        "pending": [],
+        "stall_no_booked": [],
+        "stall_no_pending": [],
+        "occupancy": {},
+    }
+
+
+def load_floor_plan(stall_type=None):
+    """
+    Builds the get_booked_stalls payload from the booked stall rows:
+    the Approved and Pending bookings ("booked", "pending") and their stall
+    numbers as [stall no, company, status] ("stall_no_booked",
+    "stall_no_pending"), plus "occupancy", {stall no: status} per stall type.
+    """
+    from .models import BookedStall
+
+    rows = BookedStall.objects.filter(status__in=ACTIVE_STATUSES)
+    if stall_type is not None:
+        rows = rows.filter(stall_type=stall_type)
+    rows = rows.order_by("booking_id", "id").values_list(
+        "stall_type",
+        "stall_no",
+        "status",
+        "booking_id",
+        "booking__company",
+        "booking__stall_no",
+    )
+
+    payload = empty_floor_plan()
+    bookings = set()
+    for kind, number, status, booking_id, company, booking_stall_no in rows:
+        suffix = "booked" if status == "Approved" else "pending"
+        if booking_id not in bookings:
+            bookings.add(booking_id)
+            payload[suffix].append(
+                {"company": company, "stall_no": booking_stall_no, "status": status}
+            )
+        payload[f"stall_no_{suffix}"].append([number, company, status])
+        payload["occupancy"].setdefault(kind, {})[number] = status
+    return payload
+
+
+def get_floor_plan(stall_type=None):
+    """
+    Returns load_floor_plan(stall_type), served from the cache for
+    STALL_FLOOR_PLAN_CACHE_SECONDS; booking changes drop the cached plans.
+    An unknown stall type has no stalls and gets an empty, uncached plan.
+    """
+    if stall_type is not None and not is_stall_type(stall_type):
+        return empty_floor_plan()
+    key = cache_key(stall_type)
+    payload = cache.get(key)
+    if payload is None:
+        payload = load_floor_plan(stall_type)
+        cache.set(key, payload, settings.STALL_FLOOR_PLAN_CACHE_SECONDS)
+    return payload
+
+
+def stall_status(stall_type, stall_no):
+    """Status of the booking holding a stall, None when it is free."""
+    return get_floor_plan(stall_type)["occupancy"].get(stall_type, {}).get(stall_no)
+
+
+def invalidate_floor_plan(*stall_types):
+    """Drops the cached plans of `stall_types` once the transaction commits."""
+    keys = [cache_key(None)] + [cache_key(kind) for kind in stall_types]
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -1,15 +1,17 @@
 from rest_framework import serializers
 from .models import StallBooking,SponsorBooking,ThematicSession,ThematicRegistration,GuidedTour,Invitation,SubSession,Panelist
+from .occupancy import StallUnavailable
 
 class StallBookingSerializer(serializers.ModelSerializer):
       class Meta:
          model = StallBooking
          fields = '__all__'
 
-class StallBookingSmallSerializer(serializers.ModelSerializer):
-      class Meta:
-         model = StallBooking
-         fields = ["company", "stall_no", "status"]
+      def save(self, **kwargs):
+         try:
+            return super().save(**kwargs)
+         except StallUnavailable as error:
+            raise serializers.ValidationError({"stall_no": [str(error)]})
 
 class SponsorBookingSerializer(serializers.ModelSerializer):
       class Meta:
@@ -1,3 +1,212 @@
-from django.test import TestCase
+import csv
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+from openpyxl import load_workbook
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .admin import StallBookingAdminForm
+from .models import BookedStall, StallBooking
+from .occupancy import (
+    STALL_NO_MAX_LENGTH,
+    StallUnavailable,
+    cache_key,
+    get_floor_plan,
+    parse_stall_numbers,
+    stall_status,
+)
+
+
+def book(stall_no, stall_type="National Prime", status="Pending", company="Acme"):
+    return StallBooking.objects.create(
+        company=company,
+        address="Biratnagar",
+        chief_executive="CEO",
+        phone="9800000000",
+        city="Biratnagar",
+        country="Nepal",
+        email="acme@example.com",
+        status=status,
+        stall_type=stall_type,
+        stall_no=stall_no,
+        merge_or_separate="Merge",
+        voucher="vouchers/voucher.pdf",
+        total_amount=100,
+        advance_amount=50,
+        remaining_amount=50,
+        amount_in_words="One hundred",
+    )
+
+
+class StallInventoryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_booking_syncs_stalls(self):
+        booking = book("1, 2,2")
+        self.assertEqual(
+            sorted(booking.stalls.values_list("stall_no", flat=True)), ["1", "2"]
+        )
+        booking.stall_no = "2,3"
+        booking.status = "Approved"
+        booking.save()
+        self.assertEqual(
+            sorted(booking.stalls.values_list("stall_no", "status")),
+            [("2", "Approved"), ("3", "Approved")],
+        )
+
+    def test_active_stall_cannot_be_booked_twice(self):
+        first = book("1,2")
+        with self.assertRaises(StallUnavailable):
+            book("2,3", company="Other")
+        self.assertEqual(StallBooking.objects.count(), 1)
+
+        # Same number in another hall, and freed stalls, can be booked
+        book("2", stall_type="International")
+        first.status = "Rejected"
+        first.save()
+        book("2,3", company="Other")
+
+        first.status = "Approved"
+        with self.assertRaises(StallUnavailable):
+            first.save()
+        first.refresh_from_db()
+        self.assertEqual(first.status, "Rejected")
+
+    @override_settings(MEDIA_ROOT=tempfile.gettempdir())
+    def test_conflicting_booking_is_rejected(self):
+        book("7")
+        response = self.client.post(
+            reverse("stall-list-create"),
+            {
+                "company": "Other",
+                "address": "Biratnagar",
+                "chief_executive": "CEO",
+                "phone": "9800000000",
+                "city": "Biratnagar",
+                "country": "Nepal",
+                "email": "other@example.com",
+                "stall_type": "National Prime",
+                "stall_no": "7",
+                "merge_or_separate": "Separate",
+                "voucher": SimpleUploadedFile("voucher.pdf", b"%PDF"),
+                "total_amount": 100,
+                "advance_amount": 50,
+                "remaining_amount": 50,
+                "amount_in_words": "One hundred",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["stall_no"], ["Stall 7 (National Prime) is already booked"]
+        )
+
+    def test_admin_form_reports_taken_stall(self):
+        book("7")
+        other = book("8", company="Other")
+        data = {
+            field.name: field.value_from_object(other)
+            for field in StallBooking._meta.fields
+            if field.editable and field.name not in ("id", "voucher")
+        }
+        voucher = {"voucher": SimpleUploadedFile("voucher.pdf", b"%PDF")}
+        form = StallBookingAdminForm(
+            {**data, "stall_no": "7,8"}, voucher, instance=other
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors["stall_no"], ["Stall 7 (National Prime) is already booked"]
+        )
+
+        form = StallBookingAdminForm(
+            {**data, "stall_no": "7,8", "status": "Rejected"},
+            voucher,
+            instance=other,
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_stall_numbers_are_length_checked(self):
+        with self.assertRaises(ValidationError):
+            parse_stall_numbers(f"1, {'9' * (STALL_NO_MAX_LENGTH + 1)}")
+        response = self.client.post(
+            reverse("stall-list-create"), {"stall_no": "1," + "9" * 60}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("at most 50 characters", response.data["stall_no"][0])
+
+    def test_floor_plan(self):
+        book("1,2", status="Approved")
+        book("3", company="Other")
+        book("4", company="Gone", status="Rejected")
+        book("1", stall_type="International")
+
+        response = self.client.get(
+            reverse("get booked stalls"), {"stall_type": "National Prime"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["booked"],
+            [{"company": "Acme", "stall_no": "1,2", "status": "Approved"}],
+        )
+        self.assertEqual(
+            response.data["stall_no_booked"],
+            [["1", "Acme", "Approved"], ["2", "Acme", "Approved"]],
+        )
+        self.assertEqual(response.data["stall_no_pending"], [["3", "Other", "Pending"]])
+        self.assertEqual(
+            response.data["occupancy"],
+            {"National Prime": {"1": "Approved", "2": "Approved", "3": "Pending"}},
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(stall_status("National Prime", "3"), "Pending")
+            self.assertIsNone(stall_status("National Prime", "4"))
+        self.assertEqual(len(get_floor_plan()["stall_no_booked"]), 2)
+        self.assertEqual(BookedStall.objects.count(), 5)
+
+    def test_unknown_stall_type_gets_uncached_empty_plan(self):
+        book("1", status="Approved")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_floor_plan("national prime")["occupancy"], {})
+        self.assertNotEqual(cache_key("national prime"), cache_key("National Prime"))
+        self.assertEqual(
+            get_floor_plan("National Prime")["occupancy"],
+            {"National Prime": {"1": "Approved"}},
+        )
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        book("1,2", status="Approved")
+        book("3", company="Other, Ltd")
+
+    def test_csv(self):
+        response = self.client.get(reverse("export"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(
+            csv.reader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual(rows[0][:3], ["stallno", "company", "phone"])
+        self.assertEqual(
+            [row[:2] for row in rows[1:]], [["1,2", "Acme"], ["3", "Other, Ltd"]]
+        )
+
+    def test_xlsx(self):
+        response = self.client.get(reverse("export"), {"file_format": "xlsx"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workbook = load_workbook(BytesIO(b"".join(response.streaming_content)))
+        rows = list(workbook.active.iter_rows(values_only=True))
+        self.assertEqual(rows[0][0], "stallno")
+        self.assertEqual([row[1] for row in rows[1:]], ["Acme", "Other, Ltd"])
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse("export"), {"file_format": "pdf"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -3,7 +3,7 @@ from . import views
 
 urlpatterns = [
    path('stall/',views.StallBookingListCreateView.as_view(),name='stall-list-create'),
-   path('export/',views.export,name='export'),
+   path('export/',views.StallBookingExportView.as_view(),name='export'),
    path('stall/<int:pk>/',views.StallBookingRetrieveUpdateDestroyView.as_view(),name='stall-retrieve-update-destroy'),
    path("get-booked-stalls/", views.get_booked_stalls, name="get booked stalls"),
    path('approve-stall/<int:pk>/',views.approve_stall,name='approve stall'),
@@ -15,6 +15,7 @@ urlpatterns = [
 
    # ThematicRegistration URLs
    path('thematic-registrations/', views.ThematicRegistrationListCreateView.as_view(), name='thematic-registration-list-create'),
+   path('thematic-registrations/export/', views.ThematicRegistrationExportView.as_view(), name='thematic-registration-export'),
    path('thematic-registrations/<int:pk>/', views.ThematicRegistrationRetrieveUpdateDestroyView.as_view(), name='thematic-registration-detail'),
 
    # GuidedTour URLs
@@ -1,29 +1,35 @@
 from django.template.loader import render_to_string
-from django.http import HttpResponse
 from .models import StallBooking,SponsorBooking,ThematicSession, ThematicRegistration, GuidedTour,Invitation, SubSession, Panelist
-from .serializers import StallBookingSerializer,StallBookingSmallSerializer,SponsorBookingSerializer,ThematicSessionSerializer, ThematicRegistrationSerializer, GuidedTourSerializer,InvitationSerializer, SubSessionSerializer, PanelistSerializer
+from .occupancy import StallUnavailable, get_floor_plan
+from .serializers import StallBookingSerializer,SponsorBookingSerializer,ThematicSessionSerializer, ThematicRegistrationSerializer, GuidedTourSerializer,InvitationSerializer, SubSessionSerializer, PanelistSerializer
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view
-import csv
 from django.core.mail import send_mail
 from django.conf import settings
-
-
-def export(request):
-    getrec = StallBooking.objects.all()
-    #csv
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="stallbooked.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['stallno','company','phone','email','status','stalltype','total_amount','advance_amount','remaining_amount','amount_in_words','created_at','updated_at'])
-
-    for rec in getrec:
-        writer.writerow([rec.stall_no,rec.company,rec.phone,rec.email,rec.status,rec.stall_type,rec.total_amount,rec.advance_amount,rec.remaining_amount,rec.amount_in_words,rec.created_at,rec.updated_at])
-        
-    return response
+from rest_framework import permissions
+
+from CIM.exports import ExportView, chunked
+
+
+class StallBookingExportView(ExportView):
+   queryset = StallBooking.objects.order_by('id')
+   export_filename = 'stallbooked'
+   export_columns = [
+      ('stallno', 'stall_no'),
+      ('company', 'company'),
+      ('phone', 'phone'),
+      ('email', 'email'),
+      ('status', 'status'),
+      ('stalltype', 'stall_type'),
+      ('total_amount', 'total_amount'),
+      ('advance_amount', 'advance_amount'),
+      ('remaining_amount', 'remaining_amount'),
+      ('amount_in_words', 'amount_in_words'),
+      ('created_at', 'created_at'),
+      ('updated_at', 'updated_at'),
+   ]
 
 
 class StallBookingListCreateView(generics.ListCreateAPIView):
@@ -38,7 +44,10 @@ class StallBookingRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIVie
 def approve_stall(request, pk):
    stall = StallBooking.objects.get(pk=pk)
    stall.status = 'Approved'
-   stall.save()
+   try:
+      stall.save()
+   except StallUnavailable as error:
+      return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
    return Response({'message': 'Stall Approved', 'status': status.HTTP_200_OK})
 
 @api_view(['POST'])
@@ -50,57 +59,10 @@ def reject_stall(request, pk):
 
 @api_view(['GET'])
 def get_booked_stalls(request):
+   # Approved and Pending bookings with their stall numbers and the
+   # occupancy map, served from the cached floor plan
    stall_type = request.GET.get('stall_type', None)
-   if stall_type is not None:
-      booked_stalls = StallBooking.objects.filter(status='Approved', stall_type=stall_type)
-      pending_booked = StallBooking.objects.filter(status='Pending', stall_type=stall_type)
-   else:
-      booked_stalls = StallBooking.objects.filter(status='Approved')
-      pending_booked = StallBooking.objects.filter(status='Pending')
-   
-   new_list = []
-   for stall in booked_stalls:
-      if stall.stall_no.__contains__(','):
-         stall_no = stall.stall_no.split(',')
-         for s in stall_no:
-            new_listx = []
-            new_listx.append(s)
-            new_listx.append(stall.company)
-            new_listx.append(stall.status)
-            new_list.append(new_listx)
-      else:
-         new_listx = []
-         new_listx.append(stall.stall_no)
-         new_listx.append(stall.company)
-         new_listx.append(stall.status)
-         new_list.append(new_listx)
-
-   #list to serialize
-   """ new_list_json  = json.dumps(new_list) """
-   
-   new_list2 = []
-   for stall in pending_booked:
-      if stall.stall_no.__contains__(','):
-         stall_no = stall.stall_no.split(',')
-         for s in stall_no:
-            new_list2x = []
-            new_list2x.append(s)
-            new_list2x.append(stall.company)
-            new_list2x.append(stall.status)
-            new_list2.append(new_list2x)
-      else:
-         new_list2x = []
-         new_list2x.append(stall.stall_no)
-         new_list2x.append(stall.company)
-         new_list2x.append(stall.status)
-         new_list2.append(new_list2x)
-
-   #list to serialize
-   """ new_list2_json  = json.dumps(new_list2) """
-
-   serializer = StallBookingSmallSerializer(booked_stalls, many=True)
-   serializer2 = StallBookingSmallSerializer(pending_booked, many=True) 
-   return Response({"booked": serializer.data, "pending": serializer2.data, "stall_no_booked": new_list,"stall_no_pending": new_list2}, status=status.HTTP_200_OK)
+   return Response(get_floor_plan(stall_type), status=status.HTTP_200_OK)
 
 
 class SponsorBookingListCreateView(generics.ListCreateAPIView):
@@ -135,6 +97,47 @@ class ThematicRegistrationListCreateView(generics.ListCreateAPIView):
         return ThematicRegistrationSerializer(registration).data
     
 
+class ThematicRegistrationExportView(ExportView):
+    queryset = ThematicRegistration.objects.order_by('id')
+    permission_classes = [permissions.IsAdminUser]
+    export_filename = 'thematic_registrations'
+    export_columns = [
+        ('name', 'name'),
+        ('organization', 'organization'),
+        ('designation', 'designation'),
+        ('address', 'address'),
+        ('email', 'email'),
+        ('contact', 'contact'),
+        ('participant', 'participant'),
+        ('arrival_date', 'arrival_date'),
+        ('departure_date', 'departure_date'),
+        ('flight_no', 'flight_no'),
+        ('flight_time', 'flight_time'),
+        ('return_flight_no', 'return_flight_no'),
+        ('return_flight_time', 'return_flight_time'),
+        ('airline', 'airline'),
+        ('food', 'food'),
+        ('hotel_accomodation', 'hotel_accomodation'),
+        ('check_in_date', 'check_in_date'),
+        ('check_out_date', 'check_out_date'),
+        ('hotel', 'hotel'),
+        ('status', 'status'),
+        ('sessions', 'id'),
+    ]
+
+    def export_rows(self, rows):
+        # The id column is replaced by the registration's session titles,
+        # read with one query per chunk
+        through = ThematicRegistration.sessions.through
+        for chunk in chunked(rows, 500):
+            sessions = {}
+            for registration_id, title in through.objects.filter(
+                thematicregistration_id__in=[row[-1] for row in chunk]
+            ).values_list('thematicregistration_id', 'thematicsession__title'):
+                sessions.setdefault(registration_id, []).append(title)
+            for row in chunk:
+                yield row[:-1] + (', '.join(sessions.get(row[-1], [])),)
+
 # RetrieveUpdateDestroy view for ThematicRegistration
 class ThematicRegistrationRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = ThematicRegistration.objects.all()
@@ -0,0 +1,173 @@
+# voting/leaderboard.py
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .running_session import get_running_session
+
+# Seconds without changes after which a comment is sent to keep the
+# connection open through proxies
+KEEPALIVE_SECONDS = 15
+
+
+def vote_order(question):
+    return (-(question["vote_count"] or 0), question["id"])
+
+
+class Leaderboard:
+    """
+    The running session's questions held in memory as serialized by
+    QuestionSerializer. load() brings them up to date with one small
+    query and bumps `version` when anything changed.
+    """
+
+    def __init__(self):
+        self.session_id = None
+        self.questions = {}
+        self.version = 0
+
+    def load(self):
+        from .models import Question
+        from .serializers import QuestionSerializer
+
+        running = get_running_session()
+        session_id = running["session_id"] if running else None
+        counts = {}
+        if session_id:
+            counts = dict(
+                Question.objects.filter(session=session_id).values_list(
+                    "id", "vote_count"
+                )
+            )
+
+        changed = session_id != self.session_id
+        if changed:
+            self.session_id = session_id
+            self.questions = {}
+        for question_id in set(self.questions) - set(counts):
+            del self.questions[question_id]
+            changed = True
+        new = [
+            question_id for question_id in counts if question_id not in self.questions
+        ]
+        for question in Question.objects.filter(id__in=new):
+            self.questions[question.id] = QuestionSerializer(question).data
+            changed = True
+        for question_id, vote_count in counts.items():
+            question = self.questions.get(question_id)
+            if question is not None and question["vote_count"] != vote_count:
+                question["vote_count"] = vote_count
+                changed = True
+
+        if changed:
+            self.version += 1
+        return changed
+
+    def top(self, size=None):
+        """The `size` most voted questions, all of them when size is falsy."""
+        questions = sorted(self.questions.values(), key=vote_order)
+        return questions[:size] if size else questions
+
+    def event(self, sent, size=None):
+        """
+        Returns the (name, payload) of the next event for a client that was
+        last sent `sent` (updated in place, {} before the first event), or
+        None when its top `size` did not change. The first event, and the
+        one after the running session changed, is a "snapshot" of the whole
+        top; later ones are "delta"s with the questions that entered or
+        changed and the ids of those that left.
+        """
+        top = self.top(size)
+        counts = {question["id"]: question["vote_count"] for question in top}
+        previous = sent.get("counts")
+        session_changed = sent.get("session") != self.session_id
+        sent.update(session=self.session_id, counts=counts)
+
+        if previous is None or session_changed:
+            return "snapshot", {"session": self.session_id, "questions": top}
+        changed = [
+            question
+            for question in top
+            if question["id"] not in previous
+            or previous[question["id"]] != question["vote_count"]
+        ]
+        removed = [question_id for question_id in previous if question_id not in counts]
+        if changed or removed:
+            return "delta", {"questions": changed, "removed": removed}
+        return None
+
+
+def server_sent_event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+
+
+class LeaderboardChannel:
+    """
+    Serves one Leaderboard to every stream of this process. While any
+    client is connected a single task reloads it every
+    VOTING_LEADERBOARD_SYNC_SECONDS and wakes the streams when it changed,
+    so the database load does not grow with the number of clients.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.board = Leaderboard()
+        self.updated = asyncio.Condition()
+        self.listeners = 0
+        self.task = None
+
+    async def sync(self):
+        if await sync_to_async(self.board.load)():
+            async with self.updated:
+                self.updated.notify_all()
+
+    async def run(self):
+        while self.listeners:
+            await asyncio.sleep(settings.VOTING_LEADERBOARD_SYNC_SECONDS)
+            if self.listeners:
+                await self.sync()
+
+    async def wait(self, version):
+        """Waits for the board to move past `version`; False on keepalive."""
+        async with self.updated:
+            try:
+                await asyncio.wait_for(
+                    self.updated.wait_for(lambda: self.board.version != version),
+                    KEEPALIVE_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def stream(self, size=None):
+        """Yields the server-sent events of the running session's top `size`."""
+        self.listeners += 1
+        try:
+            if self.task is None or self.task.done():
+                await self.sync()
+                self.task = asyncio.ensure_future(self.run())
+            sent = {}
+            while True:
+                version = self.board.version
+                event = self.board.event(sent, size)
+                if event:
+                    yield server_sent_event(*event)
+                if not await self.wait(version):
+                    yield ": keepalive\n\n"
+        finally:
+            self.listeners -= 1
+
+
+_channel = None
+
+
+def get_leaderboard_channel():
+    """Returns the leaderboard channel of the running event loop."""
+    global _channel
+    loop = asyncio.get_running_loop()
+    if _channel is None or _channel.loop is not loop:
+        _channel = LeaderboardChannel(loop)
+    return _channel
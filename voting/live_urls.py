@@ -0,0 +1,13 @@
+from django.urls import path
+
+from .views import LeaderboardStreamView
+
+# Long-lived streams, mounted under live/ which the proxy sends to the ASGI
+# "live" service instead of the gunicorn web workers
+urlpatterns = [
+    path(
+        "running-session/questions/stream/",
+        LeaderboardStreamView.as_view(),
+        name="leaderboard-stream",
+    ),
+]
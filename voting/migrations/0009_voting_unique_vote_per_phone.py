@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:20
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import F, Min
+
+
+def remove_duplicate_votes(apps, schema_editor):
+    Question = apps.get_model("voting", "Question")
+    Voting = apps.get_model("voting", "Voting")
+    keep = (
+        Voting.objects.values("question_id", "phone_number")
+        .annotate(keep_id=Min("id"))
+        .values_list("keep_id", flat=True)
+    )
+    duplicates = Voting.objects.exclude(id__in=list(keep))
+    # Duplicate votes were counted too
+    removed = Counter(duplicates.values_list("question_id", flat=True))
+    duplicates.delete()
+    for question_id, count in removed.items():
+        Question.objects.filter(id=question_id, vote_count__gte=count).update(
+            vote_count=F("vote_count") - count
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("voting", "0008_alter_session_is_acepting_questions"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_votes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="voting",
+            constraint=models.UniqueConstraint(
+                fields=("question", "phone_number"), name="unique_vote_per_phone"
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 
+from .running_session import invalidate_running_session
+
 # Create your models here.
  
 
@@ -22,6 +24,14 @@ class Session(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_running_session()
+
+    def delete(self, *args, **kwargs):
+        invalidate_running_session()
+        return super().delete(*args, **kwargs)
+
     def can_add_question(self):
         return self.is_acepting_questions  # Check if questions can be added
    
@@ -36,6 +46,11 @@ class RunningSession(models.Model):
         if not self.pk and RunningSession.objects.exists():
             raise ValueError("There can be only one RunningSession instance.")
         super().save(*args, **kwargs)
+        invalidate_running_session()
+
+    def delete(self, *args, **kwargs):
+        invalidate_running_session()
+        return super().delete(*args, **kwargs)
 
     def __str__(self):
         return self.session.title
@@ -46,5 +61,12 @@ class Voting(models.Model):
     phone_number=models.CharField(max_length=15)
     created_at=models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["question", "phone_number"], name="unique_vote_per_phone"
+            )
+        ]
+
     def __str__(self):
         return self.name + " voted on " + self.question.name
@@ -0,0 +1,38 @@
+# voting/running_session.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+CACHE_KEY = "voting:running-session"
+MISSING = object()
+
+
+def load_running_session():
+    from .models import RunningSession
+
+    return RunningSession.objects.values(
+        "id",
+        "session_id",
+        is_acepting_questions=F("session__is_acepting_questions"),
+    ).first()
+
+
+def get_running_session():
+    """
+    Returns {"id", "session_id", "is_acepting_questions"} of the
+    running session, or None when there is none. Served from the cache for
+    RUNNING_SESSION_CACHE_SECONDS; changing the running session or its
+    accept-questions flag drops the entry.
+    """
+    running = cache.get(CACHE_KEY, MISSING)
+    if running is MISSING:
+        running = load_running_session()
+        cache.set(CACHE_KEY, running, settings.RUNNING_SESSION_CACHE_SECONDS)
+    return running
+
+
+def invalidate_running_session():
+    """Drops the cached running session once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
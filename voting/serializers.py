@@ -10,6 +10,8 @@ class VotingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Voting
         fields = ['id', 'question', 'name', 'phone_number', 'created_at']
+        # Taken from the URL, see VotingCreateView
+        read_only_fields = ['question']
 
 class SessionSerializer(serializers.ModelSerializer):
     class Meta:
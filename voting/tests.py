@@ -1,3 +1,180 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .leaderboard import Leaderboard
+from .models import Question, RunningSession, Session, Voting
+from .running_session import get_running_session
+
+
+class VotingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = Session.objects.create(title="Town hall")
+        RunningSession.objects.create(session=self.session)
+        self.question = Question.objects.create(
+            name="Asker", phone_number="9800000000", question_text="When?"
+        )
+        self.session.questions.add(self.question)
+        self.url = reverse("vote-create", args=[self.question.id])
+
+    def vote(self, phone_number, name="Voter", url=None):
+        return self.client.post(
+            url or self.url, {"name": name, "phone_number": phone_number}
+        )
+
+    def test_vote_is_counted(self):
+        response = self.vote("9811111111")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["question"], self.question.id)
+        self.assertEqual(response.data["phone_number"], "9811111111")
+        self.vote("9822222222")
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.vote_count, 2)
+
+    def test_one_vote_per_phone(self):
+        self.vote("9811111111")
+        response = self.vote("9811111111", name="Someone else")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["error"], "You have already voted for this question"
+        )
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.vote_count, 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Voting.objects.create(
+                question=self.question, name="Again", phone_number="9811111111"
+            )
+
+    def test_rejected_votes(self):
+        response = self.vote(self.question.phone_number)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["error"], "You cannot vote for your own question"
+        )
+
+        response = self.vote("9811111111", url=reverse("vote-create", args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.vote("")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Voting.objects.exists())
+
+
+class LeaderboardTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = Session.objects.create(title="Town hall")
+        RunningSession.objects.create(session=self.session)
+        self.first = self.ask("First")
+        self.second = self.ask("Second")
+
+    def ask(self, text, votes=0):
+        question = Question.objects.create(
+            name="Asker",
+            phone_number="9800000000",
+            question_text=text,
+            vote_count=votes,
+        )
+        self.session.questions.add(question)
+        return question
+
+    def test_snapshot_then_deltas(self):
+        board = Leaderboard()
+        board.load()
+        sent = {}
+        name, payload = board.event(sent, size=2)
+        self.assertEqual(name, "snapshot")
+        self.assertEqual(payload["session"], self.session.id)
+        self.assertEqual(
+            [question["id"] for question in payload["questions"]],
+            [self.first.id, self.second.id],
+        )
+        self.assertIsNone(board.event(sent, size=2))
+
+        Question.objects.filter(id=self.second.id).update(vote_count=3)
+        third = self.ask("Third", votes=1)
+        with self.assertNumQueries(2):
+            self.assertTrue(board.load())
+        self.assertFalse(board.load())
+
+        name, payload = board.event(sent, size=2)
+        self.assertEqual(name, "delta")
+        self.assertEqual(
+            [
+                (question["id"], question["vote_count"])
+                for question in payload["questions"]
+            ],
+            [(self.second.id, 3), (third.id, 1)],
+        )
+        self.assertEqual(payload["removed"], [self.first.id])
+
+    def test_session_change_sends_snapshot(self):
+        board = Leaderboard()
+        board.load()
+        sent = {}
+        board.event(sent)
+        other = Session.objects.create(title="Panel")
+        with self.captureOnCommitCallbacks(execute=True):
+            RunningSession.objects.get().delete()
+            RunningSession.objects.create(session=other)
+        board.load()
+        self.assertEqual(
+            board.event(sent), ("snapshot", {"session": other.id, "questions": []})
+        )
+
+    async def test_stream(self):
+        response = await self.async_client.get(
+            reverse("leaderboard-stream"), {"top": 1}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunk = await anext(aiter(response.streaming_content))
+        self.assertTrue(chunk.startswith(b"event: snapshot\n"))
+        payload = json.loads(chunk.split(b"data: ")[1])
+        self.assertEqual(
+            [question["id"] for question in payload["questions"]], [self.first.id]
+        )
+        await response.streaming_content.aclose()
+
+    def test_stream_refused_outside_asgi(self):
+        response = self.client.get(reverse("leaderboard-stream"))
+        self.assertEqual(response.status_code, 501)
+
+
+class RunningSessionCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = Session.objects.create(title="Town hall")
+        with self.captureOnCommitCallbacks(execute=True):
+            RunningSession.objects.create(session=self.session)
+
+    def test_served_from_cache(self):
+        get_running_session()
+        with self.assertNumQueries(0):
+            running = get_running_session()
+        self.assertEqual(running["session_id"], self.session.id)
+        self.assertTrue(running["is_acepting_questions"])
+
+    def test_toggle_and_switch_invalidate(self):
+        get_running_session()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(reverse("toggle_accepting_questions"))
+        self.assertFalse(response.data["session"]["is_acepting_questions"])
+        self.assertFalse(get_running_session()["is_acepting_questions"])
+        response = self.client.post(
+            reverse("question-list-create"),
+            {"name": "Asker", "phone_number": "9800000000", "question_text": "?"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other = Session.objects.create(title="Panel")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse("update-running-session", args=[other.id])
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_running_session()["session_id"], other.id)
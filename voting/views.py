@@ -1,7 +1,13 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 from rest_framework import generics, status
 from rest_framework.response import Response
 
-from .models import Question, RunningSession, Session, Voting
+from .leaderboard import get_leaderboard_channel
+from .models import Question, RunningSession, Session
+from .running_session import get_running_session
 from .serializers import (
     QuestionSerializer,
     RunningSessionSerializer,
@@ -9,6 +15,7 @@ from .serializers import (
     SessionSerializer,
     VotingSerializer,
 )
+from .votes import VoteRejected, cast_vote
 
 # Create your views here.
 
@@ -24,15 +31,13 @@ class QuestionListCreateView(generics.ListCreateAPIView):
         vote_count = 0
 
         # Check if the current running session is accepting questions
-        running_session = (
-            RunningSession.objects.first()
-        )  # Assuming you want to check the first running session
+        running_session = get_running_session()
         if not running_session:
             return Response(
                 {"error": "No running session available"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        if not running_session.session.is_acepting_questions:
+        if not running_session["is_acepting_questions"]:
             return Response(
                 {"error": "Cannot add question, session is not accepting questions"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -45,8 +50,8 @@ class QuestionListCreateView(generics.ListCreateAPIView):
             question_text=question_text,
             vote_count=vote_count,
         )
-        running_session.session.questions.add(
-            question
+        question.session_set.add(
+            running_session["session_id"]
         )  # Associate the question with the running session
 
         # Serialize the created question
@@ -67,15 +72,10 @@ class TopQuestionView(generics.ListAPIView):
     serializer_class = QuestionSerializer
 
     def get_queryset(self):
-        running_session = (
-            RunningSession.objects.first()
-        )  # Get the first running session
+        running_session = get_running_session()
         if not running_session:
-            return Response(
-                {"error": "No running session available"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        return Question.objects.filter(session=running_session.session).order_by(
+            return Question.objects.none()
+        return Question.objects.filter(session=running_session["session_id"]).order_by(
             "-vote_count"
         )
 
@@ -85,68 +85,70 @@ class VotingCreateView(generics.CreateAPIView):
 
     def create(self, request, *args, **kwargs):
         question_id = kwargs.get("question_id")  # Get question_id from URL
-        name = request.data.get("name")
-        phone_number = request.data.get("phone_number")
-
-        # Check if user has already voted for this question
-        existing_vote = Voting.objects.filter(
-            question_id=question_id, name=name, phone_number=phone_number
-        ).first()
 
-        if existing_vote:
-            return Response(
-                {"error": "You have already voted for this question"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # Check if the voter is the creator of the question
-        question = Question.objects.filter(id=question_id).first()
-        if question and question.phone_number == phone_number:
-            return Response(
-                {"error": "You cannot vote for your own question"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-            # Check if there is a running session
-        running_session = RunningSession.objects.first()
-        if not running_session:
+        # Check if there is a running session
+        if not get_running_session():
             return Response(
                 {"error": "No running session available"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Add question_id to the request data
-        data = request.data.copy()
-        data["question"] = question_id
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create the vote and increment question vote count
-        serializer = self.get_serializer(data=data)
-        if serializer.is_valid():
-            try:
-                question.vote_count += 1
-                question.save()
-
-                serializer.save()
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            except Question.DoesNotExist:
-                return Response(
-                    {"error": "Question not found"}, status=status.HTTP_404_NOT_FOUND
-                )
-
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Record the vote and increment the question's vote count
+        try:
+            vote = cast_vote(
+                question_id,
+                serializer.validated_data["name"],
+                serializer.validated_data["phone_number"],
+            )
+        except VoteRejected as error:
+            return Response({"error": str(error)}, status=error.status)
+        return Response(self.get_serializer(vote).data, status=status.HTTP_201_CREATED)
 
 
 class QuestionsByRunningSessionView(generics.ListAPIView):
     serializer_class = QuestionSerializer
 
     def get_queryset(self):
-        running_session = RunningSession.objects.first()
+        running_session = get_running_session()
         if not running_session:
             return (
                 Question.objects.none()
             )  # Return an empty queryset if no running session exists
-        return Question.objects.filter(
-            session__runningsession__id=running_session.id
-        ).order_by("-created_at")
+        return Question.objects.filter(session=running_session["session_id"]).order_by(
+            "-created_at"
+        )
+
+
+class LeaderboardStreamView(View):
+    """
+    Server-sent events of the running session's questions by votes, for the
+    screens that used to poll TopQuestionView. ?top=N limits them to the N
+    most voted (VOTING_LEADERBOARD_SIZE by default, 0 for all). Only served
+    by the ASGI application (CIM.asgi); a WSGI worker would hold the
+    never-ending stream until it is killed, so it answers 501 instead.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"error": "The leaderboard stream is served by the live service"},
+                status=501,
+            )
+        try:
+            size = int(request.GET.get("top", settings.VOTING_LEADERBOARD_SIZE))
+        except ValueError:
+            size = settings.VOTING_LEADERBOARD_SIZE
+        response = StreamingHttpResponse(
+            get_leaderboard_channel().stream(max(size, 0)),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
 
 
 class SessionListCreateView(generics.ListCreateAPIView):
@@ -219,19 +221,16 @@ class UpdateSessionAcceptingQuestionsView(generics.UpdateAPIView):
     queryset = RunningSession.objects.all()
 
     def update(self, request, *args, **kwargs):
-        # Get the current running session
-        running_session = (
-            RunningSession.objects.first()
-        )  # Assuming you want to check the first running session
+        # Get the current running session, not the cached one, as it is changed
+        running_session = RunningSession.objects.select_related("session").first()
         if running_session:
+            session = running_session.session
             # Toggle the is_accepting_questions value
-            running_session.session.is_acepting_questions = (
-                not running_session.session.is_acepting_questions
-            )
-            running_session.session.save()  # Save the updated session
+            session.is_acepting_questions = not session.is_acepting_questions
+            session.save()  # Save the updated session, dropping the cached flag
 
             # Serialize the updated session
-            serializer = self.get_serializer(running_session.session)
+            serializer = self.get_serializer(session)
             return Response(
                 {"message": "Session updated successfully", "session": serializer.data},
                 status=status.HTTP_200_OK,
@@ -0,0 +1,105 @@
+# voting/votes.py
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Question, Voting
+
+# One statement: insert the vote unless the phone already voted on the
+# question or asked it, and count it on the question only when inserted.
+CAST_VOTE_SQL = """
+WITH question AS (
+    SELECT id FROM {question} WHERE id = %(question)s AND phone_number <> %(phone)s
+), vote AS (
+    INSERT INTO {voting} (question_id, name, phone_number, created_at)
+    SELECT id, %(name)s, %(phone)s, %(now)s FROM question
+    ON CONFLICT (question_id, phone_number) DO NOTHING
+    RETURNING id, created_at
+), counted AS (
+    UPDATE {question} SET vote_count = COALESCE(vote_count, 0) + 1
+    WHERE id = %(question)s AND EXISTS (SELECT 1 FROM vote)
+)
+SELECT id, created_at FROM vote
+"""
+
+
+class VoteRejected(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def rejection(question_id, phone_number):
+    """Explains why a vote was not inserted; only runs on the rejected path."""
+    question_phone = (
+        Question.objects.filter(id=question_id)
+        .values_list("phone_number", flat=True)
+        .first()
+    )
+    if question_phone is None:
+        return VoteRejected("Question not found", status=404)
+    if question_phone == phone_number:
+        return VoteRejected("You cannot vote for your own question")
+    return VoteRejected("You have already voted for this question")
+
+
+def cast_vote_postgresql(question_id, name, phone_number):
+    sql = CAST_VOTE_SQL.format(
+        question=connection.ops.quote_name(Question._meta.db_table),
+        voting=connection.ops.quote_name(Voting._meta.db_table),
+    )
+    params = {
+        "question": question_id,
+        "name": name,
+        "phone": phone_number,
+        "now": timezone.now(),
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    if row is None:
+        raise rejection(question_id, phone_number)
+    return Voting(
+        id=row[0],
+        question_id=question_id,
+        name=name,
+        phone_number=phone_number,
+        created_at=row[1],
+    )
+
+
+def cast_vote_generic(question_id, name, phone_number):
+    with transaction.atomic():
+        question_phone = (
+            Question.objects.filter(id=question_id)
+            .values_list("phone_number", flat=True)
+            .first()
+        )
+        if question_phone is None or question_phone == phone_number:
+            raise rejection(question_id, phone_number)
+        try:
+            with transaction.atomic():
+                vote = Voting.objects.create(
+                    question_id=question_id, name=name, phone_number=phone_number
+                )
+        except IntegrityError:
+            raise rejection(question_id, phone_number)
+        Question.objects.filter(id=question_id).update(
+            vote_count=Coalesce(F("vote_count"), Value(0)) + 1
+        )
+    return vote
+
+
+def cast_vote(question_id, name, phone_number):
+    """
+    Records `phone_number`'s vote on a question and adds it to the
+    question's vote_count, or raises VoteRejected. The unique
+    (question, phone_number) constraint settles concurrent duplicates and
+    the count is incremented in the database, so votes never read the
+    question row first. On PostgreSQL an accepted vote is one statement.
+    """
+    if connection.vendor == "postgresql":
+        return cast_vote_postgresql(question_id, name, phone_number)
+    return cast_vote_generic(question_id, name, phone_number)
@@ -1,7 +1,17 @@
 from django.contrib import admin
 from unfold.admin import ModelAdmin
 
-from .models import Category, HSCode, Match, Offer, Service, SubCategory, Wish
+from .models import (
+    Category,
+    HSCode,
+    Match,
+    MatchJob,
+    MatchNotification,
+    Offer,
+    Service,
+    SubCategory,
+    Wish,
+)
 
 
 @admin.register(HSCode)
@@ -72,3 +82,17 @@ class MatchAdmin(ModelAdmin):
     ]
     list_filter = ["created_at"]
     search_fields = ["wish__title", "offer__title"]
+
+
+@admin.register(MatchJob)
+class MatchJobAdmin(ModelAdmin):
+    list_display = ["id", "wish", "offer", "status", "attempts", "created_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["wish__title", "offer__title", "error"]
+
+
+@admin.register(MatchNotification)
+class MatchNotificationAdmin(ModelAdmin):
+    list_display = ["recipient", "match", "status", "attempts", "created_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["recipient"]
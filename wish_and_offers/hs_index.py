@@ -0,0 +1,129 @@
+# wish_and_offers/hs_index.py
+
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max
+
+# Sorts after any character an HS code can continue with
+PREFIX_END = "\U0010ffff"
+
+
+def trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class HSCodeIndex:
+    """
+    In-memory HS code index: a sorted array of codes for prefix lookups and a
+    trigram index over codes and descriptions for substring search. Results
+    are the same as the startswith/icontains queries HSCodeListView used to
+    run, in hs_code order.
+    """
+
+    def __init__(self, rows):
+        self.rows = sorted(rows, key=lambda row: row[1])
+        self.codes = [code for _, code, _ in self.rows]
+        self.texts = [
+            f"{code}\n{description}".lower() for _, code, description in self.rows
+        ]
+        self.postings = defaultdict(list)
+        for position, text in enumerate(self.texts):
+            for trigram in trigrams(text):
+                self.postings[trigram].append(position)
+
+    def prefix_positions(self, prefixes):
+        positions = set()
+        for prefix in prefixes:
+            start = bisect_left(self.codes, prefix)
+            end = bisect_left(self.codes, prefix + PREFIX_END, start)
+            positions.update(range(start, end))
+        return positions
+
+    def substring_positions(self, text):
+        """Positions whose code or description contains `text`, ignoring case."""
+        text = text.lower()
+        query_trigrams = trigrams(text)
+        if not query_trigrams:
+            candidates = range(len(self.rows))
+        else:
+            postings = sorted(
+                (self.postings.get(trigram, []) for trigram in query_trigrams), key=len
+            )
+            candidates = set(postings[0]).intersection(*postings[1:])
+        return {position for position in candidates if text in self.texts[position]}
+
+    def lookup(self, prefixes=None, search=None):
+        """
+        Returns the (id, hs_code, description) rows whose code starts with one
+        of `prefixes` and that match `search`: a code prefix when it is all
+        digits, a code/description substring otherwise.
+        """
+        positions = None
+        if prefixes:
+            positions = self.prefix_positions(prefixes)
+        if search:
+            if search.isdigit():
+                matched = self.prefix_positions([search])
+            else:
+                matched = self.substring_positions(search)
+            positions = matched if positions is None else positions & matched
+        if positions is None:
+            return self.rows
+        return [self.rows[position] for position in sorted(positions)]
+
+
+_index = None
+_signature = None
+_checked_at = 0.0
+
+
+def table_signature():
+    from .models import HSCode
+
+    state = HSCode.objects.aggregate(
+        count=Count("id"), last=Max("id"), updated=Max("updated_at")
+    )
+    return state["count"], state["last"], state["updated"]
+
+
+def load_hs_code_index():
+    global _index, _signature, _checked_at
+    from .models import HSCode
+
+    _signature = table_signature()
+    _index = HSCodeIndex(
+        list(HSCode.objects.values_list("id", "hs_code", "description"))
+    )
+    _checked_at = time.monotonic()
+    return _index
+
+
+def get_hs_code_index():
+    """
+    Returns this process's HS code index. It is loaded on first use and
+    after invalidate_hs_code_index(); other processes pick up imports and
+    edits once HS_CODE_INDEX_TTL has passed and the table's row count, last
+    id or latest updated_at moved. Changes written with queryset.update()
+    bypass updated_at and are only seen on the next load.
+    """
+    global _checked_at
+    if _index is None:
+        return load_hs_code_index()
+    if time.monotonic() - _checked_at > settings.HS_CODE_INDEX_TTL:
+        if table_signature() != _signature:
+            return load_hs_code_index()
+        _checked_at = time.monotonic()
+    return _index
+
+
+def invalidate_hs_code_index():
+    global _index
+    _index = None
+
+
+def uses_trigram_search():
+    return settings.HS_CODE_SEARCH == "trigram" and connection.vendor == "postgresql"
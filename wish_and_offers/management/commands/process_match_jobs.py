@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from wish_and_offers.models import MatchJob
+
+
+class Command(BaseCommand):
+    help = "Runs queued wish/offer match jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs that are queued now and exit",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Number of jobs claimed per poll",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            jobs = MatchJob.run_pending(options["batch_size"])
+            for job in jobs:
+                self.stdout.write(f"Match job {job.id} ({job}): {job.status}")
+
+            if options["once"] and len(jobs) < options["batch_size"]:
+                break
+            if not jobs:
+                time.sleep(options["interval"])
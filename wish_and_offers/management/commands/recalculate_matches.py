@@ -0,0 +1,64 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from wish_and_offers.match_engine import score_all, write_results
+from wish_and_offers.models import MatchNotification
+
+
+class Command(BaseCommand):
+    help = "Recalculates wish/offer matches and match percentages in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Score the listings and report the result without writing",
+        )
+        parser.add_argument(
+            "--since",
+            help="Only rescore pairs involving listings updated since this "
+            "date or datetime (ISO 8601)",
+        )
+        parser.add_argument(
+            "--no-email",
+            action="store_true",
+            help="Do not queue notifications for newly created matches",
+        )
+
+    def parse_since(self, value):
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is None:
+                raise CommandError(f"Invalid --since value: {value}")
+            since = datetime.combine(date, time.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def handle(self, *args, **options):
+        since = self.parse_since(options["since"])
+
+        scores, wishes, offers = score_all(since=since)
+        self.stdout.write(
+            f"Scored {len(wishes)} wishes against {len(offers)} offers: "
+            f"{len(scores)} pairs at or above the match threshold."
+        )
+
+        if options["dry_run"]:
+            self.stdout.write("Dry run, nothing was written.")
+            return
+
+        new_matches, counts = write_results(scores, wishes, offers, since=since)
+        for name, count in counts.items():
+            self.stdout.write(f"{name.replace('_', ' ').capitalize()}: {count}")
+
+        if not options["no_email"]:
+            MatchNotification.queue(new_matches)
+
+        self.stdout.write(self.style.SUCCESS("Recalculation complete."))
@@ -0,0 +1,41 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from wish_and_offers.models import MatchNotification
+
+
+class Command(BaseCommand):
+    help = "Sends queued match notifications as one digest email per recipient"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the digests that are due now and exit",
+        )
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=getattr(settings, "MATCH_NOTIFICATION_WINDOW_MINUTES", 15),
+            help="Minutes to collect notifications for a recipient before sending",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60,
+            help="Seconds to wait between runs",
+        )
+
+    def handle(self, *args, **options):
+        window = timedelta(minutes=options["window"])
+        while True:
+            sent, failed = MatchNotification.send_digests(window)
+            if sent or failed:
+                self.stdout.write(f"Digests sent: {sent}, failed: {failed}")
+
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,283 @@
+# wish_and_offers/match_engine.py
+
+import numpy as np
+from django.db import transaction
+from scipy import sparse
+
+from .matching import MATCH_THRESHOLD, title_terms
+from .models import Match, Offer, Wish
+
+# Wishes x offers scored per numpy block
+BLOCK_SIZE = 256
+# Title characters are counted in this many buckets (ASCII maps one-to-one)
+CHAR_BINS = 128
+# Guards the upper-bound comparison against float rounding
+EPSILON = 1e-9
+
+
+class ListingFeatures:
+    """
+    Array view of the wishes or offers of one type: category ids, title
+    character histograms and title word and index term incidence, built
+    once per run.
+    """
+
+    def __init__(self, listings, vocabulary, terms, since=None):
+        self.listings = listings
+        titles = [listing.normalized_title for listing in listings]
+
+        self.product = self._ids(listings, "product_id")
+        self.service = self._ids(listings, "service_id")
+        self.subcategory = self._ids(listings, "subcategory_id")
+        self.has_category = (
+            (self.product >= 0) | (self.service >= 0) | (self.subcategory >= 0)
+        )
+        self.has_description = np.array(
+            [
+                bool(listing.description and listing.description.strip())
+                for listing in listings
+            ],
+            dtype=bool,
+        )
+        self.description_present = np.array(
+            [bool(listing.description) for listing in listings], dtype=bool
+        )
+        self.pending = np.array(
+            [listing.status == "Pending" for listing in listings], dtype=bool
+        )
+        self.recent = np.array(
+            [since is None or listing.updated_at >= since for listing in listings],
+            dtype=bool,
+        )
+
+        self.title_length = np.array([len(title) for title in titles], dtype=np.int32)
+        self.histograms = np.zeros((len(titles), CHAR_BINS), dtype=np.int16)
+        for row, title in enumerate(titles):
+            if title:
+                codes = [ord(char) % CHAR_BINS for char in title]
+                self.histograms[row] = np.bincount(codes, minlength=CHAR_BINS)
+
+        self.word_ids = [
+            {vocabulary.setdefault(word, len(vocabulary)) for word in tokens}
+            for tokens in (listing.title_tokens for listing in listings)
+        ]
+        self.word_count = np.array([len(ids) for ids in self.word_ids], dtype=np.int32)
+        self.term_ids = [
+            {terms.setdefault(term, len(terms)) for term in title_terms(title)}
+            for title in titles
+        ]
+
+    @staticmethod
+    def _ids(listings, field):
+        return np.array([getattr(listing, field) or -1 for listing in listings])
+
+    @staticmethod
+    def _incidence(id_sets, size):
+        rows = [row for row, ids in enumerate(id_sets) for _ in ids]
+        cols = [col for ids in id_sets for col in ids]
+        return sparse.csr_matrix(
+            (np.ones(len(cols), dtype=np.int32), (rows, cols)),
+            shape=(len(id_sets), size),
+        )
+
+    def word_matrix(self, vocabulary_size):
+        return self._incidence(self.word_ids, vocabulary_size)
+
+    def term_matrix(self, terms_size):
+        return self._incidence(self.term_ids, terms_size)
+
+
+def upper_bound_scores(wishes, offers, w_rows, o_rows, w_words, o_words):
+    """
+    Returns a block of upper bounds for `Match.calculate_match_score`.
+
+    Category points and weights are computed exactly. Title similarity is
+    bounded by the larger of the exact keyword overlap, `quick_ratio` (shared
+    characters, which can never be below SequenceMatcher's ratio) and 0.9
+    where one title could be contained in the other. Description similarity
+    is bounded by 1.
+    """
+
+    def same(w_ids, o_ids):
+        w_ids = w_ids[w_rows, None]
+        return (w_ids == o_ids[None, o_rows]) & (w_ids >= 0)
+
+    category = (
+        40 * same(wishes.product, offers.product)
+        + 20 * same(wishes.service, offers.service)
+        + 20 * same(wishes.subcategory, offers.subcategory)
+    )
+
+    both_category = (
+        wishes.has_category[w_rows, None] & offers.has_category[None, o_rows]
+    )
+    both_description = (
+        wishes.has_description[w_rows, None] & offers.has_description[None, o_rows]
+    )
+    title_weight = np.where(both_category, 40, np.where(both_description, 80, 100))
+    description_weight = np.where(both_category | both_description, 20, 0)
+    description_present = (
+        wishes.description_present[w_rows, None]
+        & offers.description_present[None, o_rows]
+    )
+
+    w_length = wishes.title_length[w_rows, None]
+    o_length = offers.title_length[None, o_rows]
+    common = np.minimum(
+        wishes.histograms[w_rows, None, :], offers.histograms[None, o_rows, :]
+    ).sum(axis=2)
+    total = w_length + o_length
+    quick_ratio = np.where(total > 0, 2 * common / np.maximum(total, 1), 1.0)
+    shorter = np.minimum(w_length, o_length)
+    contained = (common == shorter) & (shorter > 3)
+
+    w_count = wishes.word_count[w_rows, None]
+    o_count = offers.word_count[None, o_rows]
+    shared_words = (w_words[w_rows] @ o_words[o_rows].T).toarray()
+    overlap = np.where(
+        (w_count > 0) & (o_count > 0),
+        shared_words / np.maximum(np.minimum(w_count, o_count), 1),
+        0.0,
+    )
+
+    title_similarity = np.minimum(
+        np.maximum(np.maximum(quick_ratio, overlap), 0.9 * contained), 1.0
+    )
+    return (
+        category
+        + title_similarity * title_weight
+        + description_present * description_weight
+    )
+
+
+def shares_category(wishes, offers, w_rows, o_rows):
+    """The pairs of a block sharing a product, service or subcategory."""
+    shared = np.zeros(
+        (len(wishes.listings[w_rows]), len(offers.listings[o_rows])), dtype=bool
+    )
+    for field in ("product", "service", "subcategory"):
+        w_ids = getattr(wishes, field)[w_rows, None]
+        shared |= (w_ids == getattr(offers, field)[None, o_rows]) & (w_ids >= 0)
+    return shared
+
+
+def score_all(since=None, block_size=BLOCK_SIZE):
+    """
+    Scores every wish/offer pair of the same type that the per-listing
+    matcher would consider (at least one side Pending). With `since`, only
+    pairs involving a listing updated since then are scored.
+
+    Returns the {(wish, offer): score} pairs at or above MATCH_THRESHOLD
+    along with the wishes and offers that were loaded. Each listing also
+    gets a `best_score`: the highest score against a Pending listing it
+    shares a category or title term with, as `update_match_percentages`
+    computes it (0 when there is none). Pairs whose upper bound can neither
+    reach MATCH_THRESHOLD nor beat the best score found so far on a side
+    are skipped.
+    """
+    all_wishes = list(Wish.objects.order_by("id"))
+    all_offers = list(Offer.objects.order_by("id"))
+    scores = {}
+
+    for listing_type in {listing.type for listing in all_wishes + all_offers}:
+        vocabulary = {}
+        terms = {}
+        wishes = ListingFeatures(
+            [wish for wish in all_wishes if wish.type == listing_type],
+            vocabulary,
+            terms,
+            since,
+        )
+        offers = ListingFeatures(
+            [offer for offer in all_offers if offer.type == listing_type],
+            vocabulary,
+            terms,
+            since,
+        )
+        w_words = wishes.word_matrix(len(vocabulary))
+        o_words = offers.word_matrix(len(vocabulary))
+        w_terms = wishes.term_matrix(len(terms))
+        o_terms = offers.term_matrix(len(terms))
+        w_best = np.zeros(len(wishes.listings))
+        o_best = np.zeros(len(offers.listings))
+
+        for w_start in range(0, len(wishes.listings), block_size):
+            w_rows = slice(w_start, w_start + block_size)
+            for o_start in range(0, len(offers.listings), block_size):
+                o_rows = slice(o_start, o_start + block_size)
+                bound = upper_bound_scores(
+                    wishes, offers, w_rows, o_rows, w_words, o_words
+                )
+                in_scope = (
+                    wishes.pending[w_rows, None] | offers.pending[None, o_rows]
+                ) & (wishes.recent[w_rows, None] | offers.recent[None, o_rows])
+                related = (
+                    (w_terms[w_rows] @ o_terms[o_rows].T).toarray() > 0
+                ) | shares_category(wishes, offers, w_rows, o_rows)
+                # Pairs that can set a wish's best score need a Pending
+                # offer, and the other way round
+                for_wish = related & offers.pending[None, o_rows]
+                for_offer = related & wishes.pending[w_rows, None]
+                candidates = np.nonzero(
+                    in_scope
+                    & (
+                        (bound + EPSILON >= MATCH_THRESHOLD)
+                        | (for_wish & (bound + EPSILON > w_best[w_rows, None]))
+                        | (for_offer & (bound + EPSILON > o_best[None, o_rows]))
+                    )
+                )
+
+                for w_index, o_index in zip(*candidates):
+                    w_row, o_row = w_start + w_index, o_start + o_index
+                    wish = wishes.listings[w_row]
+                    offer = offers.listings[o_row]
+                    score = Match.calculate_match_score(wish, offer)
+                    if score >= MATCH_THRESHOLD:
+                        scores[(wish, offer)] = score
+                    if for_wish[w_index, o_index]:
+                        w_best[w_row] = max(w_best[w_row], score)
+                    if for_offer[w_index, o_index]:
+                        o_best[o_row] = max(o_best[o_row], score)
+
+        for features, best in ((wishes, w_best), (offers, o_best)):
+            for listing, score in zip(features.listings, best):
+                listing.best_score = int(score)
+
+    return scores, all_wishes, all_offers
+
+
+def changed_percentages(listings, since=None):
+    """
+    Returns {id: match_percentage} for the listings whose `best_score` (set
+    by score_all) differs from the stored value. With `since`, listings that
+    were not updated only ever move up.
+    """
+    changed = {}
+    for listing in listings:
+        value = listing.best_score
+        if since is not None and listing.updated_at < since:
+            value = max(value, listing.match_percentage)
+        if value != listing.match_percentage:
+            changed[listing.id] = value
+    return changed
+
+
+def write_results(scores, wishes, offers, since=None, batch_size=500):
+    """
+    Upserts the Match rows and match_percentage columns in bulk and returns
+    the newly created matches and the number of rows written per table.
+    """
+    wish_percentages = changed_percentages(wishes, since)
+    offer_percentages = changed_percentages(offers, since)
+
+    with transaction.atomic():
+        new_matches = Match.upsert(scores, batch_size=batch_size)
+        Match.set_match_percentages(Wish, wish_percentages, batch_size=batch_size)
+        Match.set_match_percentages(Offer, offer_percentages, batch_size=batch_size)
+
+    return new_matches, {
+        "matches_created": len(new_matches),
+        "matches_updated": len(scores) - len(new_matches),
+        "wishes_updated": len(wish_percentages),
+        "offers_updated": len(offer_percentages),
+    }
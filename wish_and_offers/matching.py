@@ -0,0 +1,170 @@
+# wish_and_offers/matching.py
+
+import hashlib
+import zlib
+from difflib import SequenceMatcher
+
+import numpy as np
+
+# Minimum score at which a wish/offer pair is stored as a Match
+MATCH_THRESHOLD = 80
+
+# Padding added around titles so that short titles and title prefixes/suffixes
+# still produce trigrams
+TITLE_PADDING = "^^", "$$"
+
+# MinHash signature length and the random (a, b) pairs of its hash functions.
+# The seed is fixed so signatures stay comparable across processes.
+MINHASH_PERMUTATIONS = 64
+MINHASH_PRIME = (1 << 31) - 1
+_minhash_random = np.random.RandomState(20240601)
+MINHASH_A = _minhash_random.randint(1, MINHASH_PRIME, MINHASH_PERMUTATIONS).astype(
+    np.int64
+)
+MINHASH_B = _minhash_random.randint(0, MINHASH_PRIME, MINHASH_PERMUTATIONS).astype(
+    np.int64
+)
+
+# LSH banding of the MinHash signature: 16 bands of 4 rows put titles with a
+# Jaccard similarity of 0.5 in a shared bucket ~64% of the time, 0.7 ~99%
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+
+
+def title_terms(title):
+    """
+    Returns the set of index terms for a title: every word ("w:") and every
+    character trigram ("g:") of the lowercased title padded with one "^" and
+    "$". Blank titles get the empty word term, so they still meet each other.
+
+    A wish/offer pair that shares no product, service or subcategory can only
+    reach MATCH_THRESHOLD through title similarity, which requires a common
+    word, a containment of one title in the other or a common run of
+    characters. Sharing at least one of these terms is therefore used as the
+    candidate filter; the only pairs it skips are ones whose titles agree
+    solely in scattered one- or two-letter fragments. The single padding
+    keeps short titles with a common start or end ("ab", "abc") together,
+    while the "^^x" trigrams of `title_shingles`, which only record the
+    first letter, are left out: nearly every pair of titles would share one.
+    """
+    text = (title or "").lower()
+    padded = f"^{text}$"
+    terms = {f"w:{word}" for word in text.split()}
+    terms.update(f"g:{padded[i : i + 3]}" for i in range(len(padded) - 2))
+    return terms or {"w:"}
+
+
+def title_shingles(normalized_title):
+    padded = f"{TITLE_PADDING[0]}{normalized_title}{TITLE_PADDING[1]}"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def minhash_signature(shingles):
+    """
+    Returns the MinHash signature of a set of shingles as a list of
+    MINHASH_PERMUTATIONS ints. Uses crc32 rather than hash() so the result
+    does not depend on PYTHONHASHSEED.
+    """
+    if not shingles:
+        return []
+    hashes = np.array(
+        [zlib.crc32(shingle.encode()) for shingle in shingles], dtype=np.int64
+    )
+    hashes %= MINHASH_PRIME
+    permuted = (np.outer(MINHASH_A, hashes) + MINHASH_B[:, None]) % MINHASH_PRIME
+    return permuted.min(axis=1).tolist()
+
+
+def band_buckets(signature):
+    """
+    Splits a MinHash signature into LSH_BANDS bands of LSH_ROWS values and
+    returns one (band, bucket) pair per band. Two titles land in the same
+    bucket of some band with a probability that rises steeply with their
+    shingle Jaccard similarity.
+    """
+    return [
+        (
+            band,
+            zlib.crc32(
+                np.array(
+                    signature[band * LSH_ROWS : (band + 1) * LSH_ROWS], dtype=np.int64
+                ).tobytes()
+            ),
+        )
+        for band in range(len(signature) // LSH_ROWS)
+    ]
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimates the shingle Jaccard similarity of two MinHash signatures."""
+    if not signature_a or len(signature_a) != len(signature_b):
+        return 0.0
+    agreeing = sum(a == b for a, b in zip(signature_a, signature_b))
+    return agreeing / len(signature_a)
+
+
+def description_fingerprint(description):
+    if not description:
+        return ""
+    return hashlib.blake2b(description.lower().encode(), digest_size=16).hexdigest()
+
+
+def match_features(title, description):
+    """
+    Returns the precomputed match features of a wish/offer, keyed by the
+    model field they are stored in.
+    """
+    normalized_title = (title or "").lower()
+    return {
+        "normalized_title": normalized_title,
+        "title_tokens": sorted(set(normalized_title.split())),
+        "title_signature": minhash_signature(title_shingles(normalized_title)),
+        "description_fingerprint": description_fingerprint(description),
+    }
+
+
+def title_similarity(a, b, tokens_a, tokens_b):
+    """
+    Returns max(SequenceMatcher ratio, 0.9 for containment, keyword overlap)
+    for two lowercased titles, the value `Match.calculate_match_score` uses.
+
+    The ratio is only computed when its cheap upper bounds (real_quick_ratio
+    and quick_ratio) exceed what containment and overlap already give, so
+    the result is the same as always computing it.
+    """
+    if a == b:
+        return 1.0
+
+    similarity = 0.0
+    if (a in b or b in a) and min(len(a), len(b)) > 3:
+        similarity = 0.9
+    if tokens_a and tokens_b:
+        overlap = len(tokens_a & tokens_b) / min(len(tokens_a), len(tokens_b))
+        similarity = max(similarity, overlap)
+
+    matcher = SequenceMatcher(None, a, b)
+    if matcher.real_quick_ratio() > similarity and matcher.quick_ratio() > similarity:
+        similarity = max(similarity, matcher.ratio())
+    return similarity
+
+
+def description_similarity(a, b, fingerprint_a, fingerprint_b):
+    """
+    Returns the SequenceMatcher ratio of two descriptions, skipping it when
+    their fingerprints show the lowercased texts are identical.
+    """
+    if fingerprint_a and fingerprint_a == fingerprint_b:
+        return 1.0
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def category_filter(instance):
+    """
+    Returns the kwargs of every product/service/subcategory bucket the
+    instance belongs to, e.g. [{"product_id": 3}, {"subcategory_id": 7}].
+    """
+    return [
+        {field: value}
+        for field in ("product_id", "service_id", "subcategory_id")
+        if (value := getattr(instance, field))
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from wish_and_offers.matching import title_terms
+
+
+def build_title_terms(apps, schema_editor):
+    TitleTerm = apps.get_model("wish_and_offers", "TitleTerm")
+    for side in ("wish", "offer"):
+        Model = apps.get_model("wish_and_offers", side.capitalize())
+        TitleTerm.objects.bulk_create(
+            (
+                TitleTerm(**{f"{side}_id": pk}, term=term)
+                for pk, title in Model.objects.values_list("id", "title").iterator()
+                for term in title_terms(title)
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wish_and_offers', '0028_offer_views_count_wish_views_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=205)),
+                ('offer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='title_terms', to='wish_and_offers.offer')),
+                ('wish', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='title_terms', to='wish_and_offers.wish')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'wish'], name='wish_and_of_term_cf3d9d_idx'), models.Index(fields=['term', 'offer'], name='wish_and_of_term_f84c0c_idx')],
+            },
+        ),
+        migrations.RunPython(build_title_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:44
+
+from django.db import migrations
+from django.db.models import Max
+
+
+def remove_duplicate_matches(apps, schema_editor):
+    Match = apps.get_model("wish_and_offers", "Match")
+    keep = (
+        Match.objects.values("wish_id", "offer_id")
+        .annotate(keep_id=Max("id"))
+        .values_list("keep_id", flat=True)
+    )
+    Match.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wish_and_offers", "0030_matchjob"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_matches, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="match",
+            unique_together={("wish", "offer")},
+        ),
+    ]
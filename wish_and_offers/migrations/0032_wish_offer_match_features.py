@@ -0,0 +1,76 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+from wish_and_offers.matching import match_features
+
+
+def compute_match_features(apps, schema_editor):
+    for model_name in ("Wish", "Offer"):
+        Model = apps.get_model("wish_and_offers", model_name)
+        listings = list(Model.objects.only("id", "title", "description"))
+        for listing in listings:
+            for field, value in match_features(
+                listing.title, listing.description
+            ).items():
+                setattr(listing, field, value)
+        Model.objects.bulk_update(
+            listings,
+            [
+                "normalized_title",
+                "title_tokens",
+                "title_signature",
+                "description_fingerprint",
+            ],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wish_and_offers", "0031_match_unique_wish_offer"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="offer",
+            name="description_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="offer",
+            name="normalized_title",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="offer",
+            name="title_signature",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="offer",
+            name="title_tokens",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="wish",
+            name="description_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="wish",
+            name="normalized_title",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="wish",
+            name="title_signature",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="wish",
+            name="title_tokens",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(compute_match_features, migrations.RunPython.noop),
+    ]
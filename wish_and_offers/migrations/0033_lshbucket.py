@@ -0,0 +1,75 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from wish_and_offers.matching import band_buckets
+
+
+def build_lsh_buckets(apps, schema_editor):
+    LSHBucket = apps.get_model("wish_and_offers", "LSHBucket")
+    for side in ("wish", "offer"):
+        Model = apps.get_model("wish_and_offers", side.capitalize())
+        LSHBucket.objects.bulk_create(
+            (
+                LSHBucket(**{f"{side}_id": pk}, band=band, bucket=bucket)
+                for pk, signature in Model.objects.values_list(
+                    "id", "title_signature"
+                ).iterator()
+                for band, bucket in band_buckets(signature)
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wish_and_offers", "0032_wish_offer_match_features"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LSHBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("band", models.PositiveSmallIntegerField()),
+                ("bucket", models.BigIntegerField()),
+                (
+                    "offer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lsh_buckets",
+                        to="wish_and_offers.offer",
+                    ),
+                ),
+                (
+                    "wish",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lsh_buckets",
+                        to="wish_and_offers.wish",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["band", "bucket"], name="wish_and_of_band_ee9ffc_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_lsh_buckets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from wish_and_offers.search import LISTING_SEARCH_VECTOR
+
+SEARCH_INDEXES = [
+    ("offer", "offer_search_vector_gin"),
+    ("wish", "wish_search_vector_gin"),
+]
+
+
+def search_index(name):
+    return django.contrib.postgres.indexes.GinIndex(fields=["search_vector"], name=name)
+
+
+def create_search_indexes(apps, schema_editor):
+    # GIN indexes and tsvector values only exist on PostgreSQL; the SQLite
+    # dev database falls back to the in-process index in search.py
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for model_name, name in SEARCH_INDEXES:
+        Model = apps.get_model("wish_and_offers", model_name)
+        Model.objects.update(search_vector=LISTING_SEARCH_VECTOR)
+        schema_editor.add_index(Model, search_index(name))
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for model_name, name in SEARCH_INDEXES:
+        Model = apps.get_model("wish_and_offers", model_name)
+        schema_editor.remove_index(Model, search_index(name))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wish_and_offers", "0034_matchnotification"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="offer",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="wish",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=search_index(name))
+                for model_name, name in SEARCH_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_indexes, drop_search_indexes),
+            ],
+        ),
+    ]
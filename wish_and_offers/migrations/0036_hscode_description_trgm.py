@@ -0,0 +1,48 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:20
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+def description_index():
+    return django.contrib.postgres.indexes.GinIndex(
+        fields=["description"],
+        name="hscode_description_trgm",
+        opclasses=["gin_trgm_ops"],
+    )
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm is only used on PostgreSQL (HS_CODE_SEARCH = "trigram"); other
+    # databases use the in-memory index in hs_index.py
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.add_index(
+        apps.get_model("wish_and_offers", "HSCode"), description_index()
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(
+        apps.get_model("wish_and_offers", "HSCode"), description_index()
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wish_and_offers", "0035_wish_offer_search_vector"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="hscode", index=description_index()),
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_index, drop_trigram_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:05
+
+from django.db import migrations
+
+from wish_and_offers.matching import title_terms
+
+
+def rebuild_title_terms(apps, schema_editor):
+    TitleTerm = apps.get_model("wish_and_offers", "TitleTerm")
+    TitleTerm.objects.all().delete()
+    for side in ("wish", "offer"):
+        Model = apps.get_model("wish_and_offers", side.capitalize())
+        TitleTerm.objects.bulk_create(
+            (
+                TitleTerm(**{f"{side}_id": pk}, term=term)
+                for pk, title in Model.objects.values_list("id", "title").iterator()
+                for term in title_terms(title)
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wish_and_offers", "0036_hscode_description_trgm"),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_title_terms, migrations.RunPython.noop),
+    ]
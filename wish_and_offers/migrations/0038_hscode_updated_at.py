@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wish_and_offers", "0037_rebuild_title_terms"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hscode",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -1,14 +1,31 @@
-from difflib import SequenceMatcher
+from contextlib import suppress
+from datetime import timedelta
 
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import models, transaction
+from django.db.models import Case, F, Q, Value, When
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 
 from accounts.models import CustomUser
 from events.models import Event
 
+from .hs_index import invalidate_hs_code_index
+from .matching import (
+    MATCH_THRESHOLD,
+    band_buckets,
+    category_filter,
+    description_similarity,
+    match_features,
+    title_similarity,
+    title_terms,
+)
+from .search import refresh_search_vector
+
 
 class Detail(models.Model):
     user = models.ForeignKey(
@@ -33,6 +50,35 @@ class Detail(models.Model):
         abstract = True
 
 
+class MatchFeatures(models.Model):
+    """
+    Normalized title/description features read by the matcher instead of
+    re-deriving them for every pair. Refreshed on every save.
+    """
+
+    normalized_title = models.TextField(blank=True, default="")
+    title_tokens = models.JSONField(default=list, blank=True)
+    title_signature = models.JSONField(default=list, blank=True)
+    description_fingerprint = models.CharField(max_length=32, blank=True, default="")
+
+    class Meta:
+        abstract = True
+
+    def refresh_match_features(self):
+        for field, value in match_features(self.title, self.description).items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        self.refresh_match_features()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"title", "description"} & set(update_fields):
+            kwargs["update_fields"] = {
+                *update_fields,
+                *match_features(self.title, self.description),
+            }
+        super().save(*args, **kwargs)
+
+
 class Category(models.Model):
     TYPE = [
         ("Product", "Product"),
@@ -79,12 +125,32 @@ class Service(models.Model):
 class HSCode(models.Model):
     hs_code = models.CharField(max_length=20, unique=True)
     description = models.TextField()
+    # Lets other processes' HS code indexes notice edits (see hs_index)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["description"],
+                name="hscode_description_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     def __str__(self):
         return f"{self.hs_code} - {self.description[:50]}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_hs_code_index()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_hs_code_index()
+        return result
+
 
-class Wish(Detail):
+class Wish(Detail, MatchFeatures):
     WISH_STATUS = [
         ("Pending", "Pending"),
         ("Accepted", "Accepted"),
@@ -138,10 +204,13 @@ class Wish(Detail):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     match_percentage = models.IntegerField(default=0)
+    # Weighted title/description vector, maintained on PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["status", "type", "-created_at"]),
+            GinIndex(fields=["search_vector"], name="wish_search_vector_gin"),
         ]
 
     def __str__(self):
@@ -149,62 +218,37 @@ class Wish(Detail):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        self.update_match_percentages()
+        refresh_search_vector(self)
+        TitleTerm.refresh_for(self)
+        LSHBucket.refresh_for(self)
+        MatchJob.enqueue(self)
 
     def update_match_percentages(self):
         matches = Match.find_matches_for_wish(self.id)
-        created_matches = []
+        scores = {}
+        offer_percentages = {}
         highest_score = 0
-        best_offer = None
 
         for match, score in matches:
-            if score > highest_score:
-                highest_score = score
-                best_offer = match
-            if score >= 80:
-                match_obj, created = Match.objects.update_or_create(
-                    wish=self, offer=match, defaults={"match_percentage": score}
-                )
-                if created:
-                    created_matches.append(match_obj)
+            highest_score = max(highest_score, score)
+            # A Pending wish also counts towards the Offer's best score
+            if self.status == "Pending" and score > match.match_percentage:
+                offer_percentages[match.id] = score
+            if score >= MATCH_THRESHOLD:
+                scores[(self, match)] = score
 
-                # Update the highest score and corresponding offer
+        created_matches = Match.upsert(scores)
 
-        # Update both Wish and Offer with the highest match percentage
-        if best_offer:
-            Wish.objects.filter(id=self.id).update(match_percentage=highest_score)
-            Offer.objects.filter(id=best_offer.id).update(
-                match_percentage=highest_score
-            )
+        # match_percentage is the highest score against any Pending
+        # candidate, the same rule `match_engine.score_all` applies
+        Wish.objects.filter(id=self.id).update(match_percentage=highest_score)
+        Match.set_match_percentages(Offer, offer_percentages)
 
         if created_matches:
-            self.send_match_email(created_matches)
-
-    def send_match_email(self, matches):
-        subject = "Your Wish has New Matches!"
-        html_message = render_to_string(
-            "email_templates/match_notification.html",
-            {"matches": matches, "entity": self},
-        )
-        plain_message = strip_tags(html_message)
-        from_email = settings.EMAIL_HOST_USER
-        recipient_list = [self.email] + [match.offer.email for match in matches]
-
-        if settings.ADMIN_EMAIL and settings.ADMIN_EMAIL not in recipient_list:
-            recipient_list.append(settings.ADMIN_EMAIL)
-
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=plain_message,
-            from_email=from_email,
-            to=[from_email],
-            bcc=recipient_list,
-        )
-        email.attach_alternative(html_message, "text/html")
-        email.send(fail_silently=False)
+            MatchNotification.queue(created_matches)
 
 
-class Offer(Detail):
+class Offer(Detail, MatchFeatures):
     OFFER_STATUS = [
         ("Pending", "Pending"),
         ("Accepted", "Accepted"),
@@ -259,10 +303,13 @@ class Offer(Detail):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     match_percentage = models.IntegerField(default=0)
+    # Weighted title/description vector, maintained on PostgreSQL only
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=["status", "type", "-created_at"]),
+            GinIndex(fields=["search_vector"], name="offer_search_vector_gin"),
         ]
 
     def __str__(self):
@@ -270,57 +317,34 @@ class Offer(Detail):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        self.update_match_percentages()
+        refresh_search_vector(self)
+        TitleTerm.refresh_for(self)
+        LSHBucket.refresh_for(self)
+        MatchJob.enqueue(self)
 
     def update_match_percentages(self):
         matches = Match.find_matches_for_offer(self.id)
-        created_matches = []
+        scores = {}
+        wish_percentages = {}
         highest_score = 0
-        best_wish = None
 
         for match, score in matches:
-            if score > highest_score:
-                highest_score = score
-                best_wish = match
-            if score >= 80:
-                match_obj, created = Match.objects.update_or_create(
-                    wish=match, offer=self, defaults={"match_percentage": score}
-                )
-                if created:
-                    created_matches.append(match_obj)
+            highest_score = max(highest_score, score)
+            # A Pending offer also counts towards the Wish's best score
+            if self.status == "Pending" and score > match.match_percentage:
+                wish_percentages[match.id] = score
+            if score >= MATCH_THRESHOLD:
+                scores[(match, self)] = score
 
-                # Update the highest score and corresponding wish
+        created_matches = Match.upsert(scores)
 
-        # Update both Offer and Wish with the highest match percentage
-        if best_wish:
-            Offer.objects.filter(id=self.id).update(match_percentage=highest_score)
-            Wish.objects.filter(id=best_wish.id).update(match_percentage=highest_score)
+        # match_percentage is the highest score against any Pending
+        # candidate, the same rule `match_engine.score_all` applies
+        Offer.objects.filter(id=self.id).update(match_percentage=highest_score)
+        Match.set_match_percentages(Wish, wish_percentages)
 
         if created_matches:
-            self.send_match_email(created_matches)
-
-    def send_match_email(self, matches):
-        subject = "Your Offer has New Matches!"
-        html_message = render_to_string(
-            "email_templates/match_notification.html",
-            {"matches": matches, "entity": self},
-        )
-        plain_message = strip_tags(html_message)
-        from_email = settings.EMAIL_HOST_USER
-        recipient_list = [self.email] + [match.wish.email for match in matches]
-
-        if settings.ADMIN_EMAIL and settings.ADMIN_EMAIL not in recipient_list:
-            recipient_list.append(settings.ADMIN_EMAIL)
-
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=plain_message,
-            from_email=from_email,
-            to=[from_email],
-            bcc=recipient_list,
-        )
-        email.attach_alternative(html_message, "text/html")
-        email.send(fail_silently=False)
+            MatchNotification.queue(created_matches)
 
 
 class Match(models.Model):
@@ -330,6 +354,9 @@ class Match(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        unique_together = ("wish", "offer")
+
     @staticmethod
     def calculate_match_score(wish, offer):
         score = 0
@@ -342,8 +369,10 @@ class Match(models.Model):
         }
 
         # If categories or descriptions are missing, prioritize title similarity
-        wish_has_category = wish.product or wish.service or wish.subcategory
-        offer_has_category = offer.product or offer.service or offer.subcategory
+        wish_has_category = wish.product_id or wish.service_id or wish.subcategory_id
+        offer_has_category = (
+            offer.product_id or offer.service_id or offer.subcategory_id
+        )
         wish_has_description = bool(wish.description and wish.description.strip())
         offer_has_description = bool(offer.description and offer.description.strip())
 
@@ -356,90 +385,471 @@ class Match(models.Model):
                 weights["description_similarity"] = 20
 
         # Product match
-        if wish.product and offer.product and wish.product == offer.product:
+        if wish.product_id and wish.product_id == offer.product_id:
             score += weights["product_match"]
 
         # Service match
-        if wish.service and offer.service and wish.service == offer.service:
+        if wish.service_id and wish.service_id == offer.service_id:
             score += weights["service_match"]
 
         # Subcategory match
-        if (
-            wish.subcategory
-            and offer.subcategory
-            and wish.subcategory == offer.subcategory
-        ):
+        if wish.subcategory_id and wish.subcategory_id == offer.subcategory_id:
             score += weights["subcategory_match"]
 
-        # Title similarity
-        a, b = wish.title.lower(), offer.title.lower()
-        title_similarity = SequenceMatcher(None, a, b).ratio()
-
-        # Check for substring match (lenient matching for "mac book" in "selling mac book")
-        if (a in b or b in a) and len(min(a, b, key=len)) > 3:
-            title_similarity = max(title_similarity, 0.9)
-
-        # Keyword overlap
-        words_a = set(a.split())
-        words_b = set(b.split())
-        if words_a and words_b:
-            smaller_set = words_a if len(words_a) < len(words_b) else words_b
-            overlap = len(words_a & words_b) / len(smaller_set)
-            title_similarity = max(title_similarity, overlap)
-
-        title_similarity *= 100
+        # Title similarity: SequenceMatcher ratio, substring match (lenient
+        # matching for "mac book" in "selling mac book") and keyword overlap
+        title_similarity_percent = (
+            title_similarity(
+                wish.normalized_title,
+                offer.normalized_title,
+                set(wish.title_tokens),
+                set(offer.title_tokens),
+            )
+            * 100
+        )
 
-        if title_similarity == 100:  # Perfect match
+        if title_similarity_percent == 100:  # Perfect match
             score += weights["title_similarity"]
         else:
             score += min(
-                title_similarity / 100 * weights["title_similarity"],
+                title_similarity_percent / 100 * weights["title_similarity"],
                 weights["title_similarity"],
             )
 
-        # Description similarity
-        if wish.description and offer.description:
-            description_similarity = (
-                SequenceMatcher(
-                    None, wish.description.lower(), offer.description.lower()
-                ).ratio()
+        # Description similarity (adds nothing when its weight is 0)
+        if wish.description and offer.description and weights["description_similarity"]:
+            description_similarity_percent = (
+                description_similarity(
+                    wish.description,
+                    offer.description,
+                    wish.description_fingerprint,
+                    offer.description_fingerprint,
+                )
                 * 100
             )
-            if description_similarity == 100:
+            if description_similarity_percent == 100:
                 score += weights["description_similarity"]
             else:
                 score += min(
-                    description_similarity / 100 * weights["description_similarity"],
+                    description_similarity_percent
+                    / 100
+                    * weights["description_similarity"],
                     weights["description_similarity"],
                 )
 
         return int(score)
 
+    @staticmethod
+    def candidate_filter(instance, side):
+        """
+        Builds the filter for the opposite `side` ("wish" or "offer") that keeps
+        only listings sharing a product/service/subcategory bucket or a title
+        term with `instance`. Any pair that can score MATCH_THRESHOLD or more
+        passes this filter (see `matching.title_terms`).
+
+        With settings.MATCH_CANDIDATES = "lsh", title trigrams are replaced by
+        LSH bucket collisions. That is cheaper on very large catalogs but
+        approximate: pairs matching through a title substring with little
+        trigram overlap can be missed.
+        """
+        terms = title_terms(instance.title)
+        if getattr(settings, "MATCH_CANDIDATES", "terms") == "lsh":
+            terms = {term for term in terms if term.startswith("w:")}
+            query = Q(id__in=LSHBucket.colliding_ids(instance, side))
+        else:
+            query = Q()
+        query |= Q(
+            id__in=TitleTerm.objects.filter(
+                term__in=terms, **{f"{side}__isnull": False}
+            ).values(f"{side}_id")
+        )
+        for bucket in category_filter(instance):
+            query |= Q(**bucket)
+        return query
+
     @classmethod
     def find_matches_for_wish(cls, wish_id):
         wish = Wish.objects.get(id=wish_id)
-        offers = Offer.objects.filter(status="Pending", type=wish.type)
-        matches = []
-        for offer in offers:
-            score = cls.calculate_match_score(wish, offer)
-            matches.append((offer, score))
-
-            # Ensure Offer's match_percentage is updated
-            if score > offer.match_percentage:
-                Offer.objects.filter(id=offer.id).update(match_percentage=score)
-
-        return matches
+        offers = Offer.objects.filter(status="Pending", type=wish.type).filter(
+            cls.candidate_filter(wish, "offer")
+        )
+        return [(offer, cls.calculate_match_score(wish, offer)) for offer in offers]
 
     @classmethod
     def find_matches_for_offer(cls, offer_id):
         offer = Offer.objects.get(id=offer_id)
-        wishes = Wish.objects.filter(status="Pending", type=offer.type)
-        matches = []
-        for wish in wishes:
-            score = cls.calculate_match_score(wish, offer)
-            matches.append((wish, score))
-
-            # Ensure Wish's match_percentage is updated
-            if score > wish.match_percentage:
-                Wish.objects.filter(id=wish.id).update(match_percentage=score)
-        return matches
+        wishes = Wish.objects.filter(status="Pending", type=offer.type).filter(
+            cls.candidate_filter(offer, "wish")
+        )
+        return [(wish, cls.calculate_match_score(wish, offer)) for wish in wishes]
+
+    @classmethod
+    def upsert(cls, scores, batch_size=500):
+        """
+        Writes {(wish, offer): score} with INSERT ... ON CONFLICT UPDATE
+        statements and returns the matches that did not exist before.
+        """
+        if not scores:
+            return []
+        existing = set(
+            cls.objects.filter(
+                wish_id__in={wish.id for wish, _ in scores},
+                offer_id__in={offer.id for _, offer in scores},
+            ).values_list("wish_id", "offer_id")
+        )
+        matches = cls.objects.bulk_create(
+            [
+                cls(wish=wish, offer=offer, match_percentage=score)
+                for (wish, offer), score in scores.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["wish", "offer"],
+            update_fields=["match_percentage", "updated_at"],
+            batch_size=batch_size,
+        )
+        return [
+            match
+            for match in matches
+            if (match.wish_id, match.offer_id) not in existing
+        ]
+
+    @staticmethod
+    def set_match_percentages(model, percentages, batch_size=500):
+        """
+        Writes {id: match_percentage} for a Wish or Offer model with one
+        UPDATE ... CASE statement per batch.
+        """
+        items = list(percentages.items())
+        for start in range(0, len(items), batch_size):
+            batch = items[start : start + batch_size]
+            model.objects.filter(id__in=[pk for pk, _ in batch]).update(
+                match_percentage=Case(
+                    *[When(id=pk, then=Value(value)) for pk, value in batch],
+                    output_field=models.IntegerField(),
+                )
+            )
+
+
+class TitleTerm(models.Model):
+    """
+    Inverted index of title words and trigrams used to pick match candidates
+    without scoring every listing of the opposite type.
+    """
+
+    wish = models.ForeignKey(
+        Wish,
+        on_delete=models.CASCADE,
+        related_name="title_terms",
+        null=True,
+        blank=True,
+    )
+    offer = models.ForeignKey(
+        Offer,
+        on_delete=models.CASCADE,
+        related_name="title_terms",
+        null=True,
+        blank=True,
+    )
+    term = models.CharField(max_length=205)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "wish"]),
+            models.Index(fields=["term", "offer"]),
+        ]
+
+    def __str__(self):
+        return self.term
+
+    @classmethod
+    def refresh_for(cls, instance):
+        side = "wish" if isinstance(instance, Wish) else "offer"
+        cls.objects.filter(**{side: instance}).delete()
+        cls.objects.bulk_create(
+            cls(**{side: instance}, term=term) for term in title_terms(instance.title)
+        )
+
+
+class LSHBucket(models.Model):
+    """
+    MinHash LSH band buckets of wish and offer titles. Listings sharing a
+    (band, bucket) pair have similar titles with high probability.
+    """
+
+    wish = models.ForeignKey(
+        Wish,
+        on_delete=models.CASCADE,
+        related_name="lsh_buckets",
+        null=True,
+        blank=True,
+    )
+    offer = models.ForeignKey(
+        Offer,
+        on_delete=models.CASCADE,
+        related_name="lsh_buckets",
+        null=True,
+        blank=True,
+    )
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["band", "bucket"]),
+        ]
+
+    def __str__(self):
+        return f"{self.band}:{self.bucket}"
+
+    @classmethod
+    def refresh_for(cls, instance):
+        side = "wish" if isinstance(instance, Wish) else "offer"
+        cls.objects.filter(**{side: instance}).delete()
+        cls.objects.bulk_create(
+            cls(**{side: instance}, band=band, bucket=bucket)
+            for band, bucket in band_buckets(instance.title_signature)
+        )
+
+    @classmethod
+    def colliding_ids(cls, instance, side):
+        """
+        Returns a subquery of the `side` ("wish" or "offer") ids sharing at
+        least one band bucket with `instance`.
+        """
+        query = Q()
+        for band, bucket in band_buckets(instance.title_signature):
+            query |= Q(band=band, bucket=bucket)
+        if not query:
+            return cls.objects.none().values(f"{side}_id")
+        return cls.objects.filter(query, **{f"{side}__isnull": False}).values(
+            f"{side}_id"
+        )
+
+
+class MatchJob(models.Model):
+    """
+    Queued recalculation of the matches of one wish or offer. Saving a listing
+    only enqueues a job; the `process_match_jobs` command runs them.
+    """
+
+    JOB_STATUS = [
+        ("Pending", "Pending"),
+        ("Running", "Running"),
+        ("Completed", "Completed"),
+        ("Failed", "Failed"),
+    ]
+    MAX_ATTEMPTS = 3
+    # Running jobs older than this are assumed to belong to a dead worker
+    STALE_AFTER = timedelta(minutes=10)
+
+    wish = models.ForeignKey(
+        Wish,
+        on_delete=models.CASCADE,
+        related_name="match_jobs",
+        null=True,
+        blank=True,
+    )
+    offer = models.ForeignKey(
+        Offer,
+        on_delete=models.CASCADE,
+        related_name="match_jobs",
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(max_length=10, choices=JOB_STATUS, default="Pending")
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.wish or self.offer} - {self.status}"
+
+    @classmethod
+    def enqueue(cls, instance):
+        side = "wish" if isinstance(instance, Wish) else "offer"
+        job = cls.objects.filter(**{side: instance}, status="Pending").first()
+        return job or cls.objects.create(**{side: instance})
+
+    @classmethod
+    def claim(cls, limit):
+        """
+        Marks up to `limit` runnable jobs as Running and returns them. Rows
+        locked by another worker are skipped on databases that support it.
+        """
+        runnable = Q(status="Pending") | Q(
+            status="Running", started_at__lt=timezone.now() - cls.STALE_AFTER
+        )
+        with transaction.atomic():
+            ids = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(runnable)
+                .order_by("created_at")
+                .values_list("id", flat=True)[:limit]
+            )
+            cls.objects.filter(id__in=ids).update(
+                status="Running",
+                started_at=timezone.now(),
+                attempts=F("attempts") + 1,
+            )
+        return cls.objects.filter(id__in=ids).select_related("wish", "offer")
+
+    def run(self):
+        try:
+            # Roll back on failure so a retry recreates the matches and their
+            # notifications
+            with transaction.atomic():
+                (self.wish or self.offer).update_match_percentages()
+        except Exception as e:
+            # Retry on the next poll until the attempts are used up
+            self.status = "Failed" if self.attempts >= self.MAX_ATTEMPTS else "Pending"
+            self.error = str(e)
+        else:
+            self.status = "Completed"
+            self.error = None
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "error", "finished_at"])
+
+    @classmethod
+    def run_pending(cls, limit=50):
+        jobs = list(cls.claim(limit))
+        for job in jobs:
+            job.run()
+        return jobs
+
+
+class MatchNotification(models.Model):
+    """
+    Outbox of new-match emails. Rows are queued per recipient when a match
+    is created and `send_match_notifications` mails each recipient one
+    digest of everything queued for them.
+    """
+
+    NOTIFICATION_STATUS = [
+        ("Pending", "Pending"),
+        ("Sent", "Sent"),
+        ("Failed", "Failed"),
+    ]
+    MAX_ATTEMPTS = 5
+    # Delay before the first retry, doubled after every failed attempt
+    RETRY_DELAY = timedelta(minutes=1)
+
+    match = models.ForeignKey(
+        Match, on_delete=models.CASCADE, related_name="notifications"
+    )
+    recipient = models.EmailField()
+    status = models.CharField(
+        max_length=10, choices=NOTIFICATION_STATUS, default="Pending"
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("match", "recipient")
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.match_id}"
+
+    @classmethod
+    def queue(cls, matches):
+        """
+        Queues a notification of each match for the wish owner, the offer
+        owner and the admin.
+        """
+        notifications = []
+        for match in matches:
+            recipients = {match.wish.email, match.offer.email, settings.ADMIN_EMAIL}
+            notifications.extend(
+                cls(match=match, recipient=recipient)
+                for recipient in recipients
+                if recipient
+            )
+        cls.objects.bulk_create(notifications, ignore_conflicts=True)
+
+    @classmethod
+    def due_digests(cls, window, now=None):
+        """
+        Returns {recipient: [notifications]} for the recipients whose oldest
+        pending notification has waited at least `window`, or that have a
+        retry due.
+        """
+        now = now or timezone.now()
+        pending = cls.objects.filter(
+            status="Pending", next_attempt_at__lte=now
+        ).select_related("match__wish", "match__offer")
+
+        digests = {}
+        for notification in pending.order_by("created_at"):
+            digests.setdefault(notification.recipient, []).append(notification)
+        return {
+            recipient: notifications
+            for recipient, notifications in digests.items()
+            if notifications[0].created_at <= now - window
+            or any(notification.attempts for notification in notifications)
+        }
+
+    @classmethod
+    def send_digests(cls, window, now=None):
+        """
+        Sends one email per due recipient over a single SMTP connection and
+        returns the (sent, failed) recipient counts. Failed digests are
+        retried with exponential backoff up to MAX_ATTEMPTS.
+        """
+        now = now or timezone.now()
+        digests = cls.due_digests(window, now)
+        sent = failed = 0
+        if not digests:
+            return sent, failed
+
+        from_email = settings.EMAIL_HOST_USER
+        # Opened with the first digest and reopened after a failure, so an
+        # SMTP outage is recorded on each digest instead of aborting the run
+        connection = get_connection()
+        for recipient, notifications in digests.items():
+            ids = [notification.id for notification in notifications]
+            try:
+                html_message = render_to_string(
+                    "email_templates/match_notification.html",
+                    {"matches": [notification.match for notification in notifications]},
+                )
+                email = EmailMultiAlternatives(
+                    subject="You have New Matches!",
+                    body=strip_tags(html_message),
+                    from_email=from_email,
+                    to=[recipient],
+                    connection=connection,
+                )
+                email.attach_alternative(html_message, "text/html")
+                connection.open()
+                email.send(fail_silently=False)
+            except Exception as e:
+                failed += 1
+                attempts = max(n.attempts for n in notifications) + 1
+                cls.objects.filter(id__in=ids).update(
+                    attempts=attempts,
+                    status="Failed" if attempts >= cls.MAX_ATTEMPTS else "Pending",
+                    next_attempt_at=now + cls.RETRY_DELAY * 2 ** (attempts - 1),
+                    error=str(e),
+                )
+                with suppress(Exception):
+                    connection.close()
+            else:
+                sent += 1
+                cls.objects.filter(id__in=ids).update(
+                    status="Sent", sent_at=timezone.now(), error=None
+                )
+        with suppress(Exception):
+            connection.close()
+        return sent, failed
@@ -0,0 +1,133 @@
+# wish_and_offers/search.py
+
+import re
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Max, Value, When
+from rest_framework import filters
+
+# Text search configuration used for the search vectors and queries
+SEARCH_CONFIG = "english"
+# Title matches rank above description matches
+LISTING_SEARCH_VECTOR = SearchVector(
+    "title", weight="A", config=SEARCH_CONFIG
+) + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+
+# Weights of the fallback index, mirroring the A/B vector weights
+FIELD_WEIGHTS = {"title": 1.0, "description": 0.4}
+WORD_RE = re.compile(r"\w+")
+
+RANKED_ORDERING = ("-rank", "-created_at")
+
+
+def uses_postgres_search():
+    return connection.vendor == "postgresql"
+
+
+def refresh_search_vector(instance):
+    if uses_postgres_search():
+        type(instance).objects.filter(pk=instance.pk).update(
+            search_vector=LISTING_SEARCH_VECTOR
+        )
+
+
+def tokenize(text):
+    return WORD_RE.findall((text or "").lower())
+
+
+class InvertedIndex:
+    """
+    In-process inverted index over wish/offer titles and descriptions, used
+    when the database has no full-text search (the SQLite dev database).
+    """
+
+    def __init__(self, rows):
+        self.postings = defaultdict(dict)
+        for pk, *texts in rows:
+            for field, text in zip(FIELD_WEIGHTS, texts):
+                for word in tokenize(text):
+                    postings = self.postings[word]
+                    postings[pk] = postings.get(pk, 0) + FIELD_WEIGHTS[field]
+
+    def search(self, text):
+        """
+        Returns {id: score} for the listings containing every word of
+        `text`, scored by weighted term frequency. Like ts_rank there is no
+        inverse document frequency, so wish and offer scores stay comparable
+        in the combined feed.
+        """
+        words = set(tokenize(text))
+        if not words:
+            return {}
+        scores = None
+        for word in words:
+            postings = self.postings.get(word, {})
+            if scores is None:
+                scores = dict(postings)
+            else:
+                scores = {
+                    pk: score + postings[pk]
+                    for pk, score in scores.items()
+                    if pk in postings
+                }
+        return scores
+
+
+# {model: ((row count, last update), InvertedIndex)}
+_fallback_indexes = {}
+
+
+def fallback_index(model):
+    """Returns the model's inverted index, rebuilt when the table changed."""
+    state = model.objects.aggregate(count=Count("id"), updated=Max("updated_at"))
+    signature = (state["count"], state["updated"])
+    cached = _fallback_indexes.get(model)
+    if cached is None or cached[0] != signature:
+        rows = list(model.objects.values_list("id", *FIELD_WEIGHTS))
+        cached = (signature, InvertedIndex(rows))
+        _fallback_indexes[model] = cached
+    return cached[1]
+
+
+def fulltext_search(queryset, text):
+    """
+    Filters `queryset` to the listings matching `text` and annotates their
+    relevance as `rank`. The queryset is left unordered so it can still be
+    combined with union(); order by RANKED_ORDERING for best first.
+    """
+    if uses_postgres_search():
+        query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+    else:
+        scores = fallback_index(queryset.model).search(text)
+        queryset = queryset.filter(id__in=scores).annotate(
+            rank=Case(
+                *[When(id=pk, then=Value(score)) for pk, score in scores.items()],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+    return queryset
+
+
+def is_fulltext_request(request):
+    return request.query_params.get("search_mode") == "fulltext"
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that runs a ranked full-text search instead of the
+    icontains lookups when the request has `search_mode=fulltext`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_fulltext_request(request):
+            return super().filter_queryset(request, queryset, view)
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        return fulltext_search(queryset, text).order_by(*RANKED_ORDERING)
@@ -3,7 +3,16 @@
 from django.conf import settings
 from rest_framework import serializers
 
-from .models import Category, HSCode, Match, Offer, Service, SubCategory, Wish
+from .models import (
+    Category,
+    HSCode,
+    Match,
+    MatchJob,
+    Offer,
+    Service,
+    SubCategory,
+    Wish,
+)
 
 
 class HSCodeSerializer(serializers.ModelSerializer):
@@ -224,6 +233,22 @@ class MatchSerializer(serializers.ModelSerializer):
         fields = ["id", "wish", "offer", "created_at", "updated_at"]
 
 
+class MatchJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MatchJob
+        fields = [
+            "id",
+            "wish",
+            "offer",
+            "status",
+            "attempts",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+
+
 class WishSmallSerializer(serializers.ModelSerializer):
     class Meta:
         model = Wish
@@ -1,8 +1,31 @@
+import random
+from datetime import timedelta
+from difflib import SequenceMatcher
+from unittest import mock, skipUnless
+
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from .models import Offer, Wish
+from .hs_index import invalidate_hs_code_index
+from .match_engine import score_all
+from .matching import MATCH_THRESHOLD
+from .models import (
+    Category,
+    HSCode,
+    Match,
+    MatchJob,
+    MatchNotification,
+    Offer,
+    SubCategory,
+    Wish,
+)
 
 
 class DataConversionTests(APITestCase):
@@ -72,3 +95,554 @@ class DataConversionTests(APITestCase):
         response = self.client.post(self.url, data, format="json")
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MatchCandidateTests(APITestCase):
+    def setUp(self):
+        self.rice = HSCode.objects.create(hs_code="1006", description="Rice")
+        self.tea = HSCode.objects.create(hs_code="0902", description="Tea")
+        titles = [
+            ("Basmati rice", self.rice),
+            ("Organic green tea", self.tea),
+            ("Selling mac book pro", None),
+            ("Colour printer", None),
+            ("ab", None),
+            ("Wooden furniture", None),
+            ("", None),
+        ]
+        for title, product in titles:
+            Offer.objects.create(
+                full_name="Offerer",
+                email="offerer@test.com",
+                title=title,
+                description="Good quality",
+                product=product,
+                type="Product",
+            )
+
+    def assert_same_matches_as_full_scan(self, wish):
+        expected = {
+            offer.id
+            for offer in Offer.objects.filter(status="Pending", type=wish.type)
+            if Match.calculate_match_score(wish, offer) >= MATCH_THRESHOLD
+        }
+        found = {
+            offer.id
+            for offer, score in Match.find_matches_for_wish(wish.id)
+            if score >= MATCH_THRESHOLD
+        }
+        self.assertEqual(found, expected)
+
+    def test_candidates_keep_all_strong_matches(self):
+        wishes = [
+            ("Rice", self.rice),
+            ("Green tea leaves", None),
+            ("mac book", None),
+            ("Color printer", None),
+            ("abc", None),
+            ("", None),
+        ]
+        for title, product in wishes:
+            wish = Wish.objects.create(
+                full_name="Wisher",
+                email="wisher@test.com",
+                title=title,
+                description="Good quality",
+                product=product,
+                type="Product",
+            )
+            self.assert_same_matches_as_full_scan(wish)
+
+    def test_unrelated_offers_are_not_scored(self):
+        # "Sugar" and "Selling mac book pro" only share their first letter
+        for title in ("Zinc", "Sugar"):
+            wish = Wish.objects.create(
+                full_name="Wisher", email="wisher@test.com", title=title, type="Product"
+            )
+            self.assertEqual(Match.find_matches_for_wish(wish.id), [])
+
+
+class MatchJobTests(APITestCase):
+    def setUp(self):
+        self.offer = Offer.objects.create(
+            full_name="Offerer",
+            email="offerer@test.com",
+            title="Basmati rice",
+            type="Product",
+        )
+        MatchJob.run_pending()
+
+    def create_wish(self):
+        return Wish.objects.create(
+            full_name="Wisher",
+            email="wisher@test.com",
+            title="Basmati rice",
+            type="Product",
+        )
+
+    def test_save_enqueues_job_without_matching(self):
+        wish = self.create_wish()
+
+        self.assertFalse(Match.objects.filter(wish=wish).exists())
+        job = MatchJob.objects.get(wish=wish)
+        self.assertEqual(job.status, "Pending")
+
+        response = self.client.get(reverse("match-job-detail", args=[job.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "Pending")
+
+    def test_worker_creates_matches_and_queues_notifications(self):
+        wish = self.create_wish()
+        mail.outbox = []
+
+        call_command("process_match_jobs", "--once", stdout=mock.MagicMock())
+
+        self.assertEqual(MatchJob.objects.get(wish=wish).status, "Completed")
+        self.assertTrue(Match.objects.filter(wish=wish, offer=self.offer).exists())
+        self.assertEqual(
+            set(MatchNotification.objects.values_list("recipient", flat=True)),
+            {"wisher@test.com", "offerer@test.com"},
+        )
+        self.assertEqual(mail.outbox, [])
+
+    def test_rerun_upserts_without_duplicates(self):
+        wish = self.create_wish()
+        MatchJob.run_pending()
+
+        wish.update_match_percentages()
+
+        self.assertEqual(Match.objects.filter(wish=wish).count(), 1)
+        self.assertEqual(MatchNotification.objects.count(), 2)
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.match_percentage, 100)
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        wish = self.create_wish()
+
+        with mock.patch.object(
+            Match, "upsert", side_effect=RuntimeError("database unavailable")
+        ):
+            for _ in range(MatchJob.MAX_ATTEMPTS):
+                MatchJob.run_pending()
+
+        job = MatchJob.objects.get(wish=wish)
+        self.assertEqual(job.status, "Failed")
+        self.assertEqual(job.attempts, MatchJob.MAX_ATTEMPTS)
+        self.assertEqual(job.error, "database unavailable")
+
+
+class RecalculateMatchesTests(APITestCase):
+    def setUp(self):
+        rice = HSCode.objects.create(hs_code="1006", description="Rice")
+        listings = [
+            ("Basmati rice", "Long grain", rice, "Pending"),
+            ("Rice", "", rice, "Accepted"),
+            ("Selling mac book pro", "Laptop in good condition", None, "Pending"),
+            ("mac book", "Laptop in good condition", None, "Pending"),
+            ("Colour printer", None, None, "Pending"),
+            ("Color printer", None, None, "Accepted"),
+            ("Wooden furniture", "Teak", None, "Pending"),
+            ("", None, None, "Pending"),
+        ]
+        for model in (Wish, Offer):
+            for title, description, product, listing_status in listings:
+                model.objects.create(
+                    full_name="Tester",
+                    email="tester@test.com",
+                    title=title,
+                    description=description,
+                    product=product,
+                    status=listing_status,
+                    type="Product",
+                )
+        MatchJob.objects.all().delete()
+
+    def test_batch_scores_match_pairwise_scores(self):
+        expected = {}
+        for wish in Wish.objects.all():
+            for offer in Offer.objects.all():
+                if "Pending" not in (wish.status, offer.status):
+                    continue
+                score = Match.calculate_match_score(wish, offer)
+                if score >= MATCH_THRESHOLD:
+                    expected[(wish.id, offer.id)] = score
+
+        scores, _, _ = score_all(block_size=3)
+        self.assertEqual(
+            {(wish.id, offer.id): score for (wish, offer), score in scores.items()},
+            expected,
+        )
+
+    def test_command_writes_matches_in_bulk(self):
+        # Its best match, "Wooden furniture", is below MATCH_THRESHOLD
+        table = Wish.objects.create(
+            full_name="Tester",
+            email="tester@test.com",
+            title="Wooden table",
+            type="Product",
+        )
+        call_command("recalculate_matches", "--dry-run", stdout=mock.MagicMock())
+        self.assertFalse(Match.objects.exists())
+
+        call_command("recalculate_matches", "--no-email", stdout=mock.MagicMock())
+
+        scores, _, _ = score_all()
+        self.assertEqual(Match.objects.count(), len(scores))
+        self.assertFalse(MatchNotification.objects.exists())
+        table.refresh_from_db()
+        self.assertTrue(0 < table.match_percentage < MATCH_THRESHOLD)
+
+        # Each listing holds what saving it would have computed
+        for model in (Wish, Offer):
+            batch = dict(model.objects.values_list("id", "match_percentage"))
+            for listing in model.objects.all():
+                listing.update_match_percentages()
+                listing.refresh_from_db()
+                self.assertEqual(listing.match_percentage, batch[listing.id], listing)
+
+
+def legacy_match_score(wish, offer):
+    """The scorer before match features were precomputed, kept as the oracle."""
+    score = 0
+    weights = {
+        "product_match": 40,
+        "service_match": 20,
+        "subcategory_match": 20,
+        "title_similarity": 40,
+        "description_similarity": 20,
+    }
+    wish_has_category = wish.product or wish.service or wish.subcategory
+    offer_has_category = offer.product or offer.service or offer.subcategory
+    wish_has_description = bool(wish.description and wish.description.strip())
+    offer_has_description = bool(offer.description and offer.description.strip())
+    if not wish_has_category or not offer_has_category:
+        if not wish_has_description or not offer_has_description:
+            weights["title_similarity"] = 100
+            weights["description_similarity"] = 0
+        else:
+            weights["title_similarity"] = 80
+            weights["description_similarity"] = 20
+    if wish.product and offer.product and wish.product == offer.product:
+        score += weights["product_match"]
+    if wish.service and offer.service and wish.service == offer.service:
+        score += weights["service_match"]
+    if wish.subcategory and offer.subcategory and wish.subcategory == offer.subcategory:
+        score += weights["subcategory_match"]
+    a, b = wish.title.lower(), offer.title.lower()
+    title_similarity = SequenceMatcher(None, a, b).ratio()
+    if (a in b or b in a) and len(min(a, b, key=len)) > 3:
+        title_similarity = max(title_similarity, 0.9)
+    words_a = set(a.split())
+    words_b = set(b.split())
+    if words_a and words_b:
+        smaller_set = words_a if len(words_a) < len(words_b) else words_b
+        overlap = len(words_a & words_b) / len(smaller_set)
+        title_similarity = max(title_similarity, overlap)
+    title_similarity *= 100
+    if title_similarity == 100:
+        score += weights["title_similarity"]
+    else:
+        score += min(
+            title_similarity / 100 * weights["title_similarity"],
+            weights["title_similarity"],
+        )
+    if wish.description and offer.description:
+        description_similarity = (
+            SequenceMatcher(
+                None, wish.description.lower(), offer.description.lower()
+            ).ratio()
+            * 100
+        )
+        if description_similarity == 100:
+            score += weights["description_similarity"]
+        else:
+            score += min(
+                description_similarity / 100 * weights["description_similarity"],
+                weights["description_similarity"],
+            )
+    return int(score)
+
+
+class MatchFeatureTests(APITestCase):
+    def test_features_are_refreshed_on_save(self):
+        wish = Wish.objects.create(title="Mac Book", description="Used", type="Product")
+        signature = wish.title_signature
+        self.assertEqual(wish.normalized_title, "mac book")
+        self.assertEqual(wish.title_tokens, ["book", "mac"])
+
+        wish.title = "Mac Book Pro"
+        wish.save(update_fields=["title"])
+        wish.refresh_from_db()
+        self.assertEqual(wish.title_tokens, ["book", "mac", "pro"])
+        self.assertNotEqual(wish.title_signature, signature)
+
+    def test_score_agrees_with_legacy_scorer(self):
+        rng = random.Random(7)
+        rice = HSCode.objects.create(hs_code="1006", description="Rice")
+        words = ["rice", "basmati", "mac", "book", "pro", "tea", "colour", "color"]
+        descriptions = [None, "", "  ", "Good quality", "good QUALITY", "Fresh"]
+        for model in (Wish, Offer):
+            for _ in range(15):
+                model.objects.create(
+                    title=" ".join(rng.choices(words, k=rng.randint(0, 3))),
+                    description=rng.choice(descriptions),
+                    product=rng.choice([rice, None]),
+                    type="Product",
+                )
+
+        for wish in Wish.objects.all():
+            for offer in Offer.objects.all():
+                self.assertEqual(
+                    Match.calculate_match_score(wish, offer),
+                    legacy_match_score(wish, offer),
+                )
+
+
+class SimilarListingsTests(APITestCase):
+    def setUp(self):
+        self.wish = Wish.objects.create(title="Organic green tea", type="Product")
+        self.offer = Offer.objects.create(
+            title="Organic green tea leaves", type="Product"
+        )
+        Offer.objects.create(title="Wooden furniture", type="Product")
+
+    def test_similar_listings_are_ranked_by_similarity(self):
+        url = reverse("similar-listings", args=["wish", self.wish.id])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["id"], self.offer.id)
+        self.assertEqual(response.data[0]["model_type"], "offer")
+        self.assertNotIn(
+            "Wooden furniture", [result["title"] for result in response.data]
+        )
+
+    def test_limit_is_clamped(self):
+        url = reverse("similar-listings", args=["wish", self.wish.id])
+        for limit in ("0", "-5"):
+            response = self.client.get(url, {"limit": limit})
+            self.assertEqual(
+                [result["id"] for result in response.data], [self.offer.id]
+            )
+
+    def test_unknown_listing_returns_404(self):
+        url = reverse("similar-listings", args=["offer", 9999])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MATCH_CANDIDATES="lsh")
+    def test_lsh_candidates_for_matching(self):
+        offers = [offer for offer, _ in Match.find_matches_for_wish(self.wish.id)]
+        self.assertEqual(offers, [self.offer])
+
+
+class MatchNotificationTests(APITestCase):
+    def setUp(self):
+        offer = Offer.objects.create(
+            email="offerer@test.com", title="Basmati rice", type="Product"
+        )
+        for title in ("Basmati rice", "Rice basmati"):
+            wish = Wish.objects.create(
+                email="wisher@test.com", title=title, type="Product"
+            )
+            MatchNotification.queue(
+                [Match.objects.create(wish=wish, offer=offer, match_percentage=90)]
+            )
+        self.window = timedelta(minutes=15)
+        self.later = timezone.now() + self.window
+
+    def test_one_digest_per_recipient_after_window(self):
+        self.assertEqual(MatchNotification.send_digests(self.window), (0, 0))
+
+        sent, failed = MatchNotification.send_digests(self.window, now=self.later)
+
+        self.assertEqual((sent, failed), (2, 0))
+        self.assertEqual(
+            sorted(email.to[0] for email in mail.outbox),
+            ["offerer@test.com", "wisher@test.com"],
+        )
+        self.assertFalse(MatchNotification.objects.exclude(status="Sent").exists())
+
+    def test_failed_digest_is_retried_with_backoff(self):
+        with mock.patch(
+            "django.core.mail.EmailMultiAlternatives.send",
+            side_effect=ConnectionError("SMTP down"),
+        ):
+            sent, failed = MatchNotification.send_digests(self.window, now=self.later)
+
+        self.assertEqual((sent, failed), (0, 2))
+        notification = MatchNotification.objects.first()
+        self.assertEqual(notification.status, "Pending")
+        self.assertEqual(notification.attempts, 1)
+        self.assertEqual(
+            notification.next_attempt_at, self.later + MatchNotification.RETRY_DELAY
+        )
+
+    def test_unreachable_smtp_server_is_recorded(self):
+        connection = mock.MagicMock()
+        connection.open.side_effect = ConnectionRefusedError("SMTP unreachable")
+        with mock.patch(
+            "wish_and_offers.models.get_connection", return_value=connection
+        ):
+            sent, failed = MatchNotification.send_digests(self.window, now=self.later)
+
+        self.assertEqual((sent, failed), (0, 2))
+        self.assertEqual(connection.open.call_count, 2)
+        self.assertEqual(
+            set(MatchNotification.objects.values_list("status", "attempts", "error")),
+            {("Pending", 1, "SMTP unreachable")},
+        )
+
+
+class FullTextSearchTests(APITestCase):
+    def setUp(self):
+        self.tea = Wish.objects.create(
+            title="Green tea", description="Looking for organic leaves"
+        )
+        self.leaves = Offer.objects.create(
+            title="Organic leaves", description="Green tea from Ilam"
+        )
+        Offer.objects.create(title="Organic rice", description="Long grain")
+
+    def test_combined_feed_ranks_title_hits_first(self):
+        response = self.client.get(
+            reverse("wish-offer-combined-list"),
+            {"search": "organic leaves", "search_mode": "fulltext"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = [
+            (item["model_type"], item["id"]) for item in response.data["results"]
+        ]
+        self.assertEqual(results, [("offer", self.leaves.id), ("wish", self.tea.id)])
+
+    def test_list_endpoint_searches_descriptions(self):
+        response = self.client.get(
+            reverse("wish-list-create"), {"search": "leaves", "search_mode": "fulltext"}
+        )
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]], [self.tea.id]
+        )
+
+    def test_default_mode_searches_titles_only(self):
+        response = self.client.get(reverse("wish-list-create"), {"search": "leaves"})
+        self.assertEqual(response.data["results"], [])
+
+    def test_index_follows_title_changes(self):
+        self.tea.title = "Black tea"
+        self.tea.description = ""
+        self.tea.save()
+        response = self.client.get(
+            reverse("wish-list-create"), {"search": "leaves", "search_mode": "fulltext"}
+        )
+        self.assertEqual(response.data["results"], [])
+
+
+class CombinedCursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.url = reverse("wish-offer-combined-list")
+        created_at = timezone.now()
+        for index in range(5):
+            wish = Wish.objects.create(title=f"Wish {index}")
+            offer = Offer.objects.create(title=f"Offer {index}")
+            # Pairs share a timestamp so ties are broken by model_type and id
+            Wish.objects.filter(pk=wish.pk).update(
+                created_at=created_at - timedelta(minutes=index)
+            )
+            Offer.objects.filter(pk=offer.pk).update(
+                created_at=created_at - timedelta(minutes=index)
+            )
+
+    def walk(self, params):
+        titles = []
+        response = self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            titles.extend(item["title"] for item in response.data["results"])
+            if not response.data["next"]:
+                return titles
+            response = self.client.get(response.data["next"])
+
+    def test_cursor_pages_follow_feed_order(self):
+        titles = self.walk({"pagination": "cursor", "page_size": 3})
+        expected = [
+            title for index in range(5) for title in (f"Wish {index}", f"Offer {index}")
+        ]
+        self.assertEqual(titles, expected)
+
+    def test_cursor_pages_of_one_type(self):
+        titles = self.walk(
+            {"pagination": "cursor", "page_size": 2, "model_type": "offer"}
+        )
+        self.assertEqual(titles, [f"Offer {index}" for index in range(5)])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(
+            self.url, {"pagination": "cursor", "cursor": "not-a-cursor"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class HSCodeIndexTests(APITestCase):
+    def setUp(self):
+        invalidate_hs_code_index()
+        self.url = reverse("hs-code-list")
+        for code, description in [
+            ("0902", "Tea, whether or not flavoured"),
+            ("090210", "Green tea in packings not exceeding 3 kg"),
+            ("1006", "Rice"),
+            ("100630", "Semi-milled or wholly milled rice"),
+        ]:
+            HSCode.objects.create(hs_code=code, description=description)
+        category = Category.objects.create(name="Food", type="Product")
+        self.subcategory = SubCategory.objects.create(
+            category=category, name="Grains", reference="1006, 1007"
+        )
+
+    def codes(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item["hs_code"] for item in response.data["results"]]
+
+    def test_numeric_search_is_a_code_prefix(self):
+        self.assertEqual(self.codes({"search": "0902"}), ["0902", "090210"])
+
+    def test_text_search_matches_descriptions(self):
+        self.assertEqual(self.codes({"search": "MILLED"}), ["100630"])
+        self.assertEqual(self.codes({"search": "ea"}), ["0902", "090210"])
+
+    def test_subcategory_references_limit_codes(self):
+        self.assertEqual(
+            self.codes({"subcategory_id": self.subcategory.id}), ["1006", "100630"]
+        )
+        # No match within the references falls back to every code
+        self.assertEqual(
+            self.codes({"subcategory_id": self.subcategory.id, "search": "tea"}),
+            ["0902", "090210", "1006", "100630"],
+        )
+
+    def test_upload_refreshes_index(self):
+        self.assertEqual(self.codes({"search": "coffee"}), self.codes({}))
+        upload = SimpleUploadedFile(
+            "codes.csv", b"hs_code,description\n0901,Coffee\n", "text/csv"
+        )
+        response = self.client.post(reverse("hs-code-upload"), {"file": upload})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.codes({"search": "coffee"}), ["0901"])
+
+    @skipUnless(connection.vendor == "postgresql", "pg_trgm search")
+    @override_settings(HS_CODE_SEARCH="trigram")
+    def test_trigram_search_keeps_misspelled_matches(self):
+        self.assertEqual(self.codes({"search": "flavored"}), ["0902"])
+
+    @override_settings(HS_CODE_INDEX_TTL=0)
+    def test_index_picks_up_edits_from_other_processes(self):
+        self.assertEqual(self.codes({"search": "barley"}), self.codes({}))
+        # Another worker's save only invalidates its own index
+        code = HSCode.objects.get(hs_code="1006")
+        code.description = "Rice and barley"
+        with mock.patch("wish_and_offers.models.invalidate_hs_code_index"):
+            code.save()
+
+        self.assertEqual(self.codes({"search": "barley"}), ["1006"])
@@ -12,11 +12,14 @@ from .views import (
     IncreaseOfferViewCountView,
     IncreaseWishViewCountView,
     LatestWishAndOfferListView,
+    MatchJobListView,
+    MatchJobRetrieveView,
     MatchListView,
     OfferListCreateView,
     OfferRetrieveUpdateDestroyView,
     ServiceListCreateView,
     ServiceRetrieveUpdateDestroyView,
+    SimilarListingsView,
     SubCategoryListView,
     SubCategoryRetrieveUpdateDestroyView,
     WishAndOfferCombinedListView,
@@ -49,6 +52,11 @@ urlpatterns = [
         WishAndOfferCombinedListView.as_view(),
         name="wish-offer-combined-list",
     ),
+    path(
+        "combined/<str:model_type>/<int:pk>/similar/",
+        SimilarListingsView.as_view(),
+        name="similar-listings",
+    ),
     # Event-specific Wish and Offer URLs
     path(
         "events/<slug:event_slug>/wishes/",
@@ -73,6 +81,12 @@ urlpatterns = [
     path(
         "matches/", MatchListView.as_view(), name="match-list"
     ),  # URL for listing matches
+    path("match-jobs/", MatchJobListView.as_view(), name="match-job-list"),
+    path(
+        "match-jobs/<int:pk>/",
+        MatchJobRetrieveView.as_view(),
+        name="match-job-detail",
+    ),
     path("services/", ServiceListCreateView.as_view(), name="service-list-create"),
     path(
         "services/<int:pk>/",
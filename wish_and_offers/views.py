@@ -1,24 +1,49 @@
 # wish_and_offers/views.py
 
 import csv
+from base64 import b64decode, b64encode
+from heapq import merge
+from itertools import islice
 
 import pandas as pd
 from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
 from django.core.mail import EmailMultiAlternatives
 from django.db import transaction
 from django.db.models import CharField, F, IntegerField, Q, Value
 from django.template.loader import render_to_string
+from django.utils.dateparse import parse_datetime
 from django.utils.html import strip_tags
 from django_filters import rest_framework as django_filters
 from rest_framework import filters, generics, status
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
 from events.models import Event
 
-from .models import Category, HSCode, Match, Offer, Service, SubCategory, Wish
+from .hs_index import get_hs_code_index, load_hs_code_index, uses_trigram_search
+from .matching import estimated_similarity
+from .models import (
+    Category,
+    HSCode,
+    LSHBucket,
+    Match,
+    MatchJob,
+    Offer,
+    Service,
+    SubCategory,
+    Wish,
+)
+from .search import (
+    RANKED_ORDERING,
+    FullTextSearchFilter,
+    fulltext_search,
+    is_fulltext_request,
+)
 from .serializers import (
     CategorySerializer,
     CategorySubCategoryBulkUploadSerializer,
@@ -26,6 +51,7 @@ from .serializers import (
     DataConversionSerializer,
     HSCodeFileUploadSerializer,
     HSCodeSerializer,
+    MatchJobSerializer,
     MatchSerializer,
     OfferSerializer,
     OfferWithWishesSerializer,
@@ -43,6 +69,89 @@ class WishandOfferPagination(PageNumberPagination):
     max_page_size = 1000
 
 
+class WishandOfferCursorPagination(WishandOfferPagination):
+    """
+    Keyset pagination for the combined feed, ordered by
+    (created_at, model_type, id) descending. Each wish/offer branch is
+    queried separately with the keyset condition and the page size pushed
+    into it, so a page costs the same however deep it is and no COUNT(*)
+    is run. Enabled with `pagination=cursor`; the `next` link carries the
+    position of the last row.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def encode_cursor(self, row):
+        position = f"{row['created_at'].isoformat()}|{row['model_type']}|{row['id']}"
+        return b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, model_type, pk = b64decode(encoded).decode().split("|")
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None or model_type not in ("wish", "offer"):
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, model_type, pk
+
+    @staticmethod
+    def after(queryset, model_type, cursor):
+        """Filters a single-type branch to the rows after `cursor`."""
+        created_at, cursor_type, pk = cursor
+        if model_type < cursor_type:
+            return queryset.filter(created_at__lte=created_at)
+        if model_type > cursor_type:
+            return queryset.filter(created_at__lt=created_at)
+        return queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    def paginate_branches(self, branches, request):
+        """
+        Returns the next page of the {model_type: values queryset} branches,
+        merged in feed order.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        rows = []
+        for model_type, queryset in branches.items():
+            if cursor is not None:
+                queryset = self.after(queryset, model_type, cursor)
+            rows.append(list(queryset.order_by("-created_at", "-id")[: page_size + 1]))
+        merged = list(
+            islice(
+                merge(*rows, key=self.sort_key, reverse=True),
+                page_size + 1,
+            )
+        )
+
+        self.has_next = len(merged) > page_size
+        page = merged[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    @staticmethod
+    def sort_key(row):
+        return row["created_at"], row["model_type"], row["id"]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+
 class WishFilterSet(django_filters.FilterSet):
     category = django_filters.CharFilter(
         field_name="subcategory__category__name", lookup_expr="icontains"
@@ -121,7 +230,7 @@ def send_new_item_notification(item):
 
 class WishListCreateView(generics.ListCreateAPIView):
     serializer_class = WishSerializer
-    filter_backends = [filters.SearchFilter, django_filters.DjangoFilterBackend]
+    filter_backends = [FullTextSearchFilter, django_filters.DjangoFilterBackend]
     search_fields = ["title"]
     filterset_class = WishFilterSet
     pagination_class = WishandOfferPagination
@@ -155,25 +264,12 @@ class WishListCreateView(generics.ListCreateAPIView):
         product = HSCode.objects.get(pk=product_id) if product_id else None
         service = Service.objects.get(pk=service_id) if service_id else None
 
-        # Capture the created wish and its matches
-        wish = serializer.save(event=event, product=product, service=service, user=user)
-
-        # Retrieve matches for the created wish
-        match_objects = Match.objects.filter(wish=wish)
+        # Matches are calculated by the match job queued on save
+        serializer.save(event=event, product=product, service=service, user=user)
 
         # Send email to both Wish and Offer creators
         # send_new_item_notification(wish)
 
-        return Response(
-            {
-                "wish": WishWithOffersSerializer(wish).data,
-                "matches": MatchSerializer(
-                    match_objects, many=True
-                ).data,  # Serialize the matches
-            },
-            status=status.HTTP_201_CREATED,
-        )
-
 
 class WishRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Wish.objects.select_related(
@@ -226,7 +322,7 @@ class OfferFilterSet(WishFilterSet):
 
 class OfferListCreateView(generics.ListCreateAPIView):
     serializer_class = OfferSerializer
-    filter_backends = [filters.SearchFilter, django_filters.DjangoFilterBackend]
+    filter_backends = [FullTextSearchFilter, django_filters.DjangoFilterBackend]
     search_fields = ["title"]
     filterset_class = OfferFilterSet
     pagination_class = WishandOfferPagination
@@ -260,27 +356,12 @@ class OfferListCreateView(generics.ListCreateAPIView):
         product = HSCode.objects.get(pk=product_id) if product_id else None
         service = Service.objects.get(pk=service_id) if service_id else None
 
-        # Capture the created offer and its matches
-        offer = serializer.save(
-            event=event, product=product, service=service, user=user
-        )
-
-        # Retrieve matches for the created offer
-        match_objects = Match.objects.filter(offer=offer)
+        # Matches are calculated by the match job queued on save
+        serializer.save(event=event, product=product, service=service, user=user)
 
         # Send email to both Wish and Offer creators
         # send_new_item_notification(offer)
 
-        return Response(
-            {
-                "offer": OfferWithWishesSerializer(offer).data,
-                "matches": MatchSerializer(
-                    match_objects, many=True
-                ).data,  # Serialize the matches
-            },
-            status=status.HTTP_201_CREATED,
-        )
-
 
 class OfferRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Offer.objects.select_related(
@@ -342,6 +423,30 @@ class MatchListView(generics.ListAPIView):
         return super().get_queryset()  # Return all matches if no filters are applied
 
 
+class MatchJobListView(generics.ListAPIView):
+    serializer_class = MatchJobSerializer
+
+    def get_queryset(self):
+        queryset = MatchJob.objects.all()
+        wish_id = self.request.query_params.get("wish_id")
+        offer_id = self.request.query_params.get("offer_id")
+        job_status = self.request.query_params.get("status")
+
+        if wish_id:
+            queryset = queryset.filter(wish_id=wish_id)
+        if offer_id:
+            queryset = queryset.filter(offer_id=offer_id)
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+
+        return queryset.order_by("-created_at")
+
+
+class MatchJobRetrieveView(generics.RetrieveAPIView):
+    queryset = MatchJob.objects.all()
+    serializer_class = MatchJobSerializer
+
+
 class ServiceFilterSet(django_filters.FilterSet):
     subcategory_id = django_filters.CharFilter(
         field_name="subcategory__id", lookup_expr="exact"
@@ -434,6 +539,13 @@ class SubCategoryRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView
 
 
 class HSCodeListView(generics.ListAPIView):
+    """
+    Lists HS codes, optionally limited to a subcategory's code references
+    and a `search` (code prefix when numeric, code/description text
+    otherwise). Lookups are answered from the in-process HSCodeIndex, or by
+    pg_trgm similarity when HS_CODE_SEARCH is "trigram".
+    """
+
     queryset = HSCode.objects.all().order_by("hs_code")
     serializer_class = HSCodeSerializer
     filter_backends = [filters.SearchFilter]
@@ -442,62 +554,100 @@ class HSCodeListView(generics.ListAPIView):
     page_size_query_param = "page_size"
     max_page_size = 100
 
+    def get_references(self):
+        """
+        Returns the subcategory's HS code prefixes, [] when it has none and
+        None when HS codes do not apply to it (service subcategories).
+        """
+        subcategory_id = self.request.query_params.get("subcategory_id", None)
+        if not subcategory_id:
+            return []
+        try:
+            subcategory = SubCategory.objects.select_related("category").get(
+                id=subcategory_id
+            )
+        except (SubCategory.DoesNotExist, ValueError):
+            return []
+
+        # Only apply filtering if the category type is "Product"
+        if subcategory.category.type == "Service":
+            # HS codes are not applicable for services, return empty
+            return None
+        if subcategory.category.type == "Product" and subcategory.reference:
+            # Split comma-separated references for prefix matching
+            return [
+                ref.strip() for ref in subcategory.reference.split(",") if ref.strip()
+            ]
+        # If reference is empty, return all HSCodes
+        return []
+
     def get_queryset(self):
         queryset = HSCode.objects.all().order_by("hs_code")
-        subcategory_id = self.request.query_params.get("subcategory_id", None)
+        references = self.get_references()
         search_query = self.request.query_params.get("search", None)
 
-        if subcategory_id:
-            try:
-                subcategory = SubCategory.objects.get(id=subcategory_id)
-                # Only apply filtering if the category type is "Product"
-                if subcategory.category.type == "Product":
-                    if subcategory.reference:
-                        # Split comma-separated references and create Q objects for prefix matching
-                        references = [
-                            ref.strip()
-                            for ref in subcategory.reference.split(",")
-                            if ref.strip()
-                        ]
-                        if references:
-                            query = Q()
-                            for ref in references:
-                                query |= Q(hs_code__startswith=ref)
-                            queryset = queryset.filter(query)
-                    # If reference is empty, return all HSCodes (already the default)
-                elif subcategory.category.type == "Service":
-                    # HS codes are not applicable for services, return empty
-                    return HSCode.objects.none()
-            except SubCategory.DoesNotExist:
-                pass
+        if references is None:
+            return HSCode.objects.none()
+        if references:
+            query = Q()
+            for ref in references:
+                query |= Q(hs_code__startswith=ref)
+            queryset = queryset.filter(query)
 
         if search_query:
             # If the search query contains only numbers, do a prefix search on hs_code
             if search_query.isdigit():
                 queryset = queryset.filter(hs_code__startswith=search_query)
             else:
-                # If the search contains text, search in both hs_code and description
-                queryset = queryset.filter(
-                    Q(hs_code__icontains=search_query)
-                    | Q(description__icontains=search_query)
+                # Rank descriptions by trigram word similarity to the search
+                queryset = (
+                    queryset.annotate(
+                        similarity=TrigramWordSimilarity(search_query, "description")
+                    )
+                    .filter(
+                        Q(hs_code__icontains=search_query)
+                        | Q(description__trigram_word_similar=search_query)
+                    )
+                    .order_by("-similarity", "hs_code")
                 )
 
         return queryset
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-
+    def get_rows(self):
+        references = self.get_references()
+        index = get_hs_code_index()
+        rows = []
+        if references is not None:
+            rows = index.lookup(references, self.request.query_params.get("search"))
         # If filtering returned no results, fallback to all HS codes
-        if not queryset.exists():
-            queryset = HSCode.objects.all().order_by("hs_code")
+        return rows or index.rows
 
-        page = self.paginate_queryset(queryset)
+    def list(self, request, *args, **kwargs):
+        if uses_trigram_search():
+            # get_queryset already applies the search; SearchFilter's
+            # icontains would drop the fuzzy description matches
+            queryset = self.get_queryset()
+
+            # If filtering returned no results, fallback to all HS codes
+            if not queryset.exists():
+                queryset = HSCode.objects.all().order_by("hs_code")
+
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+
+        data = [
+            {"id": pk, "hs_code": code, "description": description}
+            for pk, code, description in self.get_rows()
+        ]
+        page = self.paginate_queryset(data)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            return self.get_paginated_response(page)
+        return Response(data)
 
 
 class HSCodeBulkUploadView(APIView):
@@ -541,6 +691,8 @@ class HSCodeBulkUploadView(APIView):
                     skip_count += 1
                     print(f"Failed to insert row: {row}. Error: {e}")  # Debugging
 
+            load_hs_code_index()
+
             return Response(
                 {
                     "message": "CSV file data uploaded successfully!",
@@ -733,7 +885,64 @@ class WishAndOfferCombinedListView(generics.ListAPIView):
     filter_backends = [filters.SearchFilter, django_filters.DjangoFilterBackend]
     search_fields = ["title", "description"]
 
-    def get_queryset(self):
+    common_fields = [
+        "id",
+        "user_id",
+        "full_name",
+        "designation",
+        "mobile_no",
+        "alternate_no",
+        "email",
+        "company_name",
+        "address",
+        "country",
+        "province",
+        "municipality",
+        "ward",
+        "company_website",
+        "image",
+        "title",
+        "description",
+        "event_id",
+        "subcategory_id",
+        "product_id",
+        "service_id",
+        "status",
+        "type",
+        "views_count",
+        "match_percentage",
+        "created_at",
+        "updated_at",
+        "model_type",
+        "wish_id",
+        "offer_id",
+    ]
+
+    def is_fulltext(self):
+        search = self.request.query_params.get("search")
+        return bool(search and search.strip()) and is_fulltext_request(self.request)
+
+    def uses_cursor(self):
+        # Full-text results are ordered by rank, which has no stable keyset
+        return (
+            self.request.query_params.get("pagination") == "cursor"
+            and not self.is_fulltext()
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.uses_cursor():
+                self._paginator = WishandOfferCursorPagination()
+            else:
+                self._paginator = WishandOfferPagination()
+        return self._paginator
+
+    def get_branches(self):
+        """
+        Returns the filtered {model_type: values queryset} branches of the
+        feed, limited to `model_type` when it is given.
+        """
         wishes = Wish.objects.annotate(
             model_type=Value("wish", CharField()),
             wish_id=Value(None, IntegerField()),
@@ -750,78 +959,55 @@ class WishAndOfferCombinedListView(generics.ListAPIView):
         o_qs = OfferFilterSet(params, queryset=offers).qs
 
         search = params.get("search")
-        if search:
+        fields = list(self.common_fields)
+        if self.is_fulltext():
+            w_qs = fulltext_search(w_qs, search)
+            o_qs = fulltext_search(o_qs, search)
+            fields.append("rank")
+        elif search:
             search_query = Q(title__icontains=search) | Q(description__icontains=search)
             w_qs = w_qs.filter(search_query)
             o_qs = o_qs.filter(search_query)
 
-        common_fields = [
-            "id",
-            "user_id",
-            "full_name",
-            "designation",
-            "mobile_no",
-            "alternate_no",
-            "email",
-            "company_name",
-            "address",
-            "country",
-            "province",
-            "municipality",
-            "ward",
-            "company_website",
-            "image",
-            "title",
-            "description",
-            "event_id",
-            "subcategory_id",
-            "product_id",
-            "service_id",
-            "status",
-            "type",
-            "views_count",
-            "match_percentage",
-            "created_at",
-            "updated_at",
-            "model_type",
-            "wish_id",
-            "offer_id",
-        ]
+        branches = {"wish": w_qs.values(*fields), "offer": o_qs.values(*fields)}
+        if model_type in branches:
+            return {model_type: branches[model_type]}
+        return branches
 
-        if model_type == "wish":
-            return w_qs.values(*common_fields).order_by("-created_at")
-        elif model_type == "offer":
-            return o_qs.values(*common_fields).order_by("-created_at")
+    def get_queryset(self):
+        ordering = RANKED_ORDERING if self.is_fulltext() else ["-created_at"]
+        branches = list(self.get_branches().values())
+        if len(branches) == 1:
+            return branches[0].order_by(*ordering)
 
-        combined = (
-            w_qs
-            .values(*common_fields)
-            .union(o_qs.values(*common_fields))
-            .order_by("-created_at")
-        )
+        combined = branches[0].union(branches[1]).order_by(*ordering)
 
         return combined
 
+    def hydrate(self, page):
+        # Collect unique IDs to perform batch lookups for nested serialization
+        product_ids = {item["product_id"] for item in page if item.get("product_id")}
+        service_ids = {item["service_id"] for item in page if item.get("service_id")}
+
+        products = HSCode.objects.filter(id__in=product_ids).in_bulk()
+        services = Service.objects.filter(id__in=service_ids).in_bulk()
+
+        # Inject fetched objects into data dictionaries so the serializer can find them
+        for item in page:
+            item["product"] = products.get(item.get("product_id"))
+            item["service"] = services.get(item.get("service_id"))
+
     def list(self, request, *args, **kwargs):
+        if self.uses_cursor():
+            page = self.paginator.paginate_branches(self.get_branches(), request)
+            self.hydrate(page)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
         if page is not None:
-            # Collect unique IDs to perform batch lookups for nested serialization
-            product_ids = {
-                item["product_id"] for item in page if item.get("product_id")
-            }
-            service_ids = {
-                item["service_id"] for item in page if item.get("service_id")
-            }
-
-            products = HSCode.objects.filter(id__in=product_ids).in_bulk()
-            services = Service.objects.filter(id__in=service_ids).in_bulk()
-
-            # Inject fetched objects into data dictionaries so the serializer can find them
-            for item in page:
-                item["product"] = products.get(item.get("product_id"))
-                item["service"] = services.get(item.get("service_id"))
-
+            self.hydrate(page)
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
 
@@ -829,6 +1015,75 @@ class WishAndOfferCombinedListView(generics.ListAPIView):
         return Response(serializer.data)
 
 
+class SimilarListingsView(APIView):
+    """
+    Lists the wishes and offers whose titles are most similar to a given
+    wish or offer, found through the MinHash LSH buckets.
+    """
+
+    max_limit = 50
+
+    def get(self, request, model_type, pk):
+        listing_models = {
+            "wish": (Wish, WishSerializer),
+            "offer": (Offer, OfferSerializer),
+        }
+        if model_type not in listing_models:
+            return Response(
+                {"error": "model_type must be 'wish' or 'offer'."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        source_model = listing_models[model_type][0]
+        try:
+            source = source_model.objects.get(pk=pk)
+        except source_model.DoesNotExist:
+            return Response(
+                {"error": f"{model_type.capitalize()} with ID {pk} not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, self.max_limit))
+        target = request.query_params.get("target")
+        sides = [target] if target in listing_models else list(listing_models)
+
+        results = []
+        for side in sides:
+            model, serializer_class = listing_models[side]
+            candidates = model.objects.filter(
+                id__in=LSHBucket.colliding_ids(source, side)
+            ).select_related("product", "service")
+            if side == model_type:
+                candidates = candidates.exclude(pk=source.pk)
+            for candidate in candidates:
+                results.append(
+                    (
+                        estimated_similarity(
+                            source.title_signature, candidate.title_signature
+                        ),
+                        side,
+                        candidate,
+                        serializer_class,
+                    )
+                )
+
+        results.sort(key=lambda result: result[0], reverse=True)
+        return Response(
+            [
+                {
+                    **serializer_class(candidate).data,
+                    "model_type": side,
+                    "similarity": round(similarity, 2),
+                }
+                for similarity, side, candidate, serializer_class in results[:limit]
+            ]
+        )
+
+
 class IncreaseWishViewCountView(APIView):
     def post(self, request, pk):
         Wish.objects.filter(pk=pk).update(views_count=F("views_count") + 1)